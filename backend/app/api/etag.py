@@ -0,0 +1,21 @@
+import hashlib
+import json
+from typing import Any, Dict, Optional
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+
+def etag_response(request: Request, content: Any, headers: Optional[Dict[str, str]] = None) -> Response:
+    """
+    JSON response with a content-hash ETag. Answers 304 (no body) when the client's
+    If-None-Match already matches, so pollers only pay for data that changed.
+    """
+    body = json.dumps(jsonable_encoder(content), separators=(',', ':')).encode()
+    etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+    # no-cache = browser may store it but must revalidate (cheap 304) every time
+    headers = {**(headers or {}), "ETag": etag, "Cache-Control": "no-cache"}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match == "*" or etag in [t.strip() for t in if_none_match.split(",")]):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,44 @@
+import base64
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from fastapi import HTTPException
+from sqlalchemy import Select, tuple_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(ts: datetime, row_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{ts.isoformat()}|{row_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        ts, row_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(ts), int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_page(stmt: Select, ts_col, id_col, cursor: Optional[str], limit: int) -> Select:
+    """
+    Newest-first page of stmt that starts after cursor. Fetches limit + 1 rows so
+    next_cursor() can tell whether there is another page without a COUNT.
+    With a (filter columns..., ts, id) index this is one index range scan at any depth,
+    unlike OFFSET which walks and discards every skipped row.
+    """
+    if cursor:
+        ts, row_id = decode_cursor(cursor)
+        stmt = stmt.where(tuple_(ts_col, id_col) < tuple_(ts, row_id))
+    return stmt.order_by(ts_col.desc(), id_col.desc()).limit(limit + 1)
+
+
+def next_cursor(rows: List[Any], limit: int, ts_attr: str) -> Tuple[List[Any], Dict[str, str]]:
+    """
+    Trims the look-ahead row and returns (page rows, response headers with the next cursor if any).
+    """
+    if len(rows) <= limit:
+        return rows, {}
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, {NEXT_CURSOR_HEADER: encode_cursor(getattr(last, ts_attr), last.id)}
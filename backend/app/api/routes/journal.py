@@ -1,43 +1,77 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
-from app.db.base import get_db
-from app.models.models import JournalEntry, Account
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from app.core.config import settings
+from app.db.base import get_async_db
+from app.models.models import JournalEntry
 from app.schemas.schemas import JournalCreate, JournalResponse
+from app.api.etag import etag_response
+from app.api.pagination import keyset_page, next_cursor
+from app.services.account_sync import account_sync
+from app.services.analysis_queue import AnalysisJob, analysis_queue
+from app.services.event_hub import event_hub
 from app.services.gemini_service import gemini_service
 
 router = APIRouter()
 
 @router.post("/", response_model=JournalResponse)
-async def create_journal_entry(entry_in: JournalCreate, db: Session = Depends(get_db)):
-    account = db.query(Account).first()
-    if not account:
-        raise HTTPException(status_code=404, detail="Account not found")
-
-    # 1. AI Analysis
+async def create_journal_entry(entry_in: JournalCreate, db: AsyncSession = Depends(get_async_db)):
+    account = account_sync.snapshot or await run_in_threadpool(account_sync.load_snapshot)
     account_stats = {
         "balance": account.balance,
         "current_daily_loss": account.current_daily_loss,
         "max_daily_loss": account.max_daily_loss,
         "trades_today_count": account.trades_today_count
     }
-    analysis = await gemini_service.analyze_journal(entry_in.content, account_stats)
-    
-    # 2. Save
-    entry = JournalEntry(
-        account_id=account.id,
-        content=entry_in.content,
-        sentiment_score=analysis.get("sentiment_score"),
-        emotional_tags=analysis.get("emotional_tags"),
-        ai_feedback=analysis.get("ai_feedback")
-    )
+
+    # 1. Save right away. Confident local classification or a repeat message (analysis cache)
+    # answer inline, no Gemini call
+    ready = gemini_service.quick_analysis(entry_in.content, entry_in.detailed)
+    if ready is None:
+        ready = gemini_service.cached_analysis(entry_in.content, account_stats)
+    entry = await _save_entry(db, settings.ACCOUNT_ID, entry_in.content, ready)
+    response = JournalResponse.model_validate(entry)
+    event_hub.publish("journal.created", response)
+    if ready is not None:
+        return response
+
+    # 2. AI Analysis (background pool, pushes journal.updated when done)
+    job = AnalysisJob(entry.id, entry_in.content, account_stats)
+    if not analysis_queue.submit(job):
+        # Pool saturated (or not running): answer with the local heuristic instead of queueing unbounded
+        response = await run_in_threadpool(analysis_queue.store, entry.id, gemini_service.local_analysis(entry_in.content))
+        event_hub.publish("journal.updated", response)
+
+    return response
+
+async def _save_entry(db: AsyncSession, account_id: int, content: str, analysis: Optional[dict] = None) -> JournalEntry:
+    entry = JournalEntry(account_id=account_id, content=content)
+    if analysis:
+        entry.sentiment_score = analysis.get("sentiment_score")
+        entry.emotional_tags = analysis.get("emotional_tags")
+        entry.ai_feedback = analysis.get("ai_feedback")
     db.add(entry)
-    db.commit()
-    db.refresh(entry)
-    
+    await db.commit()
+    await db.refresh(entry)
     return entry
 
 @router.get("/", response_model=List[JournalResponse])
-def get_journal_entries(db: Session = Depends(get_db)):
-    entries = db.query(JournalEntry).order_by(JournalEntry.created_at.desc()).limit(50).all()
-    return entries
+async def get_journal_entries(
+    request: Request,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Newest first, paged with the X-Next-Cursor response header (?cursor=).
+    """
+    stmt = keyset_page(
+        select(JournalEntry).where(JournalEntry.account_id == settings.ACCOUNT_ID),
+        JournalEntry.created_at, JournalEntry.id, cursor, limit
+    )
+    entries, headers = next_cursor((await db.scalars(stmt)).all(), limit, "created_at")
+    body = [JournalResponse.model_validate(e) for e in entries]
+    await db.rollback() # connection back to the pool before the response goes out
+    return etag_response(request, body, headers)
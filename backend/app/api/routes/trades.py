@@ -1,41 +1,117 @@
-from fastapi import APIRouter, Depends, HTTPException, Body
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Body, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
-from app.db.base import get_db
-from app.models.models import Trade, Account
-from app.schemas.schemas import TradeCreate, TradeResponse, TradeValidationRequest, ValidationResult
+from typing import List, Optional
+from datetime import datetime
+from app.core.config import settings
+from app.db.base import get_async_db, SessionLocal
+from app.models.models import Trade
+from app.schemas.schemas import TradeCreate, TradeClose, TradeResponse, TradeValidationRequest, ValidationResult, BatchValidationRequest, BatchValidationItem, BatchValidationResult
 from app.services.risk_engine import risk_engine
-from app.services.delta_service import delta_service
-from app.services.report_service import report_service
-import io
+from app.services.risk_state import risk_state_cache
+from app.services.delta_service import async_delta_service
+from app.services.report_service import report_service, TRADE_REPORT_COLUMNS
+from app.services.export_service import export_service, parse_columns, trade_query
+from app.services.account_sync import account_sync
+from app.services.position_engine import position_engine
+from app.services.order_service import OrderRejected, OrderUnknown, RiskLimitExceeded, StageTimer, order_service
+from app.services.event_hub import event_hub
+from app.api.etag import etag_response
+from app.api.pagination import keyset_page, next_cursor
+import asyncio
 
 router = APIRouter()
 
 @router.get("/export/pdf")
-def export_trades_pdf(db: Session = Depends(get_db)):
-    account = db.query(Account).first()
-    if not account:
-        raise HTTPException(status_code=404, detail="Account not found")
-        
-    trades = db.query(Trade).filter(Trade.account_id == account.id).order_by(Trade.entry_time.desc()).all()
-    
-    pdf_bytes = report_service.generate_trade_pdf(trades, account)
-    
+def export_trades_pdf(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    symbol: Optional[str] = None
+):
+    # Account header from the snapshot, the body streams from its own session
+    account = account_sync.snapshot or account_sync.load_snapshot()
+    stmt = trade_query(settings.ACCOUNT_ID, TRADE_REPORT_COLUMNS, start, end, symbol).order_by(Trade.entry_time.desc())
+
+    period = None
+    if start or end or symbol:
+        period = "Filter: " + " | ".join(filter(None, [
+            symbol,
+            f"from {start:%Y-%m-%d %H:%M}" if start else None,
+            f"until {end:%Y-%m-%d %H:%M}" if end else None
+        ]))
+
+    def content():
+        # Own session, the request-scoped one may be closed before the body finishes streaming
+        with SessionLocal() as session:
+            yield from report_service.stream_trade_pdf(account, session.execute(stmt), period)
+
     return StreamingResponse(
-        io.BytesIO(pdf_bytes),
+        content(),
         media_type="application/pdf",
         headers={"Content-Disposition": "attachment; filename=trade_history.pdf"}
     )
 
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+@router.get("/export/{fmt}")
+def export_trades(
+    fmt: str,
+    columns: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    symbol: Optional[str] = None
+):
+    """
+    Bulk trade history as streaming CSV, Parquet or Arrow IPC for analytics tools.
+    columns is a comma separated subset of the trade columns, start/end filter on entry time.
+    """
+    if fmt not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(status_code=404, detail=f"Unknown export format '{fmt}'")
+    try:
+        names = parse_columns(columns)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if fmt != "csv":
+        try:
+            import pyarrow # noqa: F401
+        except ImportError:
+            raise HTTPException(status_code=501, detail="Parquet / Arrow export needs pyarrow installed")
+
+    stmt = export_service.query(settings.ACCOUNT_ID, names, start, end, symbol)
+
+    def content():
+        # Own session, the request-scoped one may be closed before the body finishes streaming
+        with SessionLocal() as session:
+            result = session.execute(stmt)
+            if fmt == "csv":
+                yield from export_service.iter_csv(result, names)
+            else:
+                yield from export_service.iter_arrow(result, names, fmt)
+
+    return StreamingResponse(
+        content(),
+        media_type=EXPORT_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f"attachment; filename=trades.{fmt}"}
+    )
+
 @router.post("/validate", response_model=ValidationResult)
-def validate_trade_request(
+async def validate_trade_request(
     request: TradeValidationRequest, 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    # Assume single user account id=1 for now
     # Calculate params
-    entry_price = delta_service.get_mark_price(request.symbol)
+    # Exchange I/O is awaited on the pooled async client, the DB check on the async session
+    # Mark price comes from the short-lived cache, so validate -> execute shares one ticker fetch
+    quote = await async_delta_service.get_mark_quote(request.symbol)
+    entry_price = quote.price if quote else 0.0
     if entry_price <= 0:
          return ValidationResult(valid=False, can_execute=False, reason="Could not determine Entry Price (Market Closed?)")
 
@@ -46,16 +122,76 @@ def validate_trade_request(
     else:
         stop_loss = entry_price * (1 + (request.sl_percent / 100))
 
-    return risk_engine.validate_trade(db, 1, request.symbol, entry_price, stop_loss, request.quantity)
+    return await db.run_sync(risk_engine.validate_trade, settings.ACCOUNT_ID, request.symbol, entry_price, stop_loss, request.quantity, quote.age)
+
+@router.post("/validate/batch", response_model=BatchValidationResult)
+async def validate_trade_batch(
+    request: BatchValidationRequest,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Evaluates a ladder of candidate orders in one call: one mark price per symbol,
+    one account state read, risk math vectorized across all candidates.
+    """
+    candidates = request.candidates
+    symbols = sorted({c.symbol for c in candidates})
+    quotes = dict(zip(symbols, await asyncio.gather(*(async_delta_service.get_mark_quote(s) for s in symbols))))
+
+    state = risk_state_cache.peek(settings.ACCOUNT_ID) or await db.run_sync(risk_state_cache.get, settings.ACCOUNT_ID)
+    if state is None:
+        raise HTTPException(status_code=404, detail="Account not found")
+
+    entry_prices = [quotes[c.symbol].price if quotes[c.symbol] else 0.0 for c in candidates]
+    price_ages = [quotes[c.symbol].age if quotes[c.symbol] else None for c in candidates]
+    valid, reasons, risk, max_qty = risk_engine.validate_batch(
+        state,
+        [c.symbol for c in candidates],
+        [c.side for c in candidates],
+        entry_prices,
+        [c.sl_percent for c in candidates],
+        [c.quantity for c in candidates],
+        price_ages
+    )
 
+    return BatchValidationResult(
+        remaining_daily_buffer=state.remaining_daily_buffer,
+        results=[
+            BatchValidationItem(
+                valid=bool(valid[i]),
+                can_execute=bool(valid[i]),
+                reason=reasons[i],
+                symbol=c.symbol,
+                side=c.side,
+                quantity=c.quantity,
+                entry_price=entry_prices[i],
+                risk=float(risk[i]),
+                max_quantity=float(max_qty[i])
+            )
+            for i, c in enumerate(candidates)
+        ]
+    )
 
 @router.post("/", response_model=TradeResponse)
-def execute_trade(
+async def execute_trade(
     trade_in: TradeCreate, 
-    db: Session = Depends(get_db)
+    response: Response,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db)
 ):
+    timer = StageTimer()
+
+    # Retried request: hand back what the first attempt produced, never a second order
+    if trade_in.client_order_id:
+        existing = await db.run_sync(order_service.find, trade_in.client_order_id)
+        if existing is not None:
+            if existing.status == "PENDING":
+                raise HTTPException(status_code=409, detail="Order with this client_order_id is still being submitted")
+            return existing
+
     # 1. Determine Prices
-    market_price = delta_service.get_mark_price(trade_in.symbol)
+    with timer.stage("quote"):
+        quote = await async_delta_service.get_mark_quote(trade_in.symbol)
+    market_price = quote.price if quote else 0.0
     
     # Logic: If MARKET, force execution price to be market_price (for risk checks).
     # If LIMIT, use limit_price if valid, else fallback to market (for risk checks).
@@ -63,6 +199,8 @@ def execute_trade(
         entry_price = market_price
     else:
         entry_price = trade_in.limit_price if (trade_in.limit_price and trade_in.limit_price > 0) else market_price
+    # Staleness only matters when we are sizing off the mark
+    price_age = quote.age if (quote and entry_price == market_price) else None
     
     if entry_price <= 0:
         raise HTTPException(status_code=400, detail="Unable to fetch price for execution validation")
@@ -73,52 +211,142 @@ def execute_trade(
         stop_loss = entry_price * (1 + (trade_in.sl_percent / 100))
     
     # 2. Re-validate Risk
-    validation = risk_engine.validate_trade(db, 1, trade_in.symbol, entry_price, stop_loss, trade_in.quantity)
+    with timer.stage("validate"):
+        state = risk_state_cache.peek(settings.ACCOUNT_ID)
+        if state is not None:
+            # Warm cache: validate that one snapshot in memory, no DB round trip. A writer can
+            # invalidate the entry meanwhile, so never go back to the cache for it here.
+            validation = risk_engine.validate_state(state, trade_in.symbol, entry_price, stop_loss, trade_in.quantity, price_age)
+        else:
+            validation = await db.run_sync(risk_engine.validate_trade, settings.ACCOUNT_ID, trade_in.symbol, entry_price, stop_loss, trade_in.quantity, price_age)
     if not validation.valid:
         raise HTTPException(status_code=400, detail=validation.reason)
-        
-    # 2. Execute on Delta Exchange (Sync Block)
+
+    # 3. Record the intent before anything goes to the exchange
+    with timer.stage("intent"):
+        try:
+            async with risk_engine.async_reservation_lock(db, settings.ACCOUNT_ID):
+                intent = await db.run_sync(order_service.record_intent, settings.ACCOUNT_ID, trade_in, entry_price, stop_loss)
+        except IntegrityError:
+            # Same client_order_id submitted concurrently, the other request owns it
+            await db.rollback()
+            raise HTTPException(status_code=409, detail="Order with this client_order_id is still being submitted")
+        except RiskLimitExceeded as e:
+            # Passed validation, but concurrent orders took the budget first
+            raise HTTPException(status_code=400, detail=str(e))
+
+    # 4. Execute on Delta Exchange
+    # Determine Limit Price based on Order Type
+    execution_price = None
+    if trade_in.order_type != "MARKET" and trade_in.limit_price and trade_in.limit_price > 0:
+        execution_price = trade_in.limit_price
     try:
-        # Note: Delta expects integer size often for contracts, check spec. 
-        # Passing raw qty for now as app handles logic.
-        
-        # Determine Limit Price based on Order Type
-        execution_price = None
-        if trade_in.order_type != "MARKET" and trade_in.limit_price and trade_in.limit_price > 0:
-            execution_price = trade_in.limit_price
-
-        delta_order = delta_service.place_order(
-            symbol=trade_in.symbol,
-            side=trade_in.side,
-            size=int(trade_in.quantity), # Enforce integer lots
-            limit_price=execution_price
-        )
-        # We can extract actual price/id from delta_order if ready
-    except Exception as e:
+        with timer.stage("exchange"):
+            delta_order = await order_service.submit(intent, execution_price)
+    except OrderRejected as e:
         # KILL SWITCH: If execution fails, DO NOT record as open trade.
-        raise HTTPException(status_code=502, detail=f"Execution Failed: {str(e)}")
+        await db.run_sync(order_service.reject, intent.id)
+        raise HTTPException(status_code=502, detail=f"Execution Failed: {str(e)}", headers={"Server-Timing": timer.header()})
+    except OrderUnknown as e:
+        # Might be live, the trade stays PENDING until the reconciler looks it up
+        raise HTTPException(status_code=504, detail=f"Execution Unconfirmed ({intent.client_order_id}): {str(e)}", headers={"Server-Timing": timer.header()})
 
-    # 3. Save to DB (Only if Delta success)
-    account = db.query(Account).first()
-    
-    trade = Trade(
-        account_id=account.id,
-        symbol=trade_in.symbol,
-        side=trade_in.side,
-        quantity=trade_in.quantity,
-        entry_price=entry_price, # Recorded entry (Estimated or Limit)
-        status="OPEN"
-    )
-    db.add(trade)
-    
-    # 4. Update Account Stats
-    account.trades_today_count += 1
-    
-    db.commit()
-    db.refresh(trade)
+    # 5. The exchange has it: answer now, the PENDING -> OPEN write and the snapshot rebuild
+    # (stats, survival) run after the response. Fill price / size are corrected later from fills.
+    trade = intent.model_copy(update={"status": "OPEN"})
+    position_engine.add(trade)
+    event_hub.publish("trade.created", trade)
+    background_tasks.add_task(order_service.confirm, intent.id, delta_order)
+    background_tasks.add_task(account_sync.load_snapshot)
+
+    response.headers["Server-Timing"] = timer.header()
     return trade
 
+@router.get("/positions")
+def get_positions(request: Request):
+    """
+    Open positions from the latest mark-to-market tick: mark, unrealized PnL and open R
+    per position, totals per symbol.
+    """
+    marks = position_engine.marks
+    if marks is None:
+        return etag_response(request, {"open": len(position_engine), "positions": []})
+    return etag_response(request, marks.to_dict())
+
+@router.post("/{trade_id}/close", response_model=TradeResponse)
+async def close_trade(
+    trade_id: int,
+    close_in: TradeClose = Body(default_factory=TradeClose),
+    db: AsyncSession = Depends(get_async_db)
+):
+    trade = await db.get(Trade, trade_id)
+    if trade is None:
+        raise HTTPException(status_code=404, detail="Trade not found")
+    if trade.status != "OPEN":
+        raise HTTPException(status_code=409, detail=f"Trade is {trade.status}, not OPEN")
+
+    quote = await async_delta_service.get_mark_quote(trade.symbol)
+    market_price = quote.price if quote else 0.0
+    limit_price = close_in.limit_price if (close_in.order_type != "MARKET" and close_in.limit_price and close_in.limit_price > 0) else None
+    exit_price = limit_price or market_price
+    if exit_price <= 0:
+        raise HTTPException(status_code=400, detail="Unable to fetch price for exit")
+
+    # Opposite side, reduce-only so a stale close can't open a new position
+    try:
+        delta_order = await async_delta_service.place_order(
+            symbol=trade.symbol,
+            side="SHORT" if trade.side == "LONG" else "LONG",
+            size=int(trade.quantity),
+            limit_price=limit_price,
+            reduce_only=True
+        )
+    except Exception as e:
+        # Position still open on the exchange, leave the trade OPEN
+        raise HTTPException(status_code=502, detail=f"Close Failed: {str(e)}")
+
+    closed = await db.run_sync(_close_trade, trade_id, exit_price, async_delta_service.parse_order_id(delta_order))
+    # Snapshot rebuild can re-run the ruin simulation, keep it off the event loop
+    await run_in_threadpool(account_sync.load_snapshot)
+    event_hub.publish("trade.closed", closed)
+    return closed
+
+def _close_trade(db: Session, trade_id: int, exit_price: float, order_id: Optional[str] = None) -> TradeResponse:
+    try:
+        trade = position_engine.close_trade(db, trade_id, exit_price, exit_order_id=order_id)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        # Closed concurrently between the check above and the row lock
+        raise HTTPException(status_code=409, detail=str(e))
+    return TradeResponse.model_validate(trade)
+
 @router.get("/", response_model=List[TradeResponse])
-def get_trades(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    trades = db.query(Trade).order_by(Trade.entry_time.desc()).offset(skip).limit(limit).all()
-    return trades
+async def get_trades(
+    request: Request,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    status: Optional[str] = None,
+    symbol: Optional[str] = None,
+    skip: int = 0, # legacy offset paging, prefer the X-Next-Cursor header
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Newest first. When more trades exist the response carries an X-Next-Cursor header,
+    pass it back as ?cursor= for the next page.
+    """
+    stmt = select(Trade).where(Trade.account_id == settings.ACCOUNT_ID)
+    if status:
+        stmt = stmt.where(Trade.status == status)
+    if symbol:
+        stmt = stmt.where(Trade.symbol == symbol)
+    stmt = keyset_page(stmt, Trade.entry_time, Trade.id, cursor, limit)
+    if skip and not cursor:
+        stmt = stmt.offset(skip)
+
+    trades, headers = next_cursor((await db.scalars(stmt)).all(), limit, "entry_time")
+    body = [TradeResponse.model_validate(t) for t in trades]
+    # Read done: hand the pooled connection back now rather than after the response is sent,
+    # under load the pool is what requests queue on
+    await db.rollback()
+    return etag_response(request, body, headers)
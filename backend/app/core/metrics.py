@@ -0,0 +1,226 @@
+"""
+In-process metrics, served in the Prometheus text format at /metrics.
+
+Histograms and counters keyed by label values; recording is a dict lookup, a bisect and a
+few adds under a per-metric lock, cheap enough for the order path. Everything is process
+local, with several workers each one serves its own /metrics (scrape them per worker).
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.core.config import settings
+
+# Seconds. From a warm cache hit (sub-ms) to a Delta call hitting its timeout.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{_labels(self.labelnames, k)} {_number(v)}" for k, v in values]
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # Per label set: [count per bucket (+Inf last, not cumulative), sum]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][i] += 1
+            series[1] += value
+
+    @contextmanager
+    def time(self, *labels: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            series = [(k, list(counts), total) for k, (counts, total) in self._series.items()]
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {repr(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name: str, help: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        metric = Counter(name, help, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help: str, labelnames: Tuple[str, ...] = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        metric = Histogram(name, help, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+metrics = MetricsRegistry()
+
+# --- What we record ---
+http_request_seconds = metrics.histogram(
+    "http_request_duration_seconds", "HTTP request latency until the last response byte, by route template",
+    ("method", "route", "status"))
+order_stage_seconds = metrics.histogram(
+    "order_stage_duration_seconds", "POST /trades/ stages: quote, validate, intent (reserve + PENDING insert + commit), exchange",
+    ("stage",))
+delta_request_seconds = metrics.histogram(
+    "delta_request_duration_seconds", "Delta Exchange REST calls by endpoint template and HTTP status ('error': no response)",
+    ("client", "method", "endpoint", "status"))
+delta_queue_wait_seconds = metrics.histogram(
+    "delta_queue_wait_seconds", "Time a Delta request waited for the client-side rate limiter, by priority lane",
+    ("lane",))
+delta_throttled = metrics.counter(
+    "delta_throttled_total", "Delta requests held back: queue_full / timeout (never sent) or 429 (Delta refused)",
+    ("lane", "reason"))
+gemini_request_seconds = metrics.histogram(
+    "gemini_request_duration_seconds", "Gemini generate calls", ("outcome",))
+db_transaction_seconds = metrics.histogram(
+    "db_transaction_duration_seconds", "Time a session holds its connection: first statement to commit / rollback / close",
+    ("outcome",))
+worker_errors = metrics.counter(
+    "worker_errors_total", "Errors caught (and logged) by background workers", ("worker",))
+
+
+# Long-lived streams: their "latency" is the connection's lifetime, it would swamp the
+# request histograms. (The WebSocket route never gets here, only "http" scopes are timed.)
+UNTIMED_ROUTES = {f"{settings.API_V1_STR}/events"}
+
+
+def route_template(scope) -> str:
+    """
+    "/api/v1/trades/42/close" -> "/api/v1/trades/{trade_id}/close": the matched route's
+    path_format, which is relative to its router, behind the prefix it was included with.
+    """
+    route = scope.get("route")
+    if route is None:
+        return "unmatched" # 404s, one series instead of one per probed URL
+    template = getattr(route, "path_format", scope["path"])
+    included = scope.get("fastapi", {}).get("included_router")
+    if included is not None:
+        template = included.include_context.prefix + template
+    return template
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI (no BaseHTTPMiddleware task hop). Times each HTTP request up to its last
+    response body chunk, so background tasks that run after the response don't count and
+    streamed exports do. Labelled with the matched route's template, never the raw path.
+    The event stream (UNTIMED_ROUTES) is left out.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        start = time.perf_counter()
+        status = "500"
+        recorded = False
+
+        def record():
+            nonlocal recorded
+            recorded = True
+            route = route_template(scope)
+            if route in UNTIMED_ROUTES:
+                return
+            http_request_seconds.observe(time.perf_counter() - start, scope["method"], route, status)
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False) and not recorded:
+                record()
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if not recorded:
+                record() # Failed or disconnected before the body finished
+
+
+# --- DB sessions ---
+_TXN_START = "metrics_txn_start"
+_TXN_OUTCOME = "metrics_txn_outcome"
+
+def _after_begin(session: Session, transaction, connection):
+    session.info[_TXN_START] = time.perf_counter()
+
+def _after_commit(session: Session):
+    session.info[_TXN_OUTCOME] = "commit"
+
+def _after_transaction_end(session: Session, transaction):
+    if transaction.parent is not None:
+        return # Savepoint / subtransaction, the root one is timed
+    start = session.info.pop(_TXN_START, None)
+    if start is not None:
+        db_transaction_seconds.observe(time.perf_counter() - start, session.info.pop(_TXN_OUTCOME, "rollback"))
+
+def instrument_sessions():
+    # On the Session class, so every session (incl. ones behind AsyncSession) is timed
+    event.listen(Session, "after_begin", _after_begin)
+    event.listen(Session, "after_commit", _after_commit)
+    event.listen(Session, "after_transaction_end", _after_transaction_end)
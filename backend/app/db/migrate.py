@@ -0,0 +1,56 @@
+"""
+Schema setup, kept out of app import:
+
+    cd backend && python -m app.db.migrate
+
+Run it once per deploy before starting workers and set DB_MIGRATE_ON_STARTUP=false, or leave
+that on (default) and each app instance runs it in its lifespan before serving.
+"""
+import time
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from app.db.base import Base, engine
+import app.models.models # noqa: F401  Register the models with Base
+
+
+def migrate(bind: Engine = None) -> int:
+    """
+    Creates missing tables, then adds columns introduced since to existing ones (new ones
+    are nullable or carry a constant server default that backfills existing rows), then any
+    missing indexes. Returns how many DDL statements ran.
+    """
+    bind = bind or engine
+    inspector = inspect(bind)
+    existing = set(inspector.get_table_names())
+    missing = [t for t in Base.metadata.sorted_tables if t.name not in existing]
+    Base.metadata.create_all(bind=bind, tables=missing)
+    statements = len(missing)
+
+    with bind.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing:
+                continue # Created above, complete
+            existing_columns = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing_columns:
+                    ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(bind.dialect)}"
+                    if column.server_default is not None:
+                        ddl += f" DEFAULT {column.server_default.arg}" + ("" if column.nullable else " NOT NULL")
+                    conn.execute(text(ddl))
+                    statements += 1
+
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing:
+            continue
+        existing_indexes = {i["name"] for i in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                index.create(bind=bind)
+                statements += 1
+    return statements
+
+
+if __name__ == "__main__":
+    begin = time.perf_counter()
+    count = migrate()
+    print(f"Schema up to date ({count} DDL statements, {time.perf_counter() - begin:.2f}s)")
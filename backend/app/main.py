@@ -1,15 +1,56 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from app.core.config import settings
-from app.db.base import Base, engine
-import app.models.models # Import models to register them with Base
+from app.core.metrics import MetricsMiddleware, instrument_sessions, metrics
+from app.db.base import SessionLocal, async_engine
+from app.db.migrate import migrate
+from app.services.account_sync import account_sync
+from app.services.delta_service import delta_service, async_delta_service
+from app.services.price_book import price_book
+from app.services.event_hub import event_hub
+from app.services.analysis_queue import analysis_queue
+from app.services.survival_engine import survival_engine
+from app.services.position_engine import position_engine
+from app.services.reconciliation import reconciliation
+from app.services.daily_reset import daily_reset
 
-# Create tables on startup (Simple approach for MVP)
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Schema first (no DDL at import), unless a deploy step already ran app.db.migrate
+    if settings.DB_MIGRATE_ON_STARTUP:
+        migrate()
+    # The single account exists before any worker or route can race to create it
+    with SessionLocal() as db:
+        account_sync.ensure_account(db)
+    # Background workers live as long as the app
+    event_hub.bind(asyncio.get_running_loop())
+    account_sync.start()
+    analysis_queue.start()
+    if settings.PRICE_BOOK_ENABLED:
+        price_book.start()
+    position_engine.start()
+    reconciliation.start()
+    daily_reset.start()
+    yield
+    event_hub.close()
+    await analysis_queue.stop()
+    await position_engine.stop()
+    await reconciliation.stop()
+    await daily_reset.stop()
+    await price_book.stop()
+    await account_sync.stop()
+    await async_delta_service.aclose()
+    delta_service.close()
+    survival_engine.close()
+    await async_engine.dispose()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan
 )
 
 # CORS
@@ -24,12 +65,80 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor", "Server-Timing"],
 )
 
+if settings.METRICS_ENABLED:
+    # Added last = outermost, the timing covers the other middleware too
+    instrument_sessions()
+    app.add_middleware(MetricsMiddleware)
+
 @app.get("/health")
 def health_check():
     return {"status": "ok", "survival_mode": "active"}
 
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+# --- Server Push ---
+# Change events (account field diffs, new trades, journal entries) fanned out by event_hub.
+# Clients load the REST snapshot once, then apply events instead of polling.
+
+@app.get(f"{settings.API_V1_STR}/events")
+async def stream_events(request: Request):
+    queue = event_hub.subscribe()
+
+    async def event_stream():
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=settings.EVENT_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": ping\n\n" # keeps proxies from closing idle streams
+                    continue
+                if event is None:
+                    # Dropped by the hub (slow consumer or shutdown), client will reconnect
+                    break
+                yield event.sse
+        finally:
+            event_hub.unsubscribe(queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.websocket(f"{settings.API_V1_STR}/ws")
+async def websocket_events(websocket: WebSocket):
+    await websocket.accept()
+    queue = event_hub.subscribe()
+
+    async def pump():
+        while True:
+            event = await queue.get()
+            if event is None:
+                break
+            await websocket.send_text(event.json)
+
+    # We don't expect client messages, receiving just tells us when it goes away
+    sender = asyncio.create_task(pump())
+    receiver = asyncio.create_task(websocket.receive())
+    try:
+        await asyncio.wait({sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        event_hub.unsubscribe(queue)
+        sender.cancel()
+        receiver.cancel()
+    try:
+        await websocket.close()
+    except RuntimeError:
+        pass # Client already closed
+
 from app.api.routes import account, trades, journal
 
 app.include_router(account.router, prefix=f"{settings.API_V1_STR}/account", tags=["account"])
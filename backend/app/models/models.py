@@ -1,7 +1,7 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Text, JSON
+from sqlalchemy import Column, Integer, BigInteger, String, Float, Boolean, Date, DateTime, ForeignKey, Text, JSON, Index
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 from sqlalchemy.sql import func
-from datetime import datetime
+from datetime import date, datetime, timezone
 from typing import List, Optional
 from app.db.base import Base
 
@@ -17,16 +17,32 @@ class Account(Base):
     max_daily_loss: Mapped[float] = mapped_column(Float, default=300.0) # Absolute $ amount or R calc
     max_trades_per_day: Mapped[int] = mapped_column(Integer, default=5)
     
-    # Current Day State (Reset daily via cron or checked on request)
+    # Current Day State (reset at the daily rollover, see daily_reset)
     current_daily_loss: Mapped[float] = mapped_column(Float, default=0.0)
     trades_today_count: Mapped[int] = mapped_column(Integer, default=0)
+    # Sum of the risk_amount of trades still PENDING / OPEN, held against max_daily_loss
+    reserved_risk: Mapped[float] = mapped_column(Float, default=0.0, server_default="0")
     last_violation_time: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
     
     trades: Mapped[List["Trade"]] = relationship("Trade", back_populates="account")
     journal_entries: Mapped[List["JournalEntry"]] = relationship("JournalEntry", back_populates="account")
 
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
 class Trade(Base):
     __tablename__ = "trades"
+    __table_args__ = (
+        # Keyset pagination: WHERE account_id = ? AND (entry_time, id) < (?, ?) ORDER BY entry_time DESC, id DESC
+        Index("ix_trades_account_entry_time_id", "account_id", "entry_time", "id"),
+        Index("ix_trades_account_status_entry_time_id", "account_id", "status", "entry_time", "id"),
+        # Latest closes first (ruin simulation sample, stats rebuild)
+        Index("ix_trades_account_status_exit_time_id", "account_id", "status", "exit_time", "id"),
+        # Reconciliation upserts on it, one trade per exchange entry order
+        Index("ux_trades_exchange_order_id", "exchange_order_id", unique=True),
+        Index("ix_trades_exit_order_id", "exit_order_id"),
+        Index("ux_trades_client_order_id", "client_order_id", unique=True),
+    )
     
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     account_id: Mapped[int] = mapped_column(Integer, ForeignKey("accounts.id"))
@@ -36,15 +52,25 @@ class Trade(Base):
     quantity: Mapped[float] = mapped_column(Float)
     
     entry_price: Mapped[float] = mapped_column(Float)
+    stop_loss: Mapped[Optional[float]] = mapped_column(Float, nullable=True) # Initial stop, 1R = distance to it
+    # Daily loss budget reserved at entry (risk to stop + fee buffer), given back on close / reject
+    risk_amount: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
     exit_price: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
     
     pnl: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
     r_multiple: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
     
-    entry_time: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    # Set app-side too so every row has the same precision (keyset cursors compare it exactly)
+    entry_time: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow, server_default=func.now())
     exit_time: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
     
-    status: Mapped[str] = mapped_column(String, default="OPEN") # OPEN, CLOSED, REJECTED
+    status: Mapped[str] = mapped_column(String, default="OPEN") # PENDING, OPEN, CLOSED, REJECTED, CANCELLED, EXTERNAL
+
+    # Delta order ids, prices / quantity are corrected from their fills by the reconciler
+    exchange_order_id: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    exit_order_id: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    # Ours, sent with the entry order. Recorded (status PENDING) before the order goes out.
+    client_order_id: Mapped[Optional[str]] = mapped_column(String, nullable=True)
     
     # AI Tags
     tags: Mapped[Optional[List[str]]] = mapped_column(JSON, default=list) # ["revenge", "fomo"]
@@ -53,12 +79,15 @@ class Trade(Base):
 
 class JournalEntry(Base):
     __tablename__ = "journal_entries"
+    __table_args__ = (
+        Index("ix_journal_entries_account_created_at_id", "account_id", "created_at", "id"),
+    )
     
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     account_id: Mapped[int] = mapped_column(Integer, ForeignKey("accounts.id"))
     
     content: Mapped[str] = mapped_column(Text)
-    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow, server_default=func.now())
     
     # AI Analysis
     sentiment_score: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
@@ -66,3 +95,78 @@ class JournalEntry(Base):
     ai_feedback: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     
     account: Mapped["Account"] = relationship("Account", back_populates="journal_entries")
+
+class TradeStats(Base):
+    __tablename__ = "trade_stats"
+
+    # Running aggregates over closed trades, updated incrementally on each close
+    account_id: Mapped[int] = mapped_column(Integer, ForeignKey("accounts.id"), primary_key=True)
+
+    trades: Mapped[int] = mapped_column(Integer, default=0)
+    wins: Mapped[int] = mapped_column(Integer, default=0)
+    losses: Mapped[int] = mapped_column(Integer, default=0)
+    total_pnl: Mapped[float] = mapped_column(Float, default=0.0)
+    gross_win: Mapped[float] = mapped_column(Float, default=0.0) # sum of winning pnl
+    gross_loss: Mapped[float] = mapped_column(Float, default=0.0) # sum of |losing pnl|
+
+    # R multiples (only trades that have one)
+    r_count: Mapped[int] = mapped_column(Integer, default=0)
+    sum_r: Mapped[float] = mapped_column(Float, default=0.0)
+    sum_r2: Mapped[float] = mapped_column(Float, default=0.0)
+    win_r_count: Mapped[int] = mapped_column(Integer, default=0)
+    win_r_sum: Mapped[float] = mapped_column(Float, default=0.0)
+    loss_r_count: Mapped[int] = mapped_column(Integer, default=0)
+    loss_r_sum: Mapped[float] = mapped_column(Float, default=0.0) # sum of |losing R|
+
+    # Streaks: current_streak > 0 = consecutive wins, < 0 = consecutive losses
+    current_streak: Mapped[int] = mapped_column(Integer, default=0)
+    max_win_streak: Mapped[int] = mapped_column(Integer, default=0)
+    max_loss_streak: Mapped[int] = mapped_column(Integer, default=0)
+
+    # Rolling window over the last N closes, [pnl, r_multiple or null] oldest first
+    recent: Mapped[Optional[List[list]]] = mapped_column(JSON, default=list)
+
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow, onupdate=utcnow)
+
+class Fill(Base):
+    __tablename__ = "fills"
+
+    # Delta fill history, as pulled by the reconciler (insert-only, keyed by Delta's fill id)
+    id: Mapped[str] = mapped_column(String, primary_key=True)
+    order_id: Mapped[str] = mapped_column(String, index=True)
+    symbol: Mapped[str] = mapped_column(String)
+    side: Mapped[str] = mapped_column(String) # buy / sell
+    size: Mapped[float] = mapped_column(Float) # contracts, same unit as Trade.quantity
+    price: Mapped[float] = mapped_column(Float)
+    commission: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+
+class SyncCursor(Base):
+    __tablename__ = "sync_cursors"
+
+    # How far an incremental exchange pull or a scheduled job got, e.g. "delta.fills", "daily.rollover"
+    name: Mapped[str] = mapped_column(String, primary_key=True)
+    last_time: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True) # microseconds since epoch (Delta's start_time unit)
+    last_id: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow, onupdate=utcnow)
+
+class DailySummary(Base):
+    __tablename__ = "daily_summaries"
+    __table_args__ = (
+        # One row per account and trading day, a re-run of the rollover can't archive twice
+        Index("ux_daily_summaries_account_day", "account_id", "day", unique=True),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    account_id: Mapped[int] = mapped_column(Integer, ForeignKey("accounts.id"))
+    day: Mapped[date] = mapped_column(Date) # Local date (DAILY_RESET_TIMEZONE) the trading day started on
+
+    trades: Mapped[int] = mapped_column(Integer, default=0) # Entries taken (trades_today_count)
+    closed_trades: Mapped[int] = mapped_column(Integer, default=0)
+    wins: Mapped[int] = mapped_column(Integer, default=0)
+    net_pnl: Mapped[float] = mapped_column(Float, default=0.0) # Realized, i.e. -current_daily_loss
+    max_daily_loss: Mapped[float] = mapped_column(Float)
+    hit_lockout: Mapped[bool] = mapped_column(Boolean, default=False)
+    balance: Mapped[float] = mapped_column(Float)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow)
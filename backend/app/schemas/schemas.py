@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field, ConfigDict
 from typing import List, Optional
-from datetime import datetime
+from datetime import date, datetime
 
 # --- Trade Schemas ---
 class TradeBase(BaseModel):
@@ -13,11 +13,19 @@ class TradeCreate(TradeBase):
     limit_price: Optional[float] = None
     sl_percent: float = Field(..., gt=0)
     tp_percent: float = Field(..., gt=0)
+    # Optional idempotency key: resending the same id returns the first attempt's trade
+    client_order_id: Optional[str] = Field(None, pattern="^[A-Za-z0-9_-]{1,32}$")
+
+class TradeClose(BaseModel):
+    order_type: str = "MARKET" # LIMIT | MARKET
+    limit_price: Optional[float] = None
 
 class TradeResponse(TradeBase):
     id: int
     account_id: int
     entry_price: float
+    stop_loss: Optional[float] = None
+    risk_amount: Optional[float] = None
     exit_price: Optional[float] = None
     pnl: Optional[float] = None
     r_multiple: Optional[float] = None
@@ -25,10 +33,23 @@ class TradeResponse(TradeBase):
     exit_time: Optional[datetime] = None
     status: str
     tags: List[str] = []
+    client_order_id: Optional[str] = None
 
     model_config = ConfigDict(from_attributes=True)
 
 # --- Account Schemas ---
+class DailySummaryResponse(BaseModel):
+    day: date
+    trades: int
+    closed_trades: int
+    wins: int
+    net_pnl: float
+    max_daily_loss: float
+    hit_lockout: bool
+    balance: float
+
+    model_config = ConfigDict(from_attributes=True)
+
 class AccountBase(BaseModel):
     balance: float
     max_daily_loss: float
@@ -39,17 +60,22 @@ class AccountResponse(AccountBase):
     locked: bool
     current_daily_loss: float
     trades_today_count: int
+    reserved_risk: float = 0.0 # Held by open / pending trades against max_daily_loss
     last_violation_time: Optional[datetime] = None
     
     # Computed / Extra fields for UI
     runway_days: float = Field(default=0.0) # Calculated by service
     ruin_probability: float = Field(default=0.0) # Calculated by service
+    closed_trades: int = 0
+    win_rate: Optional[float] = None
+    current_streak: int = 0 # > 0 wins in a row, < 0 losses in a row
 
     model_config = ConfigDict(from_attributes=True)
 
 # --- Journal Schemas ---
 class JournalCreate(BaseModel):
     content: str
+    detailed: bool = False # Ask for a full Gemini coaching reply instead of the local quick answer
     
 class JournalResponse(BaseModel):
     id: int
@@ -64,17 +90,32 @@ class JournalResponse(BaseModel):
 # --- Risk / Validation Schemas ---
 class TradeValidationRequest(BaseModel):
     symbol: str
-    side: str
-    quantity: float
+    side: str = Field(..., pattern="^(LONG|SHORT)$")
+    quantity: float = Field(..., gt=0)
     limit_price: Optional[float] = None
-    sl_percent: float
-    tp_percent: float
+    sl_percent: float = Field(..., gt=0)
+    tp_percent: float = Field(..., gt=0)
 
 class ValidationResult(BaseModel):
     valid: bool
     reason: Optional[str] = None
     can_execute: bool
     
+class BatchValidationRequest(BaseModel):
+    candidates: List[TradeValidationRequest] = Field(..., min_length=1, max_length=1000)
+
+class BatchValidationItem(ValidationResult):
+    symbol: str
+    side: str
+    quantity: float
+    entry_price: float
+    risk: float # Base risk + fee buffer at the requested quantity
+    max_quantity: float # Largest quantity that fits the remaining daily buffer
+
+class BatchValidationResult(BaseModel):
+    remaining_daily_buffer: float
+    results: List[BatchValidationItem]
+    
 class RuleViolation(BaseModel):
     rule_name: str
     description: str
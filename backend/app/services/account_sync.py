@@ -0,0 +1,177 @@
+import asyncio
+from typing import Optional
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.metrics import worker_errors
+from app.db.base import SessionLocal, dialect_insert
+from app.models.models import Account
+from app.schemas.schemas import AccountResponse
+from app.services.delta_service import delta_service
+from app.services.event_hub import event_hub
+from app.services.survival_engine import SimulationResult, survival_engine
+from app.services.trade_stats import trade_stats
+
+
+class AccountSyncService:
+    """
+    Background worker that keeps the account in line with the Delta wallet.
+    Polls Delta on a fixed cadence, writes the balance once per tick
+    and publishes an in-memory snapshot that the account route serves directly.
+    """
+
+    def __init__(self, interval_seconds: float = None):
+        self.interval_seconds = interval_seconds or settings.DELTA_SYNC_INTERVAL_SECONDS
+        self._snapshot: Optional[AccountResponse] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def snapshot(self) -> Optional[AccountResponse]:
+        return self._snapshot
+
+    def publish(self, account: Account) -> AccountResponse:
+        """
+        Builds the API view of the account (incl. derived survival stats) and swaps it in.
+        Call after any commit that changes account state so readers never wait for the next tick.
+        """
+        runway = survival_engine.calculate_runway_days(account.balance, account.max_daily_loss)
+        # Real win rate / reward:risk from the incrementally maintained stats row (PK lookup, no scan)
+        stats = trade_stats.for_account(account)
+        win_rate, reward_risk, risk_pct = trade_stats.ruin_inputs(stats, account.balance)
+        ruin_prob = survival_engine.calculate_ruin_probability(win_rate, reward_risk, risk_pct)
+
+        # Enough history: Monte Carlo over the account's own outcomes instead of the heuristic.
+        # Cached per closed-trade count / total, so it only re-runs after a close (or a balance change).
+        sim = self.simulation(account, stats)
+        if sim is not None:
+            ruin_prob = sim.ruin_probability
+            runway = sim.runway_days # median, censored at the simulation horizon
+
+        snapshot = AccountResponse.model_validate(account)
+        snapshot.runway_days = runway
+        snapshot.ruin_probability = ruin_prob
+        snapshot.closed_trades = stats.trades
+        snapshot.win_rate = round(stats.wins / stats.trades, 3) if stats.trades else None
+        snapshot.current_streak = stats.current_streak
+
+        # Single reference swap, readers see either the old or the new snapshot
+        previous, self._snapshot = self._snapshot, snapshot
+
+        # Push only the fields that changed
+        if previous is None:
+            event_hub.publish("account", snapshot.model_dump())
+        else:
+            old, new = previous.model_dump(), snapshot.model_dump()
+            diff = {k: v for k, v in new.items() if old.get(k) != v}
+            if diff:
+                event_hub.publish("account", diff)
+        return snapshot
+
+    @staticmethod
+    def simulation(account: Account, stats=None) -> Optional[SimulationResult]:
+        stats = stats or trade_stats.for_account(account)
+        if stats.trades < settings.STATS_MIN_TRADES:
+            return None
+        return survival_engine.cached_simulation(
+            (account.id, stats.trades, round(stats.total_pnl, 2)), # pnl too, reconciled closes change it in place
+            lambda: trade_stats.outcome_sample(account, stats),
+            account.balance,
+            trades_per_day=account.max_trades_per_day
+        )
+
+    @staticmethod
+    def ensure_account(db: Session):
+        """
+        Creates the singleton account (settings.ACCOUNT_ID) if it doesn't exist yet. Runs at
+        startup before the workers; a fixed id with ON CONFLICT DO NOTHING keeps concurrent
+        callers from ending up with two accounts.
+        """
+        db.execute(dialect_insert(db)(Account).values(id=settings.ACCOUNT_ID).on_conflict_do_nothing())
+        db.commit()
+
+    def _get_or_create_account(self, db: Session) -> Account:
+        # Singleton account assumption for Personal App
+        account = db.get(Account, settings.ACCOUNT_ID)
+        if account is None:
+            # Auto-create if not exists (for easy setup)
+            self.ensure_account(db)
+            account = db.get(Account, settings.ACCOUNT_ID)
+        return account
+
+    def load_snapshot(self) -> AccountResponse:
+        """
+        DB-only read used before the first sync tick has completed.
+        """
+        with SessionLocal() as db:
+            return self.publish(self._get_or_create_account(db))
+
+    @staticmethod
+    def apply_wallet_balance(account: Account, balance_data: dict) -> bool:
+        """
+        Applies a Delta /wallet/balances response to the account.
+        Returns True if the account was modified.
+        """
+        # Delta API V2 GET /wallet/balances Response: {"result": [{"asset_symbol": "USDT", "balance": "100", ...}]}
+        if not balance_data or "result" not in balance_data:
+            return False
+
+        # Find USD or USDT
+        usdt_bal = next((item for item in balance_data["result"] if item.get("asset_symbol") in ["USD", "USDT"]), None)
+        if not usdt_bal:
+            return False
+
+        new_bal = float(usdt_bal.get("balance", 0))
+
+        # Balance only. Daily loss is booked per closed trade (RiskEngine.check_post_trade_rules),
+        # deriving it from wallet diffs as well would count every close twice.
+        account.balance = new_bal
+
+        # Auto-tune Risk Settings for Small Accounts
+        # If using default $300 limit but balance is small (e.g. < $500), scaling down is safer.
+        # Set to 10% of balance or $1 minimum.
+        if account.max_daily_loss == 300.0 and account.balance < 500:
+            account.max_daily_loss = max(account.balance * 0.10, 1.0)
+
+        return True
+
+    def sync_once(self) -> AccountResponse:
+        """
+        One sync tick: pull the wallet from Delta, persist the deltas, publish the snapshot.
+        Blocking, run it off the event loop.
+        """
+        with SessionLocal() as db:
+            account = self._get_or_create_account(db)
+            if delta_service.enabled:
+                try:
+                    balance_data = delta_service.get_wallet_balance()
+                    if self.apply_wallet_balance(account, balance_data):
+                        db.commit()
+                except Exception as e:
+                    # Don't block UI if Delta sync fails, just log and serve last known state
+                    db.rollback()
+                    print(f"Delta Sync Warning: {e}")
+                    worker_errors.inc("account_sync")
+            return self.publish(account)
+
+    async def run(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.sync_once)
+            except Exception as e:
+                print(f"Account Sync Error: {e}")
+                worker_errors.inc("account_sync")
+            await asyncio.sleep(self.interval_seconds)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+account_sync = AccountSyncService()
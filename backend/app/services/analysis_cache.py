@@ -0,0 +1,137 @@
+import hashlib
+import json
+import math
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from app.core.config import settings
+
+_PUNCT = re.compile(r"[^\w\s]")
+_SPACE = re.compile(r"\s+")
+
+
+def normalize_content(content: str) -> str:
+    # "Lost again!!" / "lost   again" -> "lost again"
+    return _SPACE.sub(" ", _PUNCT.sub(" ", content.lower())).strip()
+
+
+def context_signature(account_context: Optional[dict]) -> str:
+    """
+    Coarse account state, so the same message under very different conditions
+    (fresh day vs. near the loss limit) doesn't share a coaching reply.
+    """
+    if not account_context:
+        return "-"
+    max_loss = account_context.get("max_daily_loss") or 0
+    loss = account_context.get("current_daily_loss") or 0
+    loss_bucket = min(int(loss / max_loss * 4), 4) if max_loss > 0 and loss > 0 else 0 # quarters of the daily limit
+    trades_bucket = min(account_context.get("trades_today_count") or 0, 5)
+    balance = account_context.get("balance") or 0
+    balance_bucket = int(math.log10(balance)) if balance >= 1 else 0 # order of magnitude
+    return f"l{loss_bucket}t{trades_bucket}b{balance_bucket}"
+
+
+class AnalysisCache:
+    """
+    LRU cache of journal analyses keyed by normalized content hash + context signature.
+    Bounded in entries, expires after ttl_seconds; optionally backed by a SQLite file so
+    results survive restarts and are shared between workers on one host. The file holds the
+    same bound: each write drops expired rows and the oldest beyond max_entries.
+    """
+    def __init__(self, max_entries: int = None, ttl_seconds: float = None, path: str = None):
+        self.max_entries = max_entries or settings.ANALYSIS_CACHE_SIZE
+        self.ttl_seconds = ttl_seconds or settings.ANALYSIS_CACHE_TTL_SECONDS
+        self.path = path if path is not None else settings.ANALYSIS_CACHE_PATH
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict() # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._db = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if self.path:
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS analysis_cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS ix_analysis_cache_expires_at ON analysis_cache (expires_at)")
+            self._db.commit()
+
+    @staticmethod
+    def make_key(content: str, account_context: dict = None) -> str:
+        raw = f"{normalize_content(content)}|{context_signature(account_context)}"
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None:
+                if item[0] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return item[1]
+                del self._entries[key]
+
+            if self._db is not None:
+                row = self._db.execute("SELECT value, expires_at FROM analysis_cache WHERE key = ?", (key,)).fetchone()
+                if row and row[1] > now:
+                    value = json.loads(row[0])
+                    self._remember(key, row[1], value)
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return value
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value: Dict[str, Any]):
+        now = time.time()
+        expires_at = now + self.ttl_seconds
+        with self._lock:
+            self._remember(key, expires_at, value)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO analysis_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(value), expires_at)
+                )
+                self._prune_disk(now)
+                self._db.commit()
+
+    def _remember(self, key: str, expires_at: float, value: Dict[str, Any]):
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _prune_disk(self, now: float):
+        # Same TTL and size bound as memory. All rows share one TTL, so the lowest expires_at
+        # are the oldest writes; both deletes walk the expires_at index.
+        self._db.execute("DELETE FROM analysis_cache WHERE expires_at <= ?", (now,))
+        self._db.execute(
+            "DELETE FROM analysis_cache WHERE expires_at < ("
+            "SELECT expires_at FROM analysis_cache ORDER BY expires_at DESC LIMIT 1 OFFSET ?)",
+            (self.max_entries - 1,)
+        )
+
+    def purge_expired(self):
+        now = time.time()
+        with self._lock:
+            for key in [k for k, (exp, _) in self._entries.items() if exp <= now]:
+                del self._entries[key]
+            if self._db is not None:
+                self._prune_disk(now)
+                self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0
+        }
+
+analysis_cache = AnalysisCache()
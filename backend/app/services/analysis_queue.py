@@ -0,0 +1,109 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+from app.core.config import settings
+from app.core.metrics import worker_errors
+from app.db.base import SessionLocal
+from app.models.models import JournalEntry
+from app.schemas.schemas import JournalResponse
+from app.services.event_hub import event_hub
+from app.services.gemini_service import GeminiService, gemini_service
+
+
+@dataclass
+class AnalysisJob:
+    entry_id: int
+    content: str
+    account_context: Optional[Dict[str, Any]] = None
+
+
+class AnalysisQueue:
+    """
+    Bounded background pool for journal AI analysis.
+    Journal entries are saved first; the analysis runs here with a concurrency cap
+    (one job per worker), a per-attempt timeout and retries with backoff, then the
+    entry is updated and a journal.updated event is pushed to clients.
+    """
+    def __init__(self, service: GeminiService = None, workers: int = None, max_pending: int = None,
+                 timeout_seconds: float = None, retries: int = None):
+        self.service = service or gemini_service
+        self.workers = workers or settings.ANALYSIS_WORKERS
+        self.max_pending = max_pending or settings.ANALYSIS_QUEUE_SIZE
+        self.timeout_seconds = timeout_seconds or settings.ANALYSIS_TIMEOUT_SECONDS
+        self.retries = retries if retries is not None else settings.ANALYSIS_RETRIES
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    def start(self):
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+
+    def submit(self, job: AnalysisJob) -> bool:
+        """
+        Enqueue without waiting. False if the pool isn't running or is full.
+        """
+        if self._queue is None:
+            return False
+        try:
+            self._queue.put_nowait(job)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    async def analyze(self, job: AnalysisJob) -> Dict[str, Any]:
+        delay = 0.5
+        for attempt in range(self.retries + 1):
+            try:
+                return await asyncio.wait_for(
+                    self.service.generate_analysis(job.content, job.account_context),
+                    timeout=self.timeout_seconds
+                )
+            except Exception as e:
+                print(f"Gemini Error (attempt {attempt + 1}/{self.retries + 1}) for journal #{job.entry_id}: {e!r}")
+                if attempt < self.retries:
+                    await asyncio.sleep(delay)
+                    delay *= 2
+        # Out of attempts, don't leave the entry without a reply
+        return self.service.local_analysis(job.content)
+
+    @staticmethod
+    def store(entry_id: int, analysis: Dict[str, Any]) -> Optional[JournalResponse]:
+        with SessionLocal() as db:
+            entry = db.get(JournalEntry, entry_id)
+            if entry is None:
+                return None
+            entry.sentiment_score = analysis.get("sentiment_score")
+            entry.emotional_tags = analysis.get("emotional_tags")
+            entry.ai_feedback = analysis.get("ai_feedback")
+            db.commit()
+            db.refresh(entry)
+            return JournalResponse.model_validate(entry)
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                analysis = await self.analyze(job)
+                response = await asyncio.to_thread(self.store, job.entry_id, analysis)
+                if response is not None:
+                    event_hub.publish("journal.updated", response)
+            except Exception as e:
+                print(f"Journal Analysis Error for #{job.entry_id}: {e}")
+                worker_errors.inc("analysis_queue")
+            finally:
+                self._queue.task_done()
+
+analysis_queue = AnalysisQueue()
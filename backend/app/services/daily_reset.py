@@ -0,0 +1,203 @@
+import asyncio
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Optional
+from zoneinfo import ZoneInfo
+from sqlalchemy import and_, case, func, literal, select, true, update
+from sqlalchemy.orm import Session, sessionmaker
+from app.core.config import settings
+from app.core.metrics import worker_errors
+from app.db.base import SessionLocal, dialect_insert
+from app.models.models import Account, DailySummary, SyncCursor, Trade
+from app.services.account_sync import account_sync
+from app.services.risk_state import risk_state_cache
+
+ROLLOVER_CURSOR = "daily.rollover"
+
+
+def _aware(ts: datetime) -> datetime:
+    return ts.replace(tzinfo=timezone.utc) if ts.tzinfo is None else ts # SQLite hands back naive UTC
+
+
+@dataclass
+class RolloverResult:
+    day: Optional[date] = None # Trading day archived, None if no rollover was due
+    archived: int = 0
+    reset: int = 0
+    unlocked: int = 0
+
+
+class DailyResetScheduler:
+    """
+    Owns the trading day. Sleeps until the next boundary (DAILY_RESET_TIME in
+    DAILY_RESET_TIMEZONE) or lockout expiry, then, in one transaction:
+      - archives every account's day into daily_summaries (one INSERT ... SELECT)
+      - resets trades_today_count / current_daily_loss across all accounts (one UPDATE)
+      - unlocks accounts whose lockout is over: a rollover has passed since the violation
+        and LOCKOUT_MIN_HOURS have elapsed
+    Reserved risk of trades still open carries over. The last boundary rolled over is kept
+    in sync_cursors and claimed by compare-and-swap, so a restart catches up on a missed
+    boundary exactly once and two instances can't both run it. The very first start only
+    records the current trading day: the counters it finds are today's, resetting them
+    would lift a lockout mid-day.
+    Requests never do date math: they read counters that are already reset.
+    """
+    def __init__(self, session_factory: sessionmaker = None):
+        self.session_factory = session_factory or SessionLocal
+        self.tz = ZoneInfo(settings.DAILY_RESET_TIMEZONE)
+        hour, minute = settings.DAILY_RESET_TIME.split(":")
+        self.reset_time = time(int(hour), int(minute))
+        self.lockout_min = timedelta(hours=settings.LOCKOUT_MIN_HOURS)
+        self._task: Optional[asyncio.Task] = None
+
+    # --- Boundaries ---
+    def _boundary_on(self, day: date) -> datetime:
+        return datetime.combine(day, self.reset_time, tzinfo=self.tz).astimezone(timezone.utc)
+
+    def day_start(self, now: datetime = None) -> datetime:
+        """Start of the current trading day (UTC)."""
+        now = now or datetime.now(timezone.utc)
+        today = now.astimezone(self.tz).date()
+        boundary = self._boundary_on(today)
+        return boundary if boundary <= now else self._boundary_on(today - timedelta(days=1))
+
+    def next_boundary(self, now: datetime = None) -> datetime:
+        now = now or datetime.now(timezone.utc)
+        return self._boundary_on(self.day_start(now).astimezone(self.tz).date() + timedelta(days=1))
+
+    def is_current_day(self, ts: datetime, now: datetime = None) -> bool:
+        return _aware(ts) >= self.day_start(now)
+
+    # --- Work ---
+    def run_due(self, now: datetime = None) -> RolloverResult:
+        """
+        Rollover if a boundary passed since the last one, then lockout expiry. Blocking.
+        """
+        now = now or datetime.now(timezone.utc)
+        boundary = self.day_start(now)
+        with self.session_factory() as db:
+            result = self._rollover(db, boundary, now)
+            result.unlocked = self._expire_lockouts(db, boundary, now)
+            db.commit()
+        if result.reset or result.unlocked:
+            # Bulk UPDATEs bypass the ORM events that keep these in step
+            risk_state_cache.invalidate()
+            account_sync.load_snapshot()
+        return result
+
+    def _rollover(self, db: Session, boundary: datetime, now: datetime) -> RolloverResult:
+        boundary_us = int(boundary.timestamp() * 1_000_000)
+        # First run ever: seed with the current trading day, nothing to roll over yet
+        db.execute(
+            dialect_insert(db)(SyncCursor)
+            .values(name=ROLLOVER_CURSOR, last_time=boundary_us, updated_at=now)
+            .on_conflict_do_nothing()
+        )
+        previous = db.scalar(select(SyncCursor.last_time).where(SyncCursor.name == ROLLOVER_CURSOR))
+        if previous >= boundary_us:
+            return RolloverResult()
+        # Claim this boundary, only one process gets the row
+        claimed = db.execute(
+            update(SyncCursor)
+            .where(SyncCursor.name == ROLLOVER_CURSOR, SyncCursor.last_time == previous)
+            .values(last_time=boundary_us, updated_at=now)
+        ).rowcount
+        if not claimed:
+            return RolloverResult()
+
+        # The period being closed
+        start = datetime.fromtimestamp(previous / 1_000_000, tz=timezone.utc)
+        day = start.astimezone(self.tz).date()
+
+        closed_in_period = and_(
+            Trade.account_id == Account.id,
+            Trade.status == "CLOSED",
+            Trade.exit_time >= start,
+            Trade.exit_time < boundary
+        )
+        summary = select(
+            Account.id,
+            literal(day),
+            Account.trades_today_count,
+            select(func.count()).where(closed_in_period).scalar_subquery(),
+            select(func.count()).where(closed_in_period, Trade.pnl > 0).scalar_subquery(),
+            -Account.current_daily_loss,
+            Account.max_daily_loss,
+            func.coalesce(Account.last_violation_time >= start, False),
+            Account.balance,
+            literal(now)
+        ).where(true()) # SQLite can't tell an upsert's ON CONFLICT from a join clause without a WHERE
+        archived = db.execute(
+            dialect_insert(db)(DailySummary)
+            .from_select(["account_id", "day", "trades", "closed_trades", "wins", "net_pnl", "max_daily_loss",
+                          "hit_lockout", "balance", "created_at"], summary)
+            .on_conflict_do_nothing(index_elements=["account_id", "day"])
+        ).rowcount
+
+        reset = db.execute(
+            update(Account).values(
+                trades_today_count=0,
+                current_daily_loss=0.0,
+                # Locked without a recorded violation: nothing to time it by, the day's end frees it
+                locked=case((Account.last_violation_time.is_(None), False), else_=Account.locked)
+            ),
+            execution_options={"synchronize_session": False}
+        ).rowcount
+        return RolloverResult(day=day, archived=archived, reset=reset)
+
+    def _expire_lockouts(self, db: Session, boundary: datetime, now: datetime) -> int:
+        return db.execute(
+            update(Account)
+            .where(
+                Account.locked.is_(True),
+                Account.last_violation_time < boundary,
+                Account.last_violation_time <= now - self.lockout_min
+            )
+            .values(locked=False),
+            execution_options={"synchronize_session": False}
+        ).rowcount
+
+    def next_wake(self, now: datetime = None) -> datetime:
+        """Next boundary, or an earlier lockout expiry (violations before today's boundary)."""
+        now = now or datetime.now(timezone.utc)
+        wake = self.next_boundary(now)
+        if self.lockout_min:
+            boundary = self.day_start(now)
+            with self.session_factory() as db:
+                oldest = db.scalar(
+                    select(func.min(Account.last_violation_time))
+                    .where(Account.locked.is_(True), Account.last_violation_time < boundary)
+                )
+            if oldest is not None:
+                wake = min(wake, max(_aware(oldest) + self.lockout_min, now))
+        return wake
+
+    # --- Background loop ---
+    async def run(self):
+        while True:
+            try:
+                result = await asyncio.to_thread(self.run_due)
+                if result.day is not None or result.unlocked:
+                    print(f"Daily rollover: {result.day} archived for {result.archived} accounts, {result.reset} reset, {result.unlocked} unlocked")
+                wake = await asyncio.to_thread(self.next_wake)
+                delay = (wake - datetime.now(timezone.utc)).total_seconds()
+            except Exception as e:
+                print(f"Daily Reset Error: {e}")
+                worker_errors.inc("daily_reset")
+                delay = settings.DAILY_RESET_MAX_SLEEP_SECONDS
+            await asyncio.sleep(min(max(delay, 0.0), settings.DAILY_RESET_MAX_SLEEP_SECONDS))
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+daily_reset = DailyResetScheduler()
@@ -2,18 +2,79 @@ import time
 import hmac
 import hashlib
 import json
-import requests
+import httpx
+from typing import TYPE_CHECKING, Optional
 from urllib.parse import urlparse, urlencode
 from app.core.config import settings
+from app.core.metrics import delta_request_seconds
+from app.services.price_book import PriceBook, price_book
+from app.services.price_cache import MarkPriceCache, PriceQuote
+from app.services.rate_limiter import MARK_PRICE, ORDER, WALLET, QueueRejected, RequestScheduler, delta_scheduler
 
+if TYPE_CHECKING:
+    import requests
 
 
-class DeltaService:
-    def __init__(self):
-        self.api_key = settings.DELTA_API_KEY
-        self.api_secret = settings.DELTA_API_SECRET
-        self.base_url = settings.DELTA_BASE_URL
+# Path parameters templated out of the metrics label (client order ids are unbounded)
+ENDPOINT_TEMPLATES = (
+    ("/orders/client_order_id/", "/orders/client_order_id/{client_order_id}"),
+    ("/tickers/", "/tickers/{symbol}"),
+)
+
+def endpoint_label(endpoint: str) -> str:
+    for prefix, template in ENDPOINT_TEMPLATES:
+        if endpoint.startswith(prefix):
+            return template
+    return endpoint
+
+def request_lane(method: str, endpoint: str) -> str:
+    # Order placement and the submit path's lookups first, then tickers, everything else is background
+    if (method == "POST" and endpoint == "/orders") or endpoint.startswith("/orders/client_order_id/"):
+        return ORDER
+    if endpoint.startswith("/tickers/"):
+        return MARK_PRICE
+    return WALLET
+
+RATE_LIMIT_RETRIES = 1 # A 429 is waited out (scheduler pause) and resent this many times
+
+
+class DeltaAPIError(Exception):
+    """
+    Delta answered with an error status. A 4xx means the request was refused;
+    a 5xx (gateway errors etc.) leaves it unknown whether it was applied.
+    """
+    def __init__(self, message: str, status_code: int = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class DeltaRateLimited(DeltaAPIError):
+    """
+    Held back by the client-side rate limiter (lane queue full or no turn in time), never
+    sent. Carries status 429 so callers treat it like Delta refusing the request.
+    """
+
+
+class DeltaConnectionError(Exception):
+    """
+    No complete response (timeout, reset, DNS). The request may or may not have been applied.
+    """
+
+
+class BaseDeltaService:
+    """
+    Signing / payload logic shared by the blocking and the async Delta clients.
+    Transport (and connection pooling) is left to the subclasses; both wait for their turn
+    on the same RequestScheduler (rate limit, priority lanes) before every request.
+    """
+    def __init__(self, base_url: str = None, api_key: str = None, api_secret: str = None, scheduler: RequestScheduler = None):
+        self.api_key = api_key if api_key is not None else settings.DELTA_API_KEY
+        self.api_secret = api_secret if api_secret is not None else settings.DELTA_API_SECRET
+        self.base_url = base_url or settings.DELTA_BASE_URL
         self.enabled = bool(self.api_key and self.api_secret)
+        self.timeout = settings.DELTA_TIMEOUT_SECONDS
+        # Shared by default: Delta's quota is per API key, not per client object
+        self.scheduler = scheduler or delta_scheduler
 
     def _generate_signature(self, method: str, path: str, query_params: str, payload_str: str, timestamp: str) -> str:
         """
@@ -28,29 +89,32 @@ class DeltaService:
         ).hexdigest()
         return signature
 
-    def request(self, method: str, endpoint: str, params: dict = None, payload: dict = None):
+    def _prepare_request(self, method: str, endpoint: str, params: dict = None, payload: dict = None):
+        """
+        Returns (full_url, headers, body) for a signed Delta request.
+        """
         if not self.enabled:
             raise Exception("Delta Exchange API Keys not configured.")
 
         timestamp = str(int(time.time()))
-        
+
         path = f"/v2{endpoint}" # Assuming V2, but check docs if strict
         # Note: Delta path in signature usually includes /v2
-        
+
         # Prepare body and query
         # Use compact JSON separators to ensure consistency and minimize size
         payload_str = json.dumps(payload, separators=(',', ':')) if payload else ""
         query_str = urlencode(params) if params else ""
-        
+
         full_url = f"{self.base_url}{path}"
         if query_str:
             full_url += f"?{query_str}"
 
         signature = self._generate_signature(
-            method.upper(), 
-            path, 
-            query_str, 
-            payload_str, 
+            method.upper(),
+            path,
+            query_str,
+            payload_str,
             timestamp
         )
 
@@ -64,66 +128,269 @@ class DeltaService:
         if payload:
             headers["Content-Type"] = "application/json"
 
+        return full_url, headers, (payload_str if payload else None)
+
+    @staticmethod
+    def _throttled(e: QueueRejected) -> DeltaRateLimited:
+        return DeltaRateLimited(f"Rate limited: {e}", 429)
+
+    @staticmethod
+    def _delta_error(response, exc: Exception) -> Exception:
+        # Parse Delta specific error if possible
+        error_msg = f"HTTP Error: {str(exc)}"
         try:
-            response = requests.request(
-                method, 
-                full_url, 
-                headers=headers, 
-                data=payload_str if payload else None,
-                timeout=5
-            )
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.HTTPError as e:
-            # Parse Delta specific error if possible
-            error_msg = f"HTTP Error: {str(e)}"
-            try:
-                # Try to get more details from response text
-                print(f"Debug - Response Text: {e.response.text}")
-                err_data = e.response.json()
-                error_msg = f"Delta API Error: {err_data}"
-            except:
-                pass
-            raise Exception(error_msg)
-        except Exception as e:
-            raise Exception(f"Connection Failed: {str(e)}")
+            # Try to get more details from response text
+            print(f"Debug - Response Text: {response.text}")
+            err_data = response.json()
+            error_msg = f"Delta API Error: {err_data}"
+        except:
+            pass
+        return DeltaAPIError(error_msg, getattr(response, "status_code", None))
 
-    def place_order(self, symbol: str, side: str, size: float, limit_price: float = None):
-        """
-        Places an order on Delta Exchange.
-        Side: buy | sell (converted from LONG/SHORT)
-        """
+    @staticmethod
+    def _order_payload(symbol: str, side: str, size: float, limit_price: float = None, reduce_only: bool = False, client_order_id: str = None) -> dict:
         # Map internal 'LONG'/'SHORT' to Delta 'buy'/'sell' or ensure correctness
         # Delta usually uses 'buy' / 'sell' for spot/futures
         delta_side = "buy" if side.lower() == "long" else "sell" if side.lower() == "short" else side.lower()
-        
+
         # Determine order type
         order_type = "limit_order" if limit_price and limit_price > 0 else "market_order"
-        
+
         payload = {
             "product_symbol": symbol,
             "size": size,
             "side": delta_side,
             "order_type": order_type
         }
-        
+
         if order_type == "limit_order":
             payload["limit_price"] = str(limit_price)
 
-        return self.request("POST", "/orders", payload=payload)
+        # Closing orders can only shrink the position, never flip it
+        if reduce_only:
+            payload["reduce_only"] = "true"
+
+        # Our id for the order, lets a retry after a timeout look the order up instead of doubling it
+        if client_order_id:
+            payload["client_order_id"] = client_order_id
+
+        return payload
+
+    @staticmethod
+    def parse_order_id(data: dict) -> Optional[str]:
+        # place_order response: { "result": { "id": 123, ... }, "success": true }
+        order_id = (data or {}).get("result", {}).get("id")
+        return str(order_id) if order_id is not None else None
+
+    @staticmethod
+    def _parse_mark_price(data: dict) -> float:
+        # Returns { "result": { "mark_price": ... }, "success": true }
+        result = data.get("result", {})
+        return float(result.get("mark_price", 0))
+
+
+class DeltaService(BaseDeltaService):
+    """
+    Blocking client. Keeps one pooled keep-alive requests.Session so repeated calls
+    reuse TCP+TLS connections to DELTA_BASE_URL instead of handshaking every time.
+    """
+    def __init__(self, base_url: str = None, api_key: str = None, api_secret: str = None, scheduler: RequestScheduler = None):
+        super().__init__(base_url, api_key, api_secret, scheduler)
+        self._session = None
+
+    @property
+    def session(self) -> "requests.Session":
+        if self._session is None:
+            # Only the background wallet sync uses the blocking client, requests loads with it
+            import requests
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=1, # We only ever talk to DELTA_BASE_URL
+                pool_maxsize=settings.DELTA_POOL_SIZE
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            self._session = session
+        return self._session
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+    def request(self, method: str, endpoint: str, params: dict = None, payload: dict = None, lane: str = None):
+        import requests
+        lane = lane or request_lane(method, endpoint)
+        for attempt in range(RATE_LIMIT_RETRIES + 1):
+            try:
+                self.scheduler.acquire(lane)
+            except QueueRejected as e:
+                raise self._throttled(e)
+            # Signed after the wait, the timestamp must be fresh when Delta sees it
+            full_url, headers, body = self._prepare_request(method, endpoint, params, payload)
+
+            start = time.perf_counter()
+            status = "error"
+            try:
+                response = self.session.request(
+                    method,
+                    full_url,
+                    headers=headers,
+                    data=body,
+                    timeout=self.timeout
+                )
+                status = str(response.status_code)
+                self.scheduler.record(response.status_code, response.headers, lane)
+                if response.status_code == 429 and attempt < RATE_LIMIT_RETRIES:
+                    continue
+                response.raise_for_status()
+                return response.json()
+            except requests.exceptions.HTTPError as e:
+                raise self._delta_error(e.response, e)
+            except Exception as e:
+                raise DeltaConnectionError(f"Connection Failed: {str(e)}")
+            finally:
+                delta_request_seconds.observe(time.perf_counter() - start, "sync", method, endpoint_label(endpoint), status)
+
+    def place_order(self, symbol: str, side: str, size: float, limit_price: float = None, reduce_only: bool = False, client_order_id: str = None):
+        """
+        Places an order on Delta Exchange.
+        Side: buy | sell (converted from LONG/SHORT)
+        """
+        return self.request("POST", "/orders", payload=self._order_payload(symbol, side, size, limit_price, reduce_only, client_order_id))
 
     def get_wallet_balance(self):
         return self.request("GET", "/wallet/balances")
 
+    def get_order_by_client_id(self, client_order_id: str) -> Optional[dict]:
+        """The order placed with client_order_id, None if Delta has no such order."""
+        try:
+            return self.request("GET", f"/orders/client_order_id/{client_order_id}").get("result")
+        except DeltaAPIError as e:
+            if e.status_code == 404:
+                return None
+            raise
+
+    def iter_history(self, endpoint: str, start_time: int = None, end_time: int = None, page_size: int = None):
+        """
+        Pages through a Delta history endpoint (/fills, /orders/history), newest first,
+        yielding one list of items per request. start_time / end_time are microseconds.
+        """
+        params = {"page_size": page_size or settings.RECONCILE_PAGE_SIZE}
+        if start_time is not None:
+            params["start_time"] = start_time
+        if end_time is not None:
+            params["end_time"] = end_time
+        while True:
+            data = self.request("GET", endpoint, params=params)
+            page = data.get("result") or []
+            if page:
+                yield page
+            # Delta: {"result": [...], "meta": {"after": "<cursor>", "before": ...}}, no "after" on the last page
+            after = (data.get("meta") or {}).get("after")
+            if not after or not page:
+                return
+            params["after"] = after
+
     def get_mark_price(self, symbol: str) -> float:
         # Delta Ticker Endpoint: /v2/tickers/{symbol}
-        # Returns { "result": { "mark_price": ... }, "success": true }
         try:
             data = self.request("GET", f"/tickers/{symbol}")
-            result = data.get("result", {})
-            return float(result.get("mark_price", 0))
+            return self._parse_mark_price(data)
         except Exception as e:
              print(f"Error fetching mark price for {symbol}: {e}")
              return 0.0
 
+
+class AsyncDeltaService(BaseDeltaService):
+    """
+    Non-blocking client on a pooled httpx.AsyncClient, for async routes so exchange
+    I/O doesn't tie up a threadpool worker. Same API as DeltaService, but awaitable.
+    Mark prices come from the streaming PriceBook when it is fresh, REST otherwise.
+    """
+    def __init__(self, base_url: str = None, api_key: str = None, api_secret: str = None, price_book: PriceBook = None, scheduler: RequestScheduler = None):
+        super().__init__(base_url, api_key, api_secret, scheduler)
+        self._client = None
+        self.mark_prices = MarkPriceCache(self._fetch_mark_price)
+        self.price_book = price_book
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Created lazily so it binds to the running event loop
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=settings.DELTA_POOL_SIZE,
+                    max_keepalive_connections=settings.DELTA_POOL_SIZE
+                ),
+                timeout=self.timeout
+            )
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def request(self, method: str, endpoint: str, params: dict = None, payload: dict = None, lane: str = None):
+        lane = lane or request_lane(method, endpoint)
+        for attempt in range(RATE_LIMIT_RETRIES + 1):
+            try:
+                await self.scheduler.acquire_async(lane)
+            except QueueRejected as e:
+                raise self._throttled(e)
+            full_url, headers, body = self._prepare_request(method, endpoint, params, payload)
+
+            start = time.perf_counter()
+            status = "error"
+            try:
+                response = await self.client.request(method, full_url, headers=headers, content=body)
+                status = str(response.status_code)
+                self.scheduler.record(response.status_code, response.headers, lane)
+                if response.status_code == 429 and attempt < RATE_LIMIT_RETRIES:
+                    continue
+                response.raise_for_status()
+                return response.json()
+            except httpx.HTTPStatusError as e:
+                raise self._delta_error(e.response, e)
+            except Exception as e:
+                raise DeltaConnectionError(f"Connection Failed: {str(e)}")
+            finally:
+                delta_request_seconds.observe(time.perf_counter() - start, "async", method, endpoint_label(endpoint), status)
+
+    async def place_order(self, symbol: str, side: str, size: float, limit_price: float = None, reduce_only: bool = False, client_order_id: str = None):
+        return await self.request("POST", "/orders", payload=self._order_payload(symbol, side, size, limit_price, reduce_only, client_order_id))
+
+    async def get_wallet_balance(self):
+        return await self.request("GET", "/wallet/balances")
+
+    async def get_order_by_client_id(self, client_order_id: str) -> Optional[dict]:
+        try:
+            return (await self.request("GET", f"/orders/client_order_id/{client_order_id}")).get("result")
+        except DeltaAPIError as e:
+            if e.status_code == 404:
+                return None
+            raise
+
+    async def _fetch_mark_price(self, symbol: str) -> float:
+        data = await self.request("GET", f"/tickers/{symbol}")
+        return self._parse_mark_price(data)
+
+    async def get_mark_quote(self, symbol: str) -> Optional[PriceQuote]:
+        """
+        Mark price with its age. None if we have never seen a price for the symbol.
+        """
+        if self.price_book is not None:
+            quote = self.price_book.get(symbol)
+            if quote is not None and quote.age <= settings.PRICE_BOOK_MAX_AGE_SECONDS:
+                return quote
+        # Feed down, lagging or symbol not subscribed -> REST (cached, single-flight)
+        return await self.mark_prices.get_quote(symbol)
+
+    async def get_mark_price(self, symbol: str) -> float:
+        quote = await self.get_mark_quote(symbol)
+        return quote.price if quote else 0.0
+
 delta_service = DeltaService()
+async_delta_service = AsyncDeltaService(price_book=price_book)
@@ -0,0 +1,97 @@
+import asyncio
+import itertools
+import json
+import threading
+from typing import Any, Optional, Set
+from fastapi.encoders import jsonable_encoder
+from app.core.config import settings
+
+
+class Event:
+    """
+    A change event, serialized exactly once no matter how many clients receive it.
+    """
+    __slots__ = ("id", "type", "json", "_sse")
+
+    def __init__(self, id: int, type: str, data: Any):
+        self.id = id
+        self.type = type
+        self.json = json.dumps({"id": id, "type": type, "data": jsonable_encoder(data)}, separators=(',', ':'))
+        self._sse = None
+
+    @property
+    def sse(self) -> str:
+        # SSE frame, built lazily and shared by every SSE subscriber
+        if self._sse is None:
+            self._sse = f"id: {self.id}\nevent: {self.type}\ndata: {self.json}\n\n"
+        return self._sse
+
+
+class EventHub:
+    """
+    In-process fan-out for account / trade / journal change events.
+    Each connection gets a bounded queue; a client that can't keep up is dropped
+    (its stream ends and it reconnects + refetches) instead of growing memory.
+    publish() is safe to call from threadpool workers as well as from the event loop.
+    """
+    def __init__(self, queue_size: int = None):
+        self.queue_size = queue_size or settings.EVENT_QUEUE_SIZE
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._seq = itertools.count(1)
+        self._seq_lock = threading.Lock()
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def bind(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+
+    def publish(self, type: str, data: Any) -> Optional[Event]:
+        if self._loop is None or not self._subscribers:
+            # Nobody listening, skip the serialization entirely
+            return None
+        with self._seq_lock:
+            event = Event(next(self._seq), type, data)
+
+        try:
+            in_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            in_loop = False
+        if in_loop:
+            self._fanout(event)
+        else:
+            self._loop.call_soon_threadsafe(self._fanout, event)
+        return event
+
+    def _fanout(self, event: Event):
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Slow consumer: drop it, None tells the stream to close
+                self._subscribers.discard(queue)
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+
+    def close(self):
+        """
+        Ends every open stream (app shutdown).
+        """
+        for queue in list(self._subscribers):
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(None)
+        self._subscribers.clear()
+
+event_hub = EventHub()
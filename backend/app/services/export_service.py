@@ -0,0 +1,157 @@
+import csv
+import io
+from datetime import datetime
+from typing import Iterator, List, Optional, Sequence
+from sqlalchemy import Select, Text, cast, func, select
+from sqlalchemy.engine import Result
+from app.core.config import settings
+from app.models.models import Trade
+
+# Parquet readers prefer big row groups, fetched batches are buffered up to this many rows
+PARQUET_ROW_GROUP_ROWS = 64 * 1024
+
+# Exportable trade columns, in default output order
+EXPORT_COLUMNS = {
+    "id": Trade.id,
+    "account_id": Trade.account_id,
+    "symbol": Trade.symbol,
+    "side": Trade.side,
+    "quantity": Trade.quantity,
+    "entry_price": Trade.entry_price,
+    "stop_loss": Trade.stop_loss,
+    "exit_price": Trade.exit_price,
+    "pnl": Trade.pnl,
+    "r_multiple": Trade.r_multiple,
+    "entry_time": Trade.entry_time,
+    "exit_time": Trade.exit_time,
+    "status": Trade.status,
+    # Raw JSON text straight from the DB, no decode / re-encode per row
+    "tags": func.nullif(cast(Trade.tags, Text), "null").label("tags"),
+}
+
+
+def parse_columns(columns: Optional[str]) -> List[str]:
+    """
+    "symbol,pnl" -> ["symbol", "pnl"]; all columns when empty. Raises ValueError on unknown names.
+    """
+    if not columns:
+        return list(EXPORT_COLUMNS)
+    names = [c.strip() for c in columns.split(",") if c.strip()]
+    unknown = [c for c in names if c not in EXPORT_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown column(s): {', '.join(unknown)}. Available: {', '.join(EXPORT_COLUMNS)}")
+    return names
+
+
+def trade_query(account_id: int, columns: Sequence, start: datetime = None, end: datetime = None, symbol: str = None) -> Select:
+    """
+    Filtered select over trades for one account. [start, end) on entry_time.
+    """
+    stmt = select(*columns).where(Trade.account_id == account_id)
+    if start:
+        stmt = stmt.where(Trade.entry_time >= start)
+    if end:
+        stmt = stmt.where(Trade.entry_time < end)
+    if symbol:
+        stmt = stmt.where(Trade.symbol == symbol)
+    # yield_per -> server-side cursor where the driver has one, rows arrive in batches instead of one .all()
+    return stmt.execution_options(yield_per=settings.EXPORT_FETCH_SIZE)
+
+
+class ExportService:
+    """
+    Bulk trade exports streamed straight from a (yield_per) result, one batch of rows
+    per output chunk, so memory is bounded by one fetch batch (one row group for Parquet)
+    whatever the history size.
+    """
+    def query(self, account_id: int, columns: List[str], start: datetime = None, end: datetime = None, symbol: str = None) -> Select:
+        stmt = trade_query(account_id, [EXPORT_COLUMNS[c] for c in columns], start, end, symbol)
+        return stmt.order_by(Trade.entry_time, Trade.id)
+
+    def iter_csv(self, result: Result, columns: List[str]) -> Iterator[bytes]:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        for rows in result.partitions():
+            writer.writerows(rows)
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode()
+
+    def iter_arrow(self, result: Result, columns: List[str], fmt: str = "parquet") -> Iterator[bytes]:
+        """
+        Columnar export, fmt "parquet" (row groups of up to PARQUET_ROW_GROUP_ROWS) or "arrow"
+        (IPC stream, one record batch per fetched batch).
+        Needs pyarrow, imported here so the API runs without it.
+        """
+        import pyarrow as pa
+
+        schema = pa.schema([(c, _arrow_type(pa, c)) for c in columns])
+        sink = _ChunkSink()
+        if fmt == "parquet":
+            import pyarrow.parquet as pq
+            writer = pq.ParquetWriter(sink, schema, compression="snappy")
+        else:
+            writer = pa.ipc.new_stream(sink, schema)
+
+        pending = []
+        pending_rows = 0
+        try:
+            for rows in result.partitions():
+                values = list(zip(*rows))
+                batch = pa.record_batch([pa.array(v, type=f.type) for v, f in zip(values, schema)], schema=schema)
+                if fmt == "parquet":
+                    pending.append(batch)
+                    pending_rows += len(rows)
+                    if pending_rows < PARQUET_ROW_GROUP_ROWS:
+                        continue
+                    writer.write_table(pa.Table.from_batches(pending), row_group_size=pending_rows)
+                    pending, pending_rows = [], 0
+                else:
+                    writer.write_batch(batch)
+                chunk = sink.drain()
+                if chunk:
+                    yield chunk
+            if pending:
+                writer.write_table(pa.Table.from_batches(pending), row_group_size=pending_rows)
+        finally:
+            writer.close()
+        yield sink.drain()
+
+
+def _arrow_type(pa, column: str):
+    if column in ("id", "account_id"):
+        return pa.int64()
+    if column in ("quantity", "entry_price", "stop_loss", "exit_price", "pnl", "r_multiple"):
+        return pa.float64()
+    if column in ("entry_time", "exit_time"):
+        return pa.timestamp("us", tz="UTC")
+    return pa.string() # symbol, side, status, tags (JSON text)
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file the Arrow / Parquet writers flush into; drain() hands back what's been written so far."""
+    def __init__(self):
+        self._parts: List[bytes] = []
+        self._pos = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._parts.append(data)
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+export_service = ExportService()
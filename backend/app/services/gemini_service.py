@@ -1,20 +1,52 @@
-import google.generativeai as genai
+import asyncio
+import time
 from app.core.config import settings
+from app.core.metrics import gemini_request_seconds
+from app.services.analysis_cache import AnalysisCache, analysis_cache
+from app.services.sentiment_classifier import sentiment_classifier
 import json
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 class GeminiService:
-    def __init__(self):
+    def __init__(self, model=None, cache: AnalysisCache = None):
         self.api_key = settings.GEMINI_API_KEY
-        if self.api_key:
+        self.cache = cache or analysis_cache
+        # Injected model (tests / benchmarks), anything with generate_content(_async)
+        self._model = model
+
+    @property
+    def model(self):
+        # The SDK takes most of a second to import, only pay for it once Gemini is actually asked
+        if self._model is None and self.api_key:
+            import google.generativeai as genai
             genai.configure(api_key=self.api_key)
-            self.model = genai.GenerativeModel('gemini-2.0-flash-lite-preview-02-05')
-        else:
-            self.model = None
+            self._model = genai.GenerativeModel('gemini-2.0-flash-lite-preview-02-05')
+        return self._model
 
-    async def analyze_journal(self, content: str, account_context: dict = None) -> Dict[str, Any]:
+    async def _generate(self, prompt: str) -> str:
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            # Never call the blocking generate_content on the event loop
+            if hasattr(self.model, "generate_content_async"):
+                response = await self.model.generate_content_async(prompt)
+            else:
+                response = await asyncio.to_thread(self.model.generate_content, prompt)
+            text = response.text
+            outcome = "ok"
+            return text
+        finally:
+            gemini_request_seconds.observe(time.perf_counter() - start, outcome)
+
+    def cached_analysis(self, content: str, account_context: dict = None) -> Optional[Dict[str, Any]]:
         """
-        Analyzes journal entry/chat message and provides supportive AI coaching.
+        Previously generated analysis for an equivalent message + account state, if any.
+        """
+        return self.cache.get(self.cache.make_key(content, account_context))
+
+    async def generate_analysis(self, content: str, account_context: dict = None) -> Dict[str, Any]:
+        """
+        Remote Gemini analysis only (cache first). Raises on any failure so callers can retry / fall back.
         """
         if not self.model:
             return {
@@ -23,6 +55,11 @@ class GeminiService:
                 "ai_feedback": "I am offline (API Key Missing)."
             }
 
+        key = self.cache.make_key(content, account_context)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
         ctx = ""
         if account_context:
             ctx = f"Stats: Bal ${account_context.get('balance',0):.0f}, DL ${account_context.get('current_daily_loss',0):.0f}"
@@ -32,41 +69,58 @@ class GeminiService:
         User: "{content}"
         Reply JSON: {{ "sentiment_score": float, "emotional_tags": [str], "feedback": "short supportive tip" }}
         """
-        
+
+        text = await self._generate(prompt)
+        # Simple cleanup for json parsing if needed
+        text = text.replace('```json', '').replace('```', '').strip()
+        data = json.loads(text)
+        analysis = {
+            "sentiment_score": data.get("sentiment_score", 0.0),
+            "emotional_tags": data.get("emotional_tags", []),
+            "ai_feedback": data.get("feedback", "No feedback generated.")
+        }
+        # Only real model replies are cached, never the offline / fallback answers
+        self.cache.put(key, analysis)
+        return analysis
+
+    def local_analysis(self, content: str, fallback: bool = True) -> Dict[str, Any]:
+        """
+        Local classifier answer. fallback=True when standing in for a failed remote call.
+        """
+        result = sentiment_classifier.classify(content)
+        feedback = sentiment_classifier.feedback(result)
+        if fallback:
+            feedback = "I'm having trouble connecting to the neural network (Quota), but I'm still here. " + feedback
+        return {
+            "sentiment_score": result.sentiment_score,
+            "emotional_tags": result.tags,
+            "ai_feedback": feedback
+        }
+
+    def quick_analysis(self, content: str, detailed: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Fast path: the local classifier's answer when it is confident enough, else None
+        (escalate to Gemini). A detailed coaching request always escalates.
+        """
+        if detailed:
+            return None
+        result = sentiment_classifier.classify(content)
+        if result.confidence < settings.LOCAL_CLASSIFIER_MIN_CONFIDENCE:
+            return None
+        return {
+            "sentiment_score": result.sentiment_score,
+            "emotional_tags": result.tags,
+            "ai_feedback": sentiment_classifier.feedback(result)
+        }
+
+    async def analyze_journal(self, content: str, account_context: dict = None) -> Dict[str, Any]:
+        """
+        Analyzes journal entry/chat message and provides supportive AI coaching.
+        """
         try:
-            response = self.model.generate_content(prompt)
-            # Simple cleanup for json parsing if needed
-            text = response.text.replace('```json', '').replace('```', '').strip()
-            data = json.loads(text)
-            return {
-                "sentiment_score": data.get("sentiment_score", 0.0),
-                "emotional_tags": data.get("emotional_tags", []),
-                "ai_feedback": data.get("feedback", "No feedback generated.")
-            }
+            return await self.generate_analysis(content, account_context)
         except Exception as e:
             print(f"Gemini Error (Falling back to local): {e}")
-            # Fallback Heuristics
-            content_lower = content.lower()
-            tags = []
-            feedback = "I'm having trouble connecting to the neural network (Quota), but I'm still here. "
-            
-            if any(w in content_lower for w in ['fear', 'scared', 'afraid', 'loss', 'lost', 'break']):
-                tags = ['fear', 'anxiety']
-                score = -0.5
-                feedback += "It sounds like you're under pressure. Remember: stick to your plan. Stop trading if you are emotional."
-            elif any(w in content_lower for w in ['greed', 'win', 'won', 'profit', 'easy']):
-                tags = ['greed', 'overconfidence']
-                score = 0.5
-                feedback += "Great result, but stay humble. Don't give it back. Lock in your profits."
-            else:
-                tags = ['neutral']
-                score = 0.0
-                feedback += "Keep journaling. Tracking your state is the first step to mastery. What's your next move?"
-
-            return {
-                "sentiment_score": score,
-                "emotional_tags": tags,
-                "ai_feedback": feedback
-            }
+            return self.local_analysis(content)
 
 gemini_service = GeminiService()
@@ -0,0 +1,158 @@
+import asyncio
+import time
+import uuid
+from contextlib import contextmanager
+from typing import List, Optional, Tuple
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.metrics import order_stage_seconds
+from app.db.base import SessionLocal
+from app.models.models import Trade
+from app.schemas.schemas import TradeCreate, TradeResponse
+from app.services.daily_reset import daily_reset
+from app.services.delta_service import AsyncDeltaService, DeltaAPIError, DeltaConnectionError, async_delta_service
+from app.services.risk_engine import risk_engine, trade_risk
+
+
+def new_client_order_id() -> str:
+    # 32 hex chars, Delta's client_order_id limit
+    return uuid.uuid4().hex
+
+
+class StageTimer:
+    """Wall time per stage of one request, rendered as a Server-Timing header and fed to /metrics."""
+    def __init__(self):
+        self.stages: List[Tuple[str, float]] = []
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.stages.append((name, elapsed * 1000))
+            order_stage_seconds.observe(elapsed, name)
+
+    def header(self) -> str:
+        return ", ".join(f"{name};dur={ms:.1f}" for name, ms in self.stages)
+
+
+class OrderRejected(Exception):
+    """The exchange refused the order (or it never left), nothing is live."""
+
+
+class RiskLimitExceeded(Exception):
+    """The daily trade count or loss buffer was taken by the time the intent was recorded."""
+
+
+class OrderUnknown(Exception):
+    """Retries ran out without an answer, the order may be live. The intent stays PENDING."""
+
+
+class OrderService:
+    """
+    Entry order submission in three steps around one exchange call:
+      record_intent: PENDING trade (with its client order id) + its reservation of the day's
+                     trade count and loss buffer, one commit
+      submit:        place_order, retrying timeouts / 5xx. Before each retry the client order
+                     id is looked up on Delta, so an order that did land is never sent twice.
+      confirm:       PENDING -> OPEN with Delta's order id, a single UPDATE after the response
+    A crash between submit and confirm leaves a PENDING row that the reconciler resolves
+    by the same lookup.
+    """
+    def __init__(self, client: AsyncDeltaService = None):
+        self.client = client or async_delta_service
+        self.retries = settings.ORDER_SUBMIT_RETRIES
+        self.backoff_seconds = settings.ORDER_RETRY_BACKOFF_SECONDS
+
+    @staticmethod
+    def find(db: Session, client_order_id: str) -> Optional[Trade]:
+        return db.scalar(select(Trade).where(Trade.client_order_id == client_order_id))
+
+    @staticmethod
+    def record_intent(db: Session, account_id: int, trade_in: TradeCreate, entry_price: float, stop_loss: float) -> TradeResponse:
+        risk = trade_risk(trade_in.symbol, entry_price, stop_loss, trade_in.quantity)
+        with risk_engine.reservation_lock(db, account_id):
+            # Reserved at intent time so concurrent submissions can't both take the last of the
+            # budget, given back on reject / cancel / close
+            if risk_engine.reserve(db, account_id, risk) is None:
+                db.rollback()
+                raise RiskLimitExceeded(risk_engine.refusal_reason(db, account_id, risk))
+            trade = Trade(
+                account_id=account_id,
+                symbol=trade_in.symbol,
+                side=trade_in.side,
+                quantity=trade_in.quantity,
+                entry_price=entry_price, # Estimated or limit, corrected from fills by the reconciler
+                stop_loss=stop_loss,
+                risk_amount=risk,
+                status="PENDING",
+                client_order_id=trade_in.client_order_id or new_client_order_id(),
+                tags=[]
+            )
+            db.add(trade)
+            db.flush()
+            # Everything the response needs is known after the flush, no reload after commit
+            intent = TradeResponse.model_validate(trade)
+            db.commit()
+        return intent
+
+    async def submit(self, intent: TradeResponse, limit_price: float = None) -> dict:
+        last_error = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                await asyncio.sleep(self.backoff_seconds * 2 ** (attempt - 1))
+                # The previous attempt may have reached the book, only resend if Delta hasn't got it
+                try:
+                    existing = await self.client.get_order_by_client_id(intent.client_order_id)
+                except (DeltaAPIError, DeltaConnectionError) as e:
+                    last_error = e
+                    continue
+                if existing is not None:
+                    return {"success": True, "result": existing}
+            try:
+                return await self.client.place_order(
+                    symbol=intent.symbol,
+                    side=intent.side,
+                    size=int(intent.quantity), # Enforce integer lots
+                    limit_price=limit_price,
+                    client_order_id=intent.client_order_id
+                )
+            except DeltaAPIError as e:
+                if e.status_code is not None and e.status_code < 500:
+                    raise OrderRejected(str(e))
+                last_error = e
+            except DeltaConnectionError as e:
+                last_error = e
+            except Exception as e:
+                # Failed before anything was sent (e.g. no API keys)
+                raise OrderRejected(str(e))
+        raise OrderUnknown(str(last_error))
+
+    @staticmethod
+    def confirm(trade_id: int, order: dict):
+        """
+        PENDING -> OPEN with Delta's order id. Runs after the response went out, in its own
+        session; if it never runs the reconciler finds the order by client order id instead.
+        """
+        with SessionLocal() as db:
+            db.execute(
+                update(Trade)
+                .where(Trade.id == trade_id, Trade.status == "PENDING")
+                .values(status="OPEN", exchange_order_id=AsyncDeltaService.parse_order_id(order))
+            )
+            db.commit()
+
+    @staticmethod
+    def reject(db: Session, trade_id: int):
+        trade = db.get(Trade, trade_id)
+        if trade is None or trade.status != "PENDING":
+            return
+        trade.status = "REJECTED"
+        # The trade count only goes back if it was counted today, the rollover already zeroed older ones
+        risk_engine.release(db, trade.account_id, trade.risk_amount, trades=int(daily_reset.is_current_day(trade.entry_time)))
+        db.commit()
+
+order_service = OrderService()
@@ -0,0 +1,320 @@
+import asyncio
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+import numpy as np
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.metrics import worker_errors
+from app.db.base import SessionLocal
+from app.models.models import Trade
+from app.services.delta_service import async_delta_service
+from app.services.event_hub import event_hub
+from app.services.risk_engine import is_inverse_symbol, risk_engine
+
+
+def contract_multiplier(symbol: str, entry_price: float) -> float:
+    """
+    $ PnL per unit of quantity per $1 price move.
+    Linear: qty is coins -> 1.
+    Inverse: qty is USD notional, PnL is qty * (1/entry - 1/exit) coins, worth
+    qty * (exit - entry) / entry in USD at the exit price -> 1 / entry.
+    """
+    return 1.0 / entry_price if is_inverse_symbol(symbol) else 1.0
+
+
+def realized_pnl(symbol: str, side: str, quantity: float, entry_price: float, exit_price: float) -> float:
+    sign = 1.0 if side == "LONG" else -1.0
+    return sign * quantity * (exit_price - entry_price) * contract_multiplier(symbol, entry_price)
+
+
+def initial_risk(symbol: str, quantity: float, entry_price: float, stop_loss: Optional[float]) -> Optional[float]:
+    """
+    $ lost if the initial stop is hit (1R), same math as RiskEngine.validate_trade minus the fee buffer.
+    None for trades recorded without a stop.
+    """
+    if not stop_loss:
+        return None
+    risk = abs(entry_price - stop_loss) * quantity * contract_multiplier(symbol, entry_price)
+    return risk or None
+
+
+@dataclass(frozen=True)
+class PositionMarks:
+    """One mark-to-market pass. Arrays are aligned by position; NaN mark = no price for the symbol."""
+    marked_at: datetime
+    ids: np.ndarray
+    symbol_slots: np.ndarray
+    symbol_names: List[str]
+    marks: np.ndarray
+    unrealized_pnl: np.ndarray
+    open_r: np.ndarray
+    stop_hit: np.ndarray
+    by_symbol: Dict[str, float]
+    by_account: Dict[int, float]
+
+    @property
+    def total_unrealized(self) -> float:
+        return float(sum(self.by_symbol.values()))
+
+    def summary(self) -> Dict[str, Any]:
+        # Aggregates only, what gets pushed every tick
+        return {
+            "open": int(len(self.ids)),
+            "unrealized_pnl": round(self.total_unrealized, 2),
+            "by_symbol": {s: round(v, 2) for s, v in self.by_symbol.items()},
+            "stop_hit": self.ids[self.stop_hit].tolist(),
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        def num(v):
+            return None if np.isnan(v) else round(float(v), 4)
+        data = self.summary()
+        data["marked_at"] = self.marked_at
+        data["positions"] = [
+            {"id": int(i), "symbol": self.symbol_names[s], "mark": num(m), "unrealized_pnl": num(u), "open_r": num(r), "stop_hit": bool(h)}
+            for i, s, m, u, r, h in zip(self.ids, self.symbol_slots, self.marks, self.unrealized_pnl, self.open_r, self.stop_hit)
+        ]
+        return data
+
+
+class PositionEngine:
+    """
+    In-memory book of open trades kept as parallel NumPy columns, so a mark-to-market tick
+    is a single vectorized pass over every open position: gather each position's mark by
+    symbol slot, unrealized $ PnL, open R, stop breaches, then per-symbol / per-account
+    totals with bincount. Opening and closing are O(1) (append / swap-remove).
+    The DB stays the source of truth, the book is rebuilt from OPEN trades on start.
+    """
+    def __init__(self, capacity: int = 1024, interval_seconds: float = None):
+        self.interval_seconds = interval_seconds or settings.POSITION_MARK_INTERVAL_SECONDS
+        self._lock = threading.Lock()
+        self._rows: Dict[int, int] = {} # trade id -> row
+        self._symbol_slots: Dict[str, int] = {}
+        self._symbol_names: List[str] = []
+        self._alloc(capacity)
+        self._n = 0
+        self._marks: Optional[PositionMarks] = None
+        self._last_summary: Optional[Dict[str, Any]] = None
+        self._task: Optional[asyncio.Task] = None
+        self.ticks = 0
+
+    def _alloc(self, capacity: int):
+        self.ids = np.zeros(capacity, dtype=np.int64)
+        self.accounts = np.zeros(capacity, dtype=np.int64)
+        self.symbol_slots = np.zeros(capacity, dtype=np.intp)
+        self.signs = np.zeros(capacity) # +1 long, -1 short
+        self.quantities = np.zeros(capacity)
+        self.entries = np.zeros(capacity)
+        self.stops = np.full(capacity, np.nan)
+        self.multipliers = np.zeros(capacity) # contract_multiplier
+        self.risks = np.full(capacity, np.nan) # initial_risk, NaN = no stop
+
+    def _columns(self):
+        return (self.ids, self.accounts, self.symbol_slots, self.signs, self.quantities,
+                self.entries, self.stops, self.multipliers, self.risks)
+
+    def __len__(self) -> int:
+        return self._n
+
+    @property
+    def marks(self) -> Optional[PositionMarks]:
+        return self._marks
+
+    def symbols(self) -> List[str]:
+        with self._lock:
+            used = np.unique(self.symbol_slots[:self._n])
+            return [self._symbol_names[i] for i in used]
+
+    def _grow(self):
+        old = self._columns()
+        self._alloc(len(self.ids) * 2)
+        for src, dst in zip(old, self._columns()):
+            dst[:self._n] = src[:self._n]
+
+    def _add(self, trade_id: int, account_id: int, symbol: str, side: str, quantity: float, entry_price: float, stop_loss: Optional[float]):
+        if trade_id in self._rows:
+            return
+        if self._n == len(self.ids):
+            self._grow()
+        slot = self._symbol_slots.get(symbol)
+        if slot is None:
+            slot = self._symbol_slots[symbol] = len(self._symbol_names)
+            self._symbol_names.append(symbol)
+        i = self._n
+        self.ids[i] = trade_id
+        self.accounts[i] = account_id
+        self.symbol_slots[i] = slot
+        self.signs[i] = 1.0 if side == "LONG" else -1.0
+        self.quantities[i] = quantity
+        self.entries[i] = entry_price
+        self.stops[i] = stop_loss if stop_loss else np.nan
+        self.multipliers[i] = contract_multiplier(symbol, entry_price)
+        risk = initial_risk(symbol, quantity, entry_price, stop_loss)
+        self.risks[i] = risk if risk else np.nan
+        self._rows[trade_id] = i
+        self._n += 1
+
+    def add(self, trade: Trade):
+        with self._lock:
+            self._add(trade.id, trade.account_id, trade.symbol, trade.side, trade.quantity, trade.entry_price, trade.stop_loss)
+
+    def refresh(self, trade: Trade):
+        """Re-reads an open trade's entry / size / stop after they were corrected."""
+        self.remove(trade.id)
+        if trade.status == "OPEN":
+            self.add(trade)
+
+    def remove(self, trade_id: int) -> bool:
+        with self._lock:
+            i = self._rows.pop(trade_id, None)
+            if i is None:
+                return False
+            last = self._n - 1
+            if i != last:
+                # Move the last row into the hole
+                for col in self._columns():
+                    col[i] = col[last]
+                self._rows[int(self.ids[i])] = i
+            self._n = last
+            return True
+
+    def load(self, db: Session) -> int:
+        """Rebuilds the book from OPEN trades."""
+        stmt = (
+            select(Trade.id, Trade.account_id, Trade.symbol, Trade.side, Trade.quantity, Trade.entry_price, Trade.stop_loss)
+            .where(Trade.status == "OPEN")
+            .execution_options(yield_per=settings.EXPORT_FETCH_SIZE)
+        )
+        with self._lock:
+            self._rows.clear()
+            self._n = 0
+            for row in db.execute(stmt):
+                self._add(*row)
+            return self._n
+
+    def mark(self, prices: Dict[str, float], marked_at: datetime = None) -> PositionMarks:
+        """
+        Marks every open position to market in one pass. prices: symbol -> mark;
+        positions in symbols without a price come back NaN and count as 0 in the totals.
+        """
+        with self._lock:
+            n = self._n
+            names = list(self._symbol_names)
+            book = np.array([prices.get(s, np.nan) for s in names], dtype=np.float64)
+            slots = self.symbol_slots[:n]
+
+            mark = book[slots] # gather, one mark per position
+            upnl = self.signs[:n] * self.quantities[:n] * (mark - self.entries[:n]) * self.multipliers[:n]
+            open_r = upnl / self.risks[:n]
+            with np.errstate(invalid="ignore"):
+                # NaN stop or NaN mark compares False
+                stop_hit = self.signs[:n] * (mark - self.stops[:n]) <= 0
+
+            known = np.nan_to_num(upnl)
+            by_symbol = np.bincount(slots, weights=known, minlength=len(names))
+            accounts, account_rows = np.unique(self.accounts[:n], return_inverse=True)
+            by_account = np.bincount(account_rows, weights=known, minlength=len(accounts))
+            ids = self.ids[:n].copy()
+            slots = slots.copy()
+
+        marks = PositionMarks(
+            marked_at=marked_at or datetime.now(timezone.utc),
+            ids=ids,
+            symbol_slots=slots,
+            symbol_names=names,
+            marks=mark,
+            unrealized_pnl=upnl,
+            open_r=open_r,
+            stop_hit=stop_hit,
+            by_symbol={names[s]: float(by_symbol[s]) for s in np.unique(slots)},
+            by_account={int(a): float(v) for a, v in zip(accounts, by_account)},
+        )
+        self._marks = marks
+        return marks
+
+    def close_trade(self, db: Session, trade_id: int, exit_price: float, exit_time: datetime = None, exit_order_id: str = None) -> Trade:
+        """
+        Books a close: exit price / time, realized PnL and R multiple, then the account's
+        daily loss, lockout and stats (RiskEngine.check_post_trade_rules), all in one
+        transaction. Raises LookupError for unknown trades, ValueError if it isn't open.
+        """
+        # Claim it with a conditional UPDATE before reading anything: only one close of a trade
+        # gets past it, and it's the statement that takes the row lock (Postgres) / the write
+        # lock (SQLite), so every read below sees the rows as they are until the commit
+        claimed = db.execute(
+            update(Trade).where(Trade.id == trade_id, Trade.status == "OPEN").values(status="CLOSED"),
+            execution_options={"synchronize_session": False}
+        ).rowcount
+        trade = db.get(Trade, trade_id, populate_existing=True)
+        if trade is None:
+            raise LookupError("Trade not found")
+        if not claimed:
+            raise ValueError(f"Trade is {trade.status}, not OPEN")
+
+        trade.exit_price = exit_price
+        trade.exit_time = exit_time or datetime.now(timezone.utc)
+        trade.exit_order_id = exit_order_id
+        trade.pnl = realized_pnl(trade.symbol, trade.side, trade.quantity, trade.entry_price, exit_price)
+        risk = initial_risk(trade.symbol, trade.quantity, trade.entry_price, trade.stop_loss)
+        trade.r_multiple = trade.pnl / risk if risk else None
+
+        risk_engine.check_post_trade_rules(db, trade)
+        db.commit()
+        self.remove(trade.id)
+        return trade
+
+    # --- Background mark loop ---
+    async def tick(self) -> Optional[PositionMarks]:
+        symbols = self.symbols()
+        if not symbols:
+            return None
+        # Streamed price book first, cached REST only for symbols the feed doesn't cover
+        quotes = await asyncio.gather(*(async_delta_service.get_mark_quote(s) for s in symbols), return_exceptions=True)
+        prices = {s: q.price for s, q in zip(symbols, quotes) if q is not None and not isinstance(q, Exception)}
+        marks = self.mark(prices)
+        self.ticks += 1
+
+        # Push aggregates only when they moved, detail is on GET /trades/positions
+        summary = marks.summary()
+        if summary != self._last_summary:
+            self._last_summary = summary
+            event_hub.publish("positions", summary)
+        return marks
+
+    async def run(self):
+        try:
+            await asyncio.to_thread(self._load_all)
+        except Exception as e:
+            print(f"Position Load Error: {e}")
+            worker_errors.inc("position_engine")
+        while True:
+            started = time.monotonic()
+            try:
+                await self.tick()
+            except Exception as e:
+                print(f"Position Mark Error: {e}")
+                worker_errors.inc("position_engine")
+            await asyncio.sleep(max(self.interval_seconds - (time.monotonic() - started), 0.0))
+
+    def _load_all(self) -> int:
+        with SessionLocal() as db:
+            return self.load(db)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+position_engine = PositionEngine()
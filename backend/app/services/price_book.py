@@ -0,0 +1,107 @@
+import asyncio
+import json
+import random
+import time
+from array import array
+from typing import Dict, Iterable, Optional
+import websockets
+from app.core.config import settings
+from app.core.metrics import worker_errors
+from app.services.price_cache import PriceQuote
+
+
+class PriceBook:
+    """
+    Latest mark prices streamed from Delta's public ticker channel.
+    Prices live in two flat float arrays indexed by a fixed symbol -> slot map,
+    so a tick is two array writes and a read is a dict lookup plus two array reads.
+    Reconnects with exponential backoff (+ jitter) whenever the socket drops.
+    """
+    def __init__(self, url: str = None, symbols: Iterable[str] = None):
+        self.url = url or settings.DELTA_WS_URL
+        self.symbols = list(symbols if symbols is not None else settings.PRICE_BOOK_SYMBOLS)
+        self._slots: Dict[str, int] = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self._prices = array('d', [0.0] * len(self.symbols))
+        self._updated = array('d', [0.0] * len(self.symbols)) # time.monotonic(), 0 = never
+
+        self.connected = False
+        self.ticks = 0
+        self.reconnects = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def get(self, symbol: str) -> Optional[PriceQuote]:
+        slot = self._slots.get(symbol)
+        if slot is None or not self._updated[slot]:
+            return None
+        return PriceQuote(symbol, self._prices[slot], self._updated[slot], "ws")
+
+    def update(self, symbol: str, price: float, observed_at: float = None) -> bool:
+        slot = self._slots.get(symbol)
+        if slot is None or price <= 0:
+            return False
+        self._prices[slot] = price
+        self._updated[slot] = observed_at if observed_at is not None else time.monotonic()
+        self.ticks += 1
+        return True
+
+    def handle_message(self, raw) -> bool:
+        """
+        Applies one websocket message. Returns True if it updated a price.
+        v2/ticker: {"type": "v2/ticker", "symbol": "BTCUSD", "mark_price": "65000.5", ...}
+        """
+        try:
+            msg = json.loads(raw)
+        except ValueError:
+            return False
+        if msg.get("type") != "v2/ticker":
+            # Subscription acks, heartbeats etc.
+            return False
+        try:
+            return self.update(msg["symbol"], float(msg["mark_price"]))
+        except (KeyError, TypeError, ValueError):
+            return False
+
+    def _subscribe_message(self) -> str:
+        return json.dumps({
+            "type": "subscribe",
+            "payload": {"channels": [{"name": "v2/ticker", "symbols": self.symbols}]}
+        })
+
+    async def run(self):
+        backoff = settings.PRICE_BOOK_RECONNECT_MIN_SECONDS
+        while True:
+            try:
+                async with websockets.connect(self.url, ping_interval=20, ping_timeout=20, max_queue=1024) as ws:
+                    await ws.send(self._subscribe_message())
+                    self.connected = True
+                    backoff = settings.PRICE_BOOK_RECONNECT_MIN_SECONDS
+                    async for raw in ws:
+                        self.handle_message(raw)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"PriceBook Warning: {e}")
+                worker_errors.inc("price_book")
+            finally:
+                self.connected = False
+
+            # Backoff with jitter so a fleet of workers doesn't reconnect in lockstep
+            delay = backoff * (0.5 + random.random() / 2)
+            self.reconnects += 1
+            await asyncio.sleep(delay)
+            backoff = min(backoff * 2, settings.PRICE_BOOK_RECONNECT_MAX_SECONDS)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+price_book = PriceBook()
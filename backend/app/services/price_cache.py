@@ -0,0 +1,70 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Optional
+from app.core.config import settings
+
+
+@dataclass
+class PriceQuote:
+    symbol: str
+    price: float
+    fetched_at: float # time.monotonic() when the price was observed
+    source: str = "rest"
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.fetched_at
+
+
+class MarkPriceCache:
+    """
+    Per-symbol mark price cache with single-flight refresh.
+    - Quotes younger than max_age are served from memory.
+    - Concurrent misses for one symbol share a single upstream fetch.
+    - If the upstream fails, the last known quote is returned as-is so the caller
+      can judge it by its age (see RiskEngine.validate_trade).
+    """
+    def __init__(self, fetcher: Callable[[str], Awaitable[float]], max_age_seconds: float = None):
+        self._fetcher = fetcher
+        self.max_age_seconds = max_age_seconds if max_age_seconds is not None else settings.MARK_PRICE_MAX_AGE_SECONDS
+        self._quotes: Dict[str, PriceQuote] = {}
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    def peek(self, symbol: str) -> Optional[PriceQuote]:
+        return self._quotes.get(symbol)
+
+    def put(self, symbol: str, price: float, source: str = "rest", fetched_at: float = None) -> PriceQuote:
+        quote = PriceQuote(symbol, price, fetched_at if fetched_at is not None else time.monotonic(), source)
+        self._quotes[symbol] = quote
+        return quote
+
+    def invalidate(self, symbol: str = None):
+        if symbol is None:
+            self._quotes.clear()
+        else:
+            self._quotes.pop(symbol, None)
+
+    async def get_quote(self, symbol: str) -> Optional[PriceQuote]:
+        quote = self._quotes.get(symbol)
+        if quote is not None and quote.age <= self.max_age_seconds:
+            return quote
+
+        task = self._inflight.get(symbol)
+        if task is None:
+            task = asyncio.ensure_future(self._refresh(symbol))
+            self._inflight[symbol] = task
+            task.add_done_callback(lambda _: self._inflight.pop(symbol, None))
+        # Shield so one cancelled caller doesn't cancel the fetch the others are waiting on
+        return await asyncio.shield(task)
+
+    async def _refresh(self, symbol: str) -> Optional[PriceQuote]:
+        try:
+            price = await self._fetcher(symbol)
+        except Exception as e:
+            print(f"Error fetching mark price for {symbol}: {e}")
+            price = 0.0
+
+        if price > 0:
+            return self.put(symbol, price)
+        return self._quotes.get(symbol)
@@ -0,0 +1,248 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Mapping, Optional
+from app.core.config import settings
+from app.core.metrics import delta_queue_wait_seconds, delta_throttled
+
+# Priority lanes, highest first. Within a lane requests go out in arrival order.
+ORDER = "order" # order placement and order lookups (the submit path's retries)
+MARK_PRICE = "mark_price" # ticker polls behind validation, execution and mark-to-market
+WALLET = "wallet" # background: wallet sync, fill / order history for the reconciler
+LANES = (ORDER, MARK_PRICE, WALLET)
+
+MIN_RATE_FRACTION = 0.1 # 429s never cut the rate below this share of the configured one
+RECOVERY_PER_SECOND = 0.05 # Share of the configured rate won back per second after a 429
+
+
+class QueueRejected(Exception):
+    """
+    The request was not sent: its lane's queue was full, or its turn didn't come within
+    max_wait_seconds.
+    """
+    def __init__(self, lane: str, reason: str):
+        super().__init__(f"Delta request queue {reason} ({lane} lane)")
+        self.lane = lane
+        self.reason = reason
+
+
+class _Waiter:
+    __slots__ = ("lane", "wake")
+
+    def __init__(self, lane: str, wake: Callable[[], None]):
+        self.lane = lane
+        self.wake = wake
+
+
+class RequestScheduler:
+    """
+    Client-side rate limit for Delta, shared by the blocking and the async client (one API
+    key, one budget). A token bucket of `rate` requests/s holding up to `burst`; requests
+    that find it empty queue in their lane, and the next token always goes to the oldest
+    waiter of the highest lane, so a burst of polling can't delay an order by more than
+    the one request already being granted.
+
+    Only the head waiter sleeps on the refill timer, the others wait to be woken when they
+    move up. Each lane holds at most queue_sizes[lane] waiters and a waiter gives up after
+    max_wait_seconds; both raise QueueRejected before anything is sent.
+
+    A 429 pauses every lane (Retry-After / X-RATE-LIMIT-RESET if Delta sent one, else a
+    backoff doubling per consecutive 429) and halves the rate, which then climbs back by 5%
+    of the configured rate per second. Per second rather than per response, so a fast
+    stream of successes can't bring the rate straight back to where it got throttled.
+    """
+    def __init__(self, rate: float = None, burst: int = None, queue_sizes: Mapping[str, int] = None,
+                 max_wait_seconds: float = None, backoff_seconds: float = None, max_backoff_seconds: float = None):
+        self.max_rate = rate if rate is not None else settings.DELTA_RATE_LIMIT_PER_SECOND
+        self.rate = self.max_rate
+        self.burst = burst or settings.DELTA_RATE_LIMIT_BURST
+        self.queue_sizes = dict(queue_sizes or {
+            ORDER: settings.DELTA_ORDER_QUEUE_SIZE,
+            MARK_PRICE: settings.DELTA_MARK_PRICE_QUEUE_SIZE,
+            WALLET: settings.DELTA_WALLET_QUEUE_SIZE,
+        })
+        self.max_wait_seconds = max_wait_seconds if max_wait_seconds is not None else settings.DELTA_QUEUE_TIMEOUT_SECONDS
+        self.backoff_seconds = backoff_seconds if backoff_seconds is not None else settings.DELTA_RATE_LIMIT_BACKOFF_SECONDS
+        self.max_backoff_seconds = max_backoff_seconds if max_backoff_seconds is not None else settings.DELTA_RATE_LIMIT_BACKOFF_MAX_SECONDS
+
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._strikes = 0 # Consecutive 429s
+        self._queues: Dict[str, deque] = {lane: deque() for lane in LANES}
+        # Threading lock: the blocking client calls from worker threads, the async one from
+        # the event loop. Held for a few arithmetic ops, never across a wait.
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_rate > 0
+
+    def depth(self, lane: str) -> int:
+        return len(self._queues[lane])
+
+    # --- Bucket (call with the lock held) ---
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated
+        self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+        if self.rate < self.max_rate and now >= self._paused_until:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * RECOVERY_PER_SECOND * elapsed)
+        self._updated = now
+
+    def _head(self) -> Optional[_Waiter]:
+        for lane in LANES:
+            if self._queues[lane]:
+                return self._queues[lane][0]
+        return None
+
+    def _enqueue(self, lane: str, wake: Callable[[], None]) -> _Waiter:
+        queue = self._queues[lane]
+        if len(queue) >= self.queue_sizes[lane]:
+            delta_throttled.inc(lane, "queue_full")
+            raise QueueRejected(lane, "full")
+        waiter = _Waiter(lane, wake)
+        queue.append(waiter)
+        return waiter
+
+    def _take_uncontended(self) -> bool:
+        # Nobody queued and a token in the bucket: go without setting up a wait
+        if self._head() is not None:
+            return False
+        now = time.monotonic()
+        self._refill(now)
+        if self._tokens < 1 or now < self._paused_until:
+            return False
+        self._tokens -= 1
+        return True
+
+    def _try_take(self, waiter: _Waiter) -> Optional[float]:
+        """
+        0.0: waiter got a token and left its queue. Otherwise seconds until the next token
+        if it is the head, None if it has to wait its turn.
+        """
+        if self._head() is not waiter:
+            return None
+        now = time.monotonic()
+        self._refill(now)
+        delay = max(self._paused_until - now, (1 - self._tokens) / self.rate if self._tokens < 1 else 0.0)
+        if delay > 0:
+            return delay
+        self._tokens -= 1
+        self._queues[waiter.lane].popleft()
+        successor = self._head()
+        if successor is not None:
+            successor.wake() # Its turn now, it sets its own refill timer
+        return 0.0
+
+    def _leave(self, waiter: _Waiter):
+        was_head = self._head() is waiter
+        self._queues[waiter.lane].remove(waiter)
+        if was_head and self._head() is not None:
+            self._head().wake()
+
+    def _give_up(self, waiter: _Waiter):
+        self._leave(waiter)
+        delta_throttled.inc(waiter.lane, "timeout")
+        raise QueueRejected(waiter.lane, "wait timed out")
+
+    # --- Waiting ---
+
+    def acquire(self, lane: str):
+        """
+        Blocks the calling thread until the request may go out. Raises QueueRejected.
+        """
+        if not self.enabled:
+            return
+        start = time.monotonic()
+        with self._lock:
+            if self._take_uncontended():
+                delta_queue_wait_seconds.observe(0.0, lane)
+                return
+            event = threading.Event()
+            waiter = self._enqueue(lane, event.set)
+        while True:
+            event.clear()
+            with self._lock:
+                delay = self._try_take(waiter)
+                if delay == 0.0:
+                    break
+                remaining = start + self.max_wait_seconds - time.monotonic()
+                if remaining <= 0:
+                    self._give_up(waiter)
+            event.wait(remaining if delay is None else min(delay, remaining))
+        delta_queue_wait_seconds.observe(time.monotonic() - start, lane)
+
+    async def acquire_async(self, lane: str):
+        """acquire() for the event loop, waits without blocking it."""
+        if not self.enabled:
+            return
+        start = time.monotonic()
+        with self._lock:
+            if self._take_uncontended():
+                delta_queue_wait_seconds.observe(0.0, lane)
+                return
+            loop = asyncio.get_running_loop()
+            event = asyncio.Event()
+            # The successor can be woken from another thread (blocking client)
+            waiter = self._enqueue(lane, lambda: loop.call_soon_threadsafe(event.set))
+        try:
+            while True:
+                event.clear()
+                with self._lock:
+                    delay = self._try_take(waiter)
+                    if delay == 0.0:
+                        break
+                    remaining = start + self.max_wait_seconds - time.monotonic()
+                    if remaining <= 0:
+                        self._give_up(waiter)
+                try:
+                    await asyncio.wait_for(event.wait(), remaining if delay is None else min(delay, remaining))
+                except asyncio.TimeoutError:
+                    pass
+        except asyncio.CancelledError:
+            # Caller went away (client disconnect, wait_for), don't leave a dead head blocking the lanes
+            with self._lock:
+                if waiter in self._queues[lane]:
+                    self._leave(waiter)
+            raise
+        delta_queue_wait_seconds.observe(time.monotonic() - start, lane)
+
+    # --- Feedback ---
+
+    def record(self, status_code: int, headers: Mapping[str, str] = None, lane: str = None):
+        """
+        Feeds a Delta response back into the limiter: a 429 backs off, anything else ends
+        the run of consecutive 429s.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if status_code != 429:
+                self._strikes = 0
+                return
+            self._strikes += 1
+            pause = self._retry_after(headers) or self.backoff_seconds * 2 ** (self._strikes - 1)
+            self._paused_until = max(self._paused_until, now + min(pause, self.max_backoff_seconds))
+            self.rate = max(self.max_rate * MIN_RATE_FRACTION, self.rate / 2)
+            self._tokens = 0.0
+        delta_throttled.inc(lane or "unknown", "429")
+
+    @staticmethod
+    def _retry_after(headers: Mapping[str, str] = None) -> Optional[float]:
+        if not headers:
+            return None
+        try:
+            # Delta: milliseconds until the quota window resets
+            if headers.get("X-RATE-LIMIT-RESET"):
+                return float(headers["X-RATE-LIMIT-RESET"]) / 1000
+            if headers.get("Retry-After"):
+                return float(headers["Retry-After"])
+        except ValueError:
+            pass
+        return None
+
+delta_scheduler = RequestScheduler()
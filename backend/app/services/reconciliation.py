@@ -0,0 +1,338 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Set
+from sqlalchemy import exists, func, or_, select, update
+from sqlalchemy.orm import Session, sessionmaker
+from app.core.config import settings
+from app.core.metrics import worker_errors
+from app.db.base import SessionLocal, dialect_insert
+from app.models.models import Account, Fill, SyncCursor, Trade
+from app.schemas.schemas import TradeResponse
+from app.services.account_sync import account_sync
+from app.services.daily_reset import daily_reset
+from app.services.delta_service import DeltaAPIError, DeltaConnectionError, DeltaService, delta_service
+from app.services.event_hub import event_hub
+from app.services.position_engine import initial_risk, position_engine, realized_pnl
+from app.services.risk_engine import RESERVATION_EPSILON, risk_engine, trade_risk
+from app.services.trade_stats import trade_stats
+
+FILLS_CURSOR = "delta.fills"
+ORDERS_CURSOR = "delta.orders"
+
+# Keeps IN (...) lists under SQLite's bound parameter limit
+ID_CHUNK = 500
+
+
+def to_micros(ts: datetime) -> int:
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc) # SQLite hands back naive UTC
+    return int(ts.timestamp() * 1_000_000)
+
+
+def parse_time(value) -> datetime:
+    # Delta timestamps: ISO 8601 ("2024-05-07T07:02:06.455123Z") or microseconds
+    if isinstance(value, (int, float)) or (isinstance(value, str) and value.isdigit()):
+        return datetime.fromtimestamp(int(value) / 1_000_000, tz=timezone.utc)
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def _chunks(ids, size: int = ID_CHUNK):
+    ids = list(ids)
+    for i in range(0, len(ids), size):
+        yield ids[i:i + size]
+
+
+@dataclass
+class ReconcileResult:
+    requests: int = 0
+    fills: int = 0
+    orders: int = 0
+    upserted: int = 0 # trades inserted / re-priced from entry fills
+    repriced: int = 0 # local trades whose entry, size or exit changed
+    cancelled: int = 0
+    touched_trades: List[int] = field(default_factory=list)
+
+
+class ReconciliationService:
+    """
+    Background job that brings trades in line with what actually happened on Delta.
+
+    Fill and order history are pulled incrementally: each feed keeps a SyncCursor (newest
+    item seen) and only asks Delta for pages after it, so a run costs O(new fills) however
+    long the history gets. New fills are stored in the fills table and each touched order's
+    fills are aggregated in SQL (size, VWAP):
+      - entry orders are bulk upserted into trades on exchange_order_id, correcting local
+        entry_price / quantity and inserting orders placed outside the app as EXTERNAL trades
+      - exit orders correct exit_price, then PnL / R, daily loss and stats of closed trades
+      - cancelled entry orders that never filled mark their OPEN trade CANCELLED and give
+        its reserved risk back
+    Entry intents left PENDING by an interrupted submission are resolved first, by looking
+    up their client order id.
+    Fills, trade corrections and the cursor move commit in one transaction.
+    """
+    def __init__(self, client: DeltaService = None, session_factory: sessionmaker = None, interval_seconds: float = None):
+        self.client = client or delta_service
+        self.session_factory = session_factory or SessionLocal
+        self.interval_seconds = interval_seconds or settings.RECONCILE_INTERVAL_SECONDS
+        self.settle_seconds = settings.RECONCILE_SETTLE_SECONDS
+        self._task: Optional[asyncio.Task] = None
+
+    def _window(self, cursor: SyncCursor, oldest: Optional[int] = None):
+        now = time.time()
+        start = cursor.last_time if cursor.last_time is not None else int((now - settings.RECONCILE_LOOKBACK_HOURS * 3600) * 1_000_000)
+        if oldest is not None:
+            start = min(start, oldest)
+        return start, int((now - self.settle_seconds) * 1_000_000)
+
+    @staticmethod
+    def _cursor(db: Session, name: str) -> SyncCursor:
+        cursor = db.get(SyncCursor, name)
+        if cursor is None:
+            cursor = SyncCursor(name=name)
+            db.add(cursor)
+        return cursor
+
+    def reconcile_once(self) -> ReconcileResult:
+        """
+        One pass over new fills and orders. Blocking, run it off the event loop.
+        """
+        result = ReconcileResult()
+        if not self.client.enabled:
+            return result
+        with self.session_factory() as db:
+            # Only the id: several Delta round trips happen before anything is booked, the row
+            # itself is only ever changed with relative UPDATEs (RiskEngine.book_pnl / release)
+            account_id = db.scalar(select(Account.id).where(Account.id == settings.ACCOUNT_ID))
+            if account_id is None:
+                return result
+            opened = self._resolve_pending(db, result)
+            order_ids = self._pull_fills(db, result)
+            repriced_open = self._apply_fills(db, account_id, order_ids, result)
+            cancelled = self._pull_orders(db, result)
+            db.commit()
+
+            # Book follows the DB only once it's committed
+            for trade in opened:
+                position_engine.add(trade)
+            for trade in repriced_open:
+                position_engine.refresh(trade)
+            for trade_id in cancelled:
+                position_engine.remove(trade_id)
+            if result.touched_trades:
+                account_sync.publish(db.get(Account, account_id))
+                for trade in db.scalars(select(Trade).where(Trade.id.in_(result.touched_trades[:ID_CHUNK]))):
+                    event_hub.publish("trade.updated", TradeResponse.model_validate(trade))
+        return result
+
+    def _resolve_pending(self, db: Session, result: ReconcileResult) -> List[Trade]:
+        """
+        Entry intents still PENDING after the settle delay: the submitting request died or
+        timed out before hearing back. Look each up by client order id, OPEN if Delta has it,
+        REJECTED (reservation given back) if not.
+        """
+        cutoff = datetime.fromtimestamp(time.time() - self.settle_seconds, tz=timezone.utc)
+        pending = db.scalars(
+            select(Trade).where(Trade.status == "PENDING", Trade.client_order_id.is_not(None), Trade.entry_time < cutoff)
+        ).all()
+        opened = []
+        for trade in pending:
+            result.requests += 1
+            try:
+                order = self.client.get_order_by_client_id(trade.client_order_id)
+            except (DeltaAPIError, DeltaConnectionError) as e:
+                print(f"Reconciliation Warning: lookup of {trade.client_order_id} failed: {e}")
+                continue
+            if order is not None:
+                trade.status = "OPEN"
+                trade.exchange_order_id = str(order["id"])
+                opened.append(trade)
+            else:
+                trade.status = "REJECTED"
+                risk_engine.release(db, trade.account_id, trade.risk_amount, trades=int(daily_reset.is_current_day(trade.entry_time)))
+            result.touched_trades.append(trade.id)
+        # Flushed now so the fill upsert below matches the new exchange_order_ids
+        db.flush()
+        return opened
+
+    def _pull_fills(self, db: Session, result: ReconcileResult) -> Set[str]:
+        cursor = self._cursor(db, FILLS_CURSOR)
+        start, end = self._window(cursor)
+        insert = dialect_insert(db)
+        touched: Set[str] = set()
+        for page in self.client.iter_history("/fills", start_time=start, end_time=end):
+            result.requests += 1
+            rows = [{
+                "id": str(f["id"]),
+                "order_id": str(f["order_id"]),
+                "symbol": f.get("product_symbol"),
+                "side": f["side"],
+                "size": float(f["size"]),
+                "price": float(f["price"]),
+                "commission": float(f["commission"]) if f.get("commission") is not None else None,
+                "created_at": parse_time(f["created_at"]),
+            } for f in page]
+            # start_time is inclusive, the boundary fill comes back every run
+            # executemany form, the statement compiles once and is cached across pages
+            db.execute(insert(Fill).on_conflict_do_nothing(index_elements=[Fill.id]), rows)
+            touched.update(r["order_id"] for r in rows)
+            result.fills += len(rows)
+
+            newest = max(rows, key=lambda r: r["created_at"])
+            newest_time = to_micros(newest["created_at"])
+            if cursor.last_time is None or newest_time > cursor.last_time:
+                cursor.last_time, cursor.last_id = newest_time, newest["id"]
+        return touched
+
+    def _apply_fills(self, db: Session, account_id: int, order_ids: Set[str], result: ReconcileResult) -> List[Trade]:
+        if not order_ids:
+            return []
+        already_touched = len(result.touched_trades)
+        insert = dialect_insert(db)
+        repriced_open: List[Trade] = []
+        corrected_closed = False
+
+        for chunk in _chunks(order_ids):
+            # Size and VWAP per order over all of its fills, incl. ones stored by earlier runs
+            fills = {
+                order_id: (symbol, side, size, notional / size, first_fill)
+                for order_id, symbol, side, size, notional, first_fill in db.execute(
+                    select(Fill.order_id, func.min(Fill.symbol), func.min(Fill.side), func.sum(Fill.size),
+                           func.sum(Fill.size * Fill.price), func.min(Fill.created_at))
+                    .where(Fill.order_id.in_(chunk))
+                    .group_by(Fill.order_id)
+                )
+                if size
+            }
+            exit_orders = set(db.scalars(select(Trade.exit_order_id).where(Trade.exit_order_id.in_(chunk))))
+
+            # Entry side: one upsert for the whole chunk. Known orders get the filled size / VWAP,
+            # unknown ones (placed on the exchange directly) come in as EXTERNAL trades.
+            rows = [{
+                "account_id": account_id,
+                "symbol": symbol,
+                "side": "LONG" if side == "buy" else "SHORT",
+                "quantity": size,
+                "entry_price": vwap,
+                "entry_time": first_fill,
+                "status": "EXTERNAL",
+                "exchange_order_id": order_id,
+                "tags": [],
+            } for order_id, (symbol, side, size, vwap, first_fill) in fills.items() if order_id not in exit_orders]
+            if rows:
+                stmt = insert(Trade)
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[Trade.exchange_order_id],
+                    set_={"quantity": stmt.excluded.quantity, "entry_price": stmt.excluded.entry_price},
+                    # Trades that actually hold a position, REJECTED / CANCELLED ones keep what they had.
+                    # or_ rather than in_(): an expanding IN can't go into an executemany.
+                    where=or_(Trade.status == "OPEN", Trade.status == "CLOSED", Trade.status == "EXTERNAL")
+                )
+                db.execute(stmt, rows)
+                result.upserted += len(rows)
+
+            # Local trades behind these orders, fresh from the DB after the upsert
+            trades = db.scalars(
+                select(Trade)
+                .where(or_(Trade.exchange_order_id.in_(chunk), Trade.exit_order_id.in_(chunk)), Trade.status.in_(("OPEN", "CLOSED")))
+                .execution_options(populate_existing=True)
+            ).all()
+            for trade in trades:
+                if trade.exit_order_id in fills:
+                    trade.exit_price = fills[trade.exit_order_id][3]
+                if trade.status == "OPEN":
+                    if trade.exchange_order_id in fills and trade.stop_loss:
+                        # Reservation follows the filled size / price, the difference goes to or from the buffer
+                        risk = trade_risk(trade.symbol, trade.entry_price, trade.stop_loss, trade.quantity)
+                        if abs(risk - (trade.risk_amount or 0.0)) > RESERVATION_EPSILON:
+                            risk_engine.release(db, trade.account_id, (trade.risk_amount or 0.0) - risk)
+                            trade.risk_amount = risk
+                    repriced_open.append(trade)
+                    result.touched_trades.append(trade.id)
+                    continue
+                if trade.exit_price is None:
+                    continue
+
+                pnl = realized_pnl(trade.symbol, trade.side, trade.quantity, trade.entry_price, trade.exit_price)
+                diff = pnl - (trade.pnl or 0.0)
+                if abs(diff) < 1e-9:
+                    continue
+                risk = initial_risk(trade.symbol, trade.quantity, trade.entry_price, trade.stop_loss)
+                trade.pnl = pnl
+                trade.r_multiple = pnl / risk if risk else None
+                corrected_closed = True
+                result.touched_trades.append(trade.id)
+                # Only closes in the current trading day (DAILY_RESET_TIME / _TIMEZONE) count against its limit
+                if trade.exit_time and daily_reset.is_current_day(trade.exit_time):
+                    risk_engine.book_pnl(db, account_id, diff)
+
+        if corrected_closed:
+            trade_stats.invalidate(db, account_id)
+        result.repriced = len(result.touched_trades) - already_touched
+        return repriced_open
+
+    def _pull_orders(self, db: Session, result: ReconcileResult) -> List[int]:
+        cursor = self._cursor(db, ORDERS_CURSOR)
+        # History only lists orders once they're done, and an old resting order can be cancelled
+        # much later, so reach back to the oldest OPEN trade that still has no fills
+        oldest_unfilled = db.scalar(
+            select(func.min(Trade.entry_time))
+            .where(Trade.status == "OPEN", Trade.exchange_order_id.is_not(None),
+                   ~exists().where(Fill.order_id == Trade.exchange_order_id))
+        )
+        start, end = self._window(cursor, to_micros(oldest_unfilled) if oldest_unfilled else None)
+
+        cancelled: List[int] = []
+        for page in self.client.iter_history("/orders/history", start_time=start, end_time=end):
+            result.requests += 1
+            result.orders += len(page)
+            unfilled = [
+                str(o["id"]) for o in page
+                if o.get("state") == "cancelled" and float(o.get("unfilled_size") or 0) >= float(o.get("size") or 0)
+            ]
+            if unfilled:
+                rows = db.execute(
+                    update(Trade)
+                    .where(Trade.exchange_order_id.in_(unfilled), Trade.status == "OPEN")
+                    .values(status="CANCELLED")
+                    .returning(Trade.id, Trade.account_id, Trade.risk_amount)
+                ).all()
+                # Never traded, its reserved risk goes back to the day's buffer
+                for trade_id, account_id, risk_amount in rows:
+                    cancelled.append(trade_id)
+                    if risk_amount:
+                        risk_engine.release(db, account_id, risk_amount)
+
+            newest = max(to_micros(parse_time(o["created_at"])) for o in page)
+            if cursor.last_time is None or newest > cursor.last_time:
+                cursor.last_time = newest
+        result.cancelled = len(cancelled)
+        result.touched_trades += cancelled
+        return cancelled
+
+    async def run(self):
+        while True:
+            try:
+                result = await asyncio.to_thread(self.reconcile_once)
+                if result.repriced or result.cancelled or result.upserted:
+                    print(f"Reconciled {result.fills} fills / {result.orders} orders: {result.repriced} trades corrected, {result.cancelled} cancelled")
+            except Exception as e:
+                print(f"Reconciliation Error: {e}")
+                worker_errors.inc("reconciliation")
+            await asyncio.sleep(self.interval_seconds)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+reconciliation = ReconciliationService()
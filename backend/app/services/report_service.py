@@ -1,65 +1,207 @@
-from fpdf import FPDF
+import zlib
+from typing import Iterable, Iterator, List, Optional, Sequence
 from app.models.models import Trade, Account
-from typing import List
-import io
+
+# Helvetica / Helvetica-Bold advance widths (1/1000 em) for ASCII 32..126, from the standard AFM metrics.
+# Needed to center text in table cells since the core fonts aren't embedded.
+_HELVETICA = (
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278, 556, 556, 556, 556, 556, 556, 556, 556,
+    556, 556, 278, 278, 584, 584, 584, 556, 1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556, 333, 556, 556, 500, 556, 556, 278, 556,
+    556, 222, 222, 500, 222, 833, 556, 556, 556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584
+)
+_HELVETICA_BOLD = (
+    278, 333, 474, 556, 556, 889, 722, 238, 333, 333, 389, 584, 278, 333, 278, 278, 556, 556, 556, 556, 556, 556, 556, 556,
+    556, 556, 333, 333, 584, 584, 584, 611, 975, 722, 722, 722, 722, 667, 611, 778, 722, 278, 556, 722, 611, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 333, 278, 333, 584, 556, 333, 556, 611, 556, 611, 556, 333, 611,
+    611, 278, 278, 556, 278, 889, 611, 611, 611, 611, 389, 556, 333, 611, 556, 778, 556, 556, 500, 389, 280, 389, 584
+)
+# Indexed by latin-1 byte, anything outside printable ASCII gets an average width
+_FONTS = {
+    name: [556] * 32 + list(widths) + [556] * 129
+    for name, widths in (("F1", _HELVETICA), ("F2", _HELVETICA_BOLD))
+}
+
+K = 72 / 25.4 # points per mm
+PAGE_W, PAGE_H = 210.0, 297.0 # A4, mm
+MARGIN = 10.0
+BOTTOM = PAGE_H - 20.0 # same 2cm auto page break as FPDF
+
+COLS = ["ID", "Symbol", "Side", "Size", "Entry", "Exit", "PnL", "Time"]
+# widths roughly: 10, 20, 15, 20, 25, 25, 25, 40 -> Total ~180 (A4 w=210)
+COL_WIDTHS = [10, 25, 15, 20, 25, 25, 25, 45]
+ROW_H = 10.0
+
+# Column order expected by stream_trade_pdf
+TRADE_REPORT_COLUMNS = (Trade.id, Trade.symbol, Trade.side, Trade.quantity, Trade.entry_price, Trade.exit_price, Trade.pnl, Trade.entry_time)
+
+
+def _pdf_text(raw: bytes) -> str:
+    text = raw.decode("latin-1")
+    if b"(" in raw or b")" in raw or b"\\" in raw:
+        text = text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+    return text
+
+
+class PDFWriter:
+    """
+    Minimal incremental PDF writer. Every object is emitted as soon as it's complete and
+    returned as bytes, only the xref offsets and page ids are kept, so memory doesn't grow
+    with the page count. The page tree (object 2) is written last; the xref allows that.
+    FPDF can't do this, output() serializes the whole document held in memory at the end.
+    Covered by tests/test_report_service.py, which parses the output with pypdf.
+    """
+    def __init__(self):
+        self._offsets = {}
+        self._pos = 0
+        self._next_id = 5 # 1 catalog, 2 pages, 3-4 fonts
+        self._pages: List[int] = []
+
+    def _obj(self, obj_id: int, body: bytes) -> bytes:
+        chunk = b"%d 0 obj\n" % obj_id + body + b"\nendobj\n"
+        self._offsets[obj_id] = self._pos
+        self._pos += len(chunk)
+        return chunk
+
+    def begin(self) -> bytes:
+        header = b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n"
+        self._pos = len(header)
+        return header + b"".join([
+            self._obj(1, b"<< /Type /Catalog /Pages 2 0 R >>"),
+            self._obj(3, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>"),
+            self._obj(4, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>"),
+        ])
+
+    def page(self, content: bytes) -> bytes:
+        stream_id, page_id = self._next_id, self._next_id + 1
+        self._next_id += 2
+        self._pages.append(page_id)
+        data = zlib.compress(content, 6)
+        return self._obj(stream_id, b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(data) + data + b"\nendstream") + self._obj(
+            page_id,
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %.2f %.2f] /Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents %d 0 R >>"
+            % (PAGE_W * K, PAGE_H * K, stream_id)
+        )
+
+    def end(self) -> bytes:
+        kids = b" ".join(b"%d 0 R" % p for p in self._pages)
+        chunk = self._obj(2, b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(self._pages)))
+        xref_pos = self._pos
+        size = self._next_id
+        lines = [b"xref\n0 %d\n" % size, b"0000000000 65535 f \n"]
+        for obj_id in range(1, size):
+            lines.append(b"%010d 00000 n \n" % self._offsets[obj_id])
+        lines.append(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (size, xref_pos))
+        return chunk + b"".join(lines)
+
+
+class _Page:
+    """Content stream for one page, positions in mm from the top-left like FPDF."""
+    def __init__(self):
+        self.ops: List[str] = []
+        self.y = MARGIN
+        self.font = None
+
+    def set_font(self, name: str, size: float):
+        self.font = (name, size)
+
+    def cell(self, x: float, w: float, h: float, text: str, border: bool = False, align: str = "L"):
+        name, size = self.font
+        if border:
+            self.ops.append(f"{x * K:.2f} {(PAGE_H - self.y) * K:.2f} {w * K:.2f} {-h * K:.2f} re S")
+        if not text:
+            return
+        raw = text.encode("latin-1", "replace")
+        text_w = sum(map(_FONTS[name].__getitem__, raw)) * size / 1000 / K
+        # FPDF's cell padding (1mm) and baseline placement
+        tx = x + (w - text_w) / 2 if align == "C" else x + 1.0
+        ty = self.y + h / 2 + 0.3 * size / K
+        self.ops.append(f"BT /{name} {size:.2f} Tf {tx * K:.2f} {(PAGE_H - ty) * K:.2f} Td ({_pdf_text(raw)}) Tj ET")
+
+    def render(self) -> bytes:
+        return ("0.2 w\n" + "\n".join(self.ops)).encode("latin-1")
+
 
 class ReportService:
-    def generate_trade_pdf(self, trades: List[Trade], account: Account) -> bytes:
-        pdf = FPDF()
-        pdf.add_page()
-        pdf.set_font("helvetica", "B", 16)
-        
+    def stream_trade_pdf(self, account: Account, rows: Iterable[Sequence], period: Optional[str] = None) -> Iterator[bytes]:
+        """
+        Trade history report rendered page by page. rows are (id, symbol, side, quantity,
+        entry_price, exit_price, pnl, entry_time) tuples (TRADE_REPORT_COLUMNS) and are consumed
+        lazily, each finished page is yielded right away so nothing holds the whole history.
+        """
+        writer = PDFWriter()
+        yield writer.begin()
+
+        page = _Page()
         # Title
-        pdf.cell(0, 10, f"Trade History Report - Account #{account.id}", new_x="LMARGIN", new_y="NEXT", align="C")
-        pdf.ln(5)
-        
+        page.set_font("F2", 16)
+        page.cell(MARGIN, PAGE_W - 2 * MARGIN, 10, f"Trade History Report - Account #{account.id}", align="C")
+        page.y += 10 + 5
+
         # Account Summary
-        pdf.set_font("helvetica", "", 12)
-        pdf.cell(0, 10, f"Current Balance: ${account.balance:.2f} | Daily Loss: ${account.current_daily_loss:.2f}", new_x="LMARGIN", new_y="NEXT")
-        pdf.ln(5)
-
-        # Table Header
-        pdf.set_font("helvetica", "B", 10)
-        cols = ["ID", "Symbol", "Side", "Size", "Entry", "Exit", "PnL", "Time"]
-        # widths roughly: 10, 20, 15, 20, 25, 25, 25, 40 -> Total ~180 (A4 w=210)
-        col_widths = [10, 25, 15, 20, 25, 25, 25, 45]
-        
-        for i, col in enumerate(cols):
-            pdf.cell(col_widths[i], 10, col, border=1, align="C")
-        pdf.ln()
-
-        # Table Rows
-        pdf.set_font("helvetica", "", 9)
+        page.set_font("F1", 12)
+        page.cell(MARGIN, 0, 10, f"Current Balance: ${account.balance:.2f} | Daily Loss: ${account.current_daily_loss:.2f}")
+        page.y += 10
+        if period:
+            page.cell(MARGIN, 0, 10, period)
+            page.y += 10
+        page.y += 5
+
+        def table_header(p: _Page):
+            p.set_font("F2", 10)
+            x = MARGIN
+            for col, w in zip(COLS, COL_WIDTHS):
+                p.cell(x, w, ROW_H, col, border=True, align="C")
+                x += w
+            p.y += ROW_H
+            p.set_font("F1", 9)
+
+        table_header(page)
+
         total_pnl = 0
         wins = 0
-        for trade in trades:
-            pnl = trade.pnl if trade.pnl else 0
+        count = 0
+        for trade_id, symbol, side, quantity, entry_price, exit_price, pnl, entry_time in rows:
+            if page.y + ROW_H > BOTTOM:
+                yield writer.page(page.render())
+                page = _Page()
+                table_header(page)
+
+            pnl = pnl if pnl else 0
             total_pnl += pnl
             if pnl > 0: wins += 1
-            
+            count += 1
+
             row_data = [
-                str(trade.id),
-                trade.symbol,
-                trade.side,
-                str(trade.quantity),
-                f"{trade.entry_price:.2f}",
-                f"{trade.exit_price:.2f}" if trade.exit_price else "-",
+                str(trade_id),
+                symbol,
+                side,
+                str(quantity),
+                f"{entry_price:.2f}",
+                f"{exit_price:.2f}" if exit_price else "-",
                 f"{pnl:.2f}",
-                trade.entry_time.strftime("%Y-%m-%d %H:%M")
+                entry_time.strftime("%Y-%m-%d %H:%M") if entry_time else "-"
             ]
-            
-            for i, data in enumerate(row_data):
-                pdf.cell(col_widths[i], 10, data, border=1, align="C")
-            pdf.ln()
+            x = MARGIN
+            for data, w in zip(row_data, COL_WIDTHS):
+                page.cell(x, w, ROW_H, data, border=True, align="C")
+                x += w
+            page.y += ROW_H
 
         # Footer Summary
-        pdf.ln(10)
-        pdf.set_font("helvetica", "B", 12)
-        count = len(trades)
+        if page.y + 10 + 10 > BOTTOM:
+            yield writer.page(page.render())
+            page = _Page()
+        page.y += 10
+        page.set_font("F2", 12)
         win_rate = (wins / count * 100) if count > 0 else 0
-        
-        pdf.cell(0, 10, f"Total Trades: {count} | Win Rate: {win_rate:.1f}% | Total Realized PnL: ${total_pnl:.2f}", new_x="LMARGIN", new_y="NEXT")
+        page.cell(MARGIN, 0, 10, f"Total Trades: {count} | Win Rate: {win_rate:.1f}% | Total Realized PnL: ${total_pnl:.2f}")
+
+        yield writer.page(page.render())
+        yield writer.end()
 
-        return bytes(pdf.output())
+    def generate_trade_pdf(self, trades: List[Trade], account: Account) -> bytes:
+        rows = ((t.id, t.symbol, t.side, t.quantity, t.entry_price, t.exit_price, t.pnl, t.entry_time) for t in trades)
+        return b"".join(self.stream_trade_pdf(account, rows))
 
 report_service = ReportService()
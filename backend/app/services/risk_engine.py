@@ -1,74 +1,288 @@
+import asyncio
+import threading
+from contextlib import nullcontext
 from datetime import datetime, timezone
+from typing import List, Optional
+import numpy as np
+from sqlalchemy import and_, case, func, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from app.core.config import settings
 from app.models.models import Account, Trade
 from app.schemas.schemas import TradeValidationRequest, ValidationResult, RuleViolation
+from app.services.risk_state import RiskState, risk_state_cache
+from app.services.trade_stats import trade_stats
+
+# Estimated round-trip fees, as a fraction of notional
+FEE_BUFFER_RATE = 0.00075
+# 0.01% Absolute min SL distance sanity
+MIN_SL_PCT = 0.0001
+
+# SQLite has no row locks, reservations for the same account queue on one of these instead
+RESERVATION_STRIPES = 64
+# Float dust left in reserved_risk once everything is released is zeroed
+RESERVATION_EPSILON = 1e-6
+
+def is_inverse_symbol(symbol: str) -> bool:
+    # Heuristic: BTCUSD is Inverse (Qty in USD). BTCUSDT is Linear (Qty in Coins).
+    return symbol.endswith("USD") and not symbol.endswith("USDT")
+
+def trade_risk(symbol: str, entry_price: float, stop_loss: float, quantity: float) -> float:
+    """Loss at the stop plus the estimated fees, what a trade reserves of the daily buffer."""
+    if is_inverse_symbol(symbol):
+        # Note: For Inverse, Qty IS the notional value in USD.
+        # Risk is roughly: Qty * %Loss, buffer is fees on notional (Qty)
+        return quantity * abs(entry_price - stop_loss) / entry_price + quantity * FEE_BUFFER_RATE
+    # Linear: Qty is Coins. Risk = |Entry - Stop| * Qty, buffer is fees on Entry * Qty
+    return abs(entry_price - stop_loss) * quantity + entry_price * quantity * FEE_BUFFER_RATE
+
+def account_reason(state: RiskState) -> Optional[str]:
+    # Account-wide rules, in the order validate_trade reports them
+    if state.locked:
+        return "ACCOUNT LOCKED: Rule Violation"
+    if state.trades_today_count >= state.max_trades_per_day:
+        return f"Daily Trade Limit Reached ({state.max_trades_per_day})"
+    if state.current_daily_loss >= state.max_daily_loss:
+        return "Daily Loss Limit Hit"
+    return None
 
 class RiskEngine:
+    def __init__(self):
+        self._stripes = [threading.Lock() for _ in range(RESERVATION_STRIPES)]
+        # Same stripes for async routes: they run record_intent on the event loop thread
+        # (AsyncSession.run_sync), where a second waiter on a threading lock would block the loop
+        # the holder needs to finish on
+        self._async_stripes = [asyncio.Lock() for _ in range(RESERVATION_STRIPES)]
+
     @staticmethod
-    def validate_trade(db: Session, account_id: int, symbol: str, entry_price: float, stop_loss: float, quantity: float) -> ValidationResult:
+    def validate_trade(db: Session, account_id: int, symbol: str, entry_price: float, stop_loss: float, quantity: float, price_age: Optional[float] = None) -> ValidationResult:
         """
         Validates if a trade can be taken based on account rules.
+        price_age: seconds since the mark price behind entry_price was observed (None if not mark-based).
         """
-        account = db.query(Account).filter(Account.id == account_id).first()
+        # Risk columns come from the write-through cache, the DB is only hit on a cold miss
+        state = risk_state_cache.get(db, account_id)
+        return RiskEngine.validate_state(state, symbol, entry_price, stop_loss, quantity, price_age)
+
+    @staticmethod
+    def validate_state(account: Optional[RiskState], symbol: str, entry_price: float, stop_loss: float, quantity: float, price_age: Optional[float] = None) -> ValidationResult:
+        """
+        validate_trade against a RiskState already in hand (None: no such account). Pure code,
+        safe on the event loop with a snapshot from risk_state_cache.peek().
+        """
+        # Don't size risk off a stale mark (e.g. ticker fetch failing and only the last known price left)
+        if price_age is not None and price_age > settings.MARK_PRICE_STALE_SECONDS:
+            return ValidationResult(valid=False, can_execute=False, reason=f"Mark price is stale ({price_age:.1f}s old), retry shortly")
+
         if not account:
             return ValidationResult(valid=False, can_execute=False, reason="Account not found")
         
-        if account.locked:
-            return ValidationResult(valid=False, can_execute=False, reason="ACCOUNT LOCKED: Rule Violation")
-
-        # 1. Max Trades Per Day
-        if account.trades_today_count >= account.max_trades_per_day:
-             return ValidationResult(valid=False, can_execute=False, reason=f"Daily Trade Limit Reached ({account.max_trades_per_day})")
-
-        # 2. Daily Loss Limit
-        if account.current_daily_loss >= account.max_daily_loss:
-            return ValidationResult(valid=False, can_execute=False, reason="Daily Loss Limit Hit")
+        # 1. Lockout, Max Trades Per Day, Daily Loss Limit
+        reason = account_reason(account)
+        if reason:
+            return ValidationResult(valid=False, can_execute=False, reason=reason)
 
         # 0. Check Min SL Distance (Sanity Check)
         sl_pct = abs(entry_price - stop_loss) / entry_price
-        if sl_pct < 0.0001: # 0.01% Absolute min sanity
+        if sl_pct < MIN_SL_PCT:
              return ValidationResult(valid=False, can_execute=False, reason=f"SL too tight ({sl_pct*100:.2f}%).")
 
-        # Determine if Inverse or Linear
-        # Heuristic: BTCUSD is Inverse (Qty in USD). BTCUSDT is Linear (Qty in Coins).
-        is_inverse = symbol.endswith("USD") and not symbol.endswith("USDT")
-        
-        # 3. Risk Per Trade Check
-        if is_inverse:
-            # Note: For Inverse, Qty IS the notional value in USD.
-            # Risk is roughly: Qty * %Loss
-            # SL Percent = (Entry-Stop)/Entry
-            base_risk = quantity * sl_pct
-            
-            # Buffer: Fees on Notional (Qty)
-            estimated_buffer = quantity * 0.00075
-        else:
-            # Linear: Qty is Coins.
-            # Risk = |Entry - Stop| * Qty
-            base_risk = abs(entry_price - stop_loss) * quantity
-            
-            # Buffer: Fees on Notional (Entry * Qty)
-            notional_value = entry_price * quantity
-            estimated_buffer = notional_value * 0.00075 
-        
-        total_risk_impact = base_risk + estimated_buffer
+        # 2. Risk Per Trade Check
+        total_risk_impact = trade_risk(symbol, entry_price, stop_loss, quantity)
         
-        # Prevent taking risk that would immediately breach daily limit
-        current_loss = account.current_daily_loss
-        if current_loss + total_risk_impact > account.max_daily_loss:
+        # Prevent taking risk that would breach the daily limit if this and every open trade stopped out.
+        # A preview: execute_trade reserves the budget atomically (reserve) and can still be refused there.
+        if account.current_daily_loss + account.reserved_risk + total_risk_impact > account.max_daily_loss:
              return ValidationResult(valid=False, can_execute=False, reason=f"Risk ({total_risk_impact:.2f}) exceeds remaining daily buffer")
         
         return ValidationResult(valid=True, can_execute=True, reason="Trade Approved")
 
+    def reservation_lock(self, db: Session, account_id: int):
+        """
+        Hold around reserve() up to the commit. Postgres serializes the conditional UPDATE on
+        the row lock itself; SQLite would leave concurrent writers spinning in its busy
+        handler, so there they queue per account stripe in-process instead.
+        """
+        if db.get_bind().dialect.name == "sqlite":
+            return self._stripes[account_id % RESERVATION_STRIPES]
+        return nullcontext()
+
+    def async_reservation_lock(self, db: AsyncSession, account_id: int):
+        """reservation_lock for an AsyncSession, hold it around the run_sync(record_intent) call."""
+        if db.get_bind().dialect.name == "sqlite":
+            return self._async_stripes[account_id % RESERVATION_STRIPES]
+        return nullcontext()
+
     @staticmethod
-    def check_post_trade_rules(db: Session, account: Account, trade: Trade):
+    def reserve(db: Session, account_id: int, risk: float) -> Optional[RiskState]:
+        """
+        Takes one trade of the day's count and `risk` of the daily loss buffer, only if both
+        still fit: a single conditional UPDATE, so concurrent submissions can't both pass on
+        the same read. Returns the account's state after the reservation, None if refused
+        (see refusal_reason). Doesn't commit.
+        """
+        row = db.execute(
+            update(Account)
+            .where(
+                Account.id == account_id,
+                Account.locked.is_not(True),
+                Account.trades_today_count < Account.max_trades_per_day,
+                Account.current_daily_loss + Account.reserved_risk + risk <= Account.max_daily_loss
+            )
+            .values(trades_today_count=Account.trades_today_count + 1, reserved_risk=Account.reserved_risk + risk)
+            .returning(Account.id, Account.locked, Account.trades_today_count, Account.current_daily_loss,
+                       Account.reserved_risk, Account.max_daily_loss, Account.max_trades_per_day),
+            execution_options={"synchronize_session": False}
+        ).first()
+        if row is None:
+            return None
+        state = RiskState(
+            account_id=row.id,
+            locked=bool(row.locked),
+            trades_today_count=row.trades_today_count,
+            current_daily_loss=row.current_daily_loss or 0.0,
+            reserved_risk=float(row.reserved_risk),
+            max_daily_loss=row.max_daily_loss,
+            max_trades_per_day=row.max_trades_per_day
+        )
+        risk_state_cache.stage(db, account_id, state)
+        return state
+
+    @staticmethod
+    def refusal_reason(db: Session, account_id: int, risk: float) -> str:
+        # Why reserve() said no, from the row as it is now (the cache may be behind)
+        account = db.get(Account, account_id, populate_existing=True)
+        if account is None:
+            return "Account not found"
+        state = RiskState.from_account(account)
+        return account_reason(state) or f"Risk ({risk:.2f}) exceeds remaining daily buffer"
+
+    @staticmethod
+    def release(db: Session, account_id: int, risk: Optional[float], trades: int = 0):
+        """
+        Gives a reservation back: `risk` of the buffer and `trades` of the day's count. A negative
+        `risk` grows the reservation instead (a fill that came out riskier than the estimate).
+        Relative UPDATE, so it doesn't race reserve() or other releases. Doesn't commit.
+        """
+        risk = risk or 0.0
+        db.execute(
+            update(Account)
+            .where(Account.id == account_id)
+            .values(
+                reserved_risk=case((Account.reserved_risk - risk > RESERVATION_EPSILON, Account.reserved_risk - risk), else_=0.0),
+                trades_today_count=case((Account.trades_today_count > trades, Account.trades_today_count - trades), else_=0)
+            ),
+            execution_options={"synchronize_session": "fetch"}
+        )
+        risk_state_cache.stage(db, account_id, None)
+
+    @staticmethod
+    def validate_batch(state: RiskState, symbols: List[str], sides: List[str], entry_prices, sl_percents, quantities, price_ages=None):
+        """
+        Vectorized validate_trade over N candidates against one account state.
+        Same rules and messages as validate_trade, evaluated as NumPy array ops.
+        Returns (valid[bool], reasons[list], risk[float], max_quantity[float]); max_quantity is the
+        largest size each candidate could take within the remaining daily buffer.
+        """
+        n = len(symbols)
+        entry = np.asarray(entry_prices, dtype=np.float64)
+        sl_percent = np.asarray(sl_percents, dtype=np.float64)
+        qty = np.asarray(quantities, dtype=np.float64)
+        age = np.asarray([np.nan if a is None else a for a in price_ages], dtype=np.float64) if price_ages is not None else np.full(n, np.nan)
+        is_long = np.fromiter((side == "LONG" for side in sides), dtype=bool, count=n)
+        inverse = np.fromiter((is_inverse_symbol(sym) for sym in symbols), dtype=bool, count=n)
+
+        has_price = entry > 0
+        safe_entry = np.where(has_price, entry, 1.0)
+        stop_loss = np.where(is_long, safe_entry * (1 - sl_percent / 100), safe_entry * (1 + sl_percent / 100))
+        sl_dist = np.abs(safe_entry - stop_loss)
+        sl_pct = sl_dist / safe_entry
+
+        # Risk per unit of quantity: inverse qty is USD notional, linear qty is coins
+        unit_risk = np.where(inverse, sl_pct + FEE_BUFFER_RATE, sl_dist + safe_entry * FEE_BUFFER_RATE)
+        risk = unit_risk * qty
+        remaining = state.remaining_daily_buffer
+        max_qty = np.where(has_price & (unit_risk > 0), remaining / np.where(unit_risk > 0, unit_risk, 1.0), 0.0)
+
+        stale = age > settings.MARK_PRICE_STALE_SECONDS # NaN compares False
+        too_tight = sl_pct < MIN_SL_PCT
+        over_budget = state.current_daily_loss + state.reserved_risk + risk > state.max_daily_loss
+
+        # Account-wide rules apply to every candidate, like validate_trade
+        blocked = account_reason(state)
+        if blocked:
+            max_qty = np.zeros(n)
+
+        valid = has_price & ~stale & ~too_tight & ~over_budget & (blocked is None)
+
+        # Messages only for rejects, checked in validate_trade's order
+        reasons = []
+        for i in range(n):
+            if valid[i]:
+                reasons.append("Trade Approved")
+            elif not has_price[i]:
+                reasons.append("Could not determine Entry Price (Market Closed?)")
+            elif stale[i]:
+                reasons.append(f"Mark price is stale ({age[i]:.1f}s old), retry shortly")
+            elif blocked:
+                reasons.append(blocked)
+            elif too_tight[i]:
+                reasons.append(f"SL too tight ({sl_pct[i]*100:.2f}%).")
+            else:
+                reasons.append(f"Risk ({risk[i]:.2f}) exceeds remaining daily buffer")
+
+        return valid, reasons, np.where(has_price, risk, 0.0), max_qty
+
+    @staticmethod
+    def book_pnl(db: Session, account_id: int, pnl: float) -> Optional[RiskState]:
+        """
+        Realized PnL against the day: a loss adds to current_daily_loss, a win gives buffer back.
+        Hitting the limit locks the account until the daily reset, validate_trade rejects everything meanwhile.
+        Relative UPDATE like reserve(), so concurrent closes don't overwrite each other's loss; the
+        lock is decided from the row in the same statement. Returns the account's state after it,
+        None if there's no such account. Doesn't commit.
+        """
+        loss = func.coalesce(Account.current_daily_loss, 0.0) - pnl
+        locking = and_(Account.locked.is_not(True), loss >= Account.max_daily_loss)
+        row = db.execute(
+            update(Account)
+            .where(Account.id == account_id)
+            .values(
+                current_daily_loss=loss,
+                locked=case((locking, True), else_=Account.locked),
+                last_violation_time=case((locking, datetime.now(timezone.utc)), else_=Account.last_violation_time)
+            )
+            .returning(Account.id, Account.locked, Account.trades_today_count, Account.current_daily_loss,
+                       Account.reserved_risk, Account.max_daily_loss, Account.max_trades_per_day),
+            execution_options={"synchronize_session": "fetch"}
+        ).first()
+        if row is None:
+            return None
+        state = RiskState(
+            account_id=row.id,
+            locked=bool(row.locked),
+            trades_today_count=row.trades_today_count,
+            current_daily_loss=row.current_daily_loss or 0.0,
+            reserved_risk=float(row.reserved_risk or 0.0),
+            max_daily_loss=row.max_daily_loss,
+            max_trades_per_day=row.max_trades_per_day
+        )
+        risk_state_cache.stage(db, account_id, state)
+        return state
+
+    @staticmethod
+    def check_post_trade_rules(db: Session, trade: Trade):
         """
         Run after a trade is closed or updated.
-        Updates daily stats and checks for lockouts.
+        Updates daily stats and checks for lockouts, gives the trade's reserved risk back.
+        Doesn't commit, call it inside the transaction that closes the trade.
         """
-        # Update counts
-        # This logic assumes we are recalculating or incrementally updating
-        # For robustness, we might query all trades today
-        pass # To be implemented in the logic flow where trades are closed
+        if trade.risk_amount:
+            RiskEngine.release(db, trade.account_id, trade.risk_amount)
+        # After the release, so the state it stages for the cache is the final one
+        RiskEngine.book_pnl(db, trade.account_id, trade.pnl or 0.0)
+
+        # Win rate / R / streak aggregates, folded in incrementally (same transaction as the close)
+        trade_stats.record_close(db, trade)
 
 risk_engine = RiskEngine()
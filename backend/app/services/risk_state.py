@@ -0,0 +1,133 @@
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from app.models.models import Account
+
+# Columns RiskEngine.validate_trade reads. A commit touching any of them refreshes the cache.
+RISK_COLUMNS = ("locked", "trades_today_count", "current_daily_loss", "reserved_risk", "max_daily_loss", "max_trades_per_day")
+
+
+@dataclass(frozen=True)
+class RiskState:
+    account_id: int
+    locked: bool
+    trades_today_count: int
+    current_daily_loss: float
+    reserved_risk: float
+    max_daily_loss: float
+    max_trades_per_day: int
+
+    @property
+    def remaining_daily_buffer(self) -> float:
+        # What's left of the daily loss limit once open trades' risk is held back
+        return max(self.max_daily_loss - self.current_daily_loss - self.reserved_risk, 0.0)
+
+    @classmethod
+    def from_account(cls, account: Account) -> "RiskState":
+        return cls(
+            account_id=account.id,
+            locked=bool(account.locked),
+            trades_today_count=account.trades_today_count or 0,
+            current_daily_loss=account.current_daily_loss or 0.0,
+            reserved_risk=account.reserved_risk or 0.0,
+            max_daily_loss=account.max_daily_loss,
+            max_trades_per_day=account.max_trades_per_day
+        )
+
+
+class RiskStateCache:
+    """
+    Write-through cache of the per-account risk columns, so pre-trade validation
+    doesn't need a DB round trip.
+
+    ORM commits are tracked automatically via session events: values flushed for
+    an Account are captured and written through once the transaction commits
+    (dropped on rollback). Writes that bypass the ORM unit of work (bulk / Core
+    UPDATEs) must stage() their result or call invalidate() themselves.
+    """
+    def __init__(self):
+        self._states: Dict[int, RiskState] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def peek(self, account_id: int) -> Optional[RiskState]:
+        return self._states.get(account_id)
+
+    def get(self, db: Session, account_id: int) -> Optional[RiskState]:
+        state = self._states.get(account_id)
+        if state is not None:
+            self.hits += 1
+            return state
+
+        self.misses += 1
+        idle = not db.in_transaction()
+        account = db.get(Account, account_id)
+        state = RiskState.from_account(account) if account is not None else None
+        if idle:
+            # Transaction only begun for this read, give the pooled connection back instead of
+            # holding it for the rest of the request (a burst after invalidate() drains the pool)
+            db.rollback()
+        if state is not None:
+            self.put(state)
+        return state
+
+    def put(self, state: RiskState):
+        with self._lock:
+            self._states[state.account_id] = state
+
+    def invalidate(self, account_id: int = None):
+        with self._lock:
+            if account_id is None:
+                self._states.clear()
+            else:
+                self._states.pop(account_id, None)
+
+    # --- Session hooks ---
+    _PENDING_KEY = "risk_state_pending"
+
+    def stage(self, session: Session, account_id: int, state: Optional[RiskState]):
+        """
+        Written through when the session commits, like a flushed Account. state=None
+        drops the entry instead (value only known to the DB).
+        """
+        session.info.setdefault(self._PENDING_KEY, {})[account_id] = state
+
+    def _after_flush(self, session: Session, flush_context):
+        pending = session.info.setdefault(self._PENDING_KEY, {})
+        for obj in list(session.new) + list(session.dirty):
+            if not isinstance(obj, Account):
+                continue
+            state = inspect(obj)
+            if any(col in state.unloaded for col in RISK_COLUMNS):
+                # Expired by the flush (SQL-side expression like count + 1), the result isn't known here
+                pending[obj.id] = None
+            elif obj in session.new or any(state.attrs[col].history.has_changes() for col in RISK_COLUMNS):
+                pending[obj.id] = RiskState.from_account(obj)
+        for obj in session.deleted:
+            if isinstance(obj, Account):
+                pending[obj.id] = None
+
+    def _after_commit(self, session: Session):
+        pending = session.info.pop(self._PENDING_KEY, None)
+        if not pending:
+            return
+        for account_id, state in pending.items():
+            if state is None:
+                self.invalidate(account_id)
+            else:
+                self.put(state)
+
+    def _after_rollback(self, session: Session):
+        session.info.pop(self._PENDING_KEY, None)
+
+    def install(self):
+        # Registered on the Session class so every session (incl. ones behind AsyncSession) is covered
+        event.listen(Session, "after_flush", self._after_flush)
+        event.listen(Session, "after_commit", self._after_commit)
+        event.listen(Session, "after_soft_rollback", lambda session, previous_transaction: self._after_rollback(session))
+
+risk_state_cache = RiskStateCache()
+risk_state_cache.install()
@@ -0,0 +1,108 @@
+import math
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+# phrase -> (tag, tag weight, sentiment weight)
+# Multi-word phrases are matched as a unit and win over their single-word parts.
+LEXICON: Dict[str, Tuple[str, float, float]] = {
+    # fear / anxiety
+    "scared": ("fear", 1.0, -0.6), "afraid": ("fear", 1.0, -0.6), "fear": ("fear", 1.0, -0.5),
+    "terrified": ("fear", 1.4, -0.9), "nervous": ("fear", 0.8, -0.4), "anxious": ("fear", 0.9, -0.5),
+    "panic": ("fear", 1.2, -0.8), "panicked": ("fear", 1.2, -0.8), "worried": ("fear", 0.8, -0.4),
+    "stressed": ("fear", 0.8, -0.5), "can't sleep": ("fear", 1.2, -0.7), "margin call": ("fear", 1.4, -0.9),
+    "blew my account": ("fear", 1.5, -1.0), "lost": ("fear", 0.6, -0.5), "loss": ("fear", 0.5, -0.4),
+    "losing": ("fear", 0.6, -0.5), "lost again": ("fear", 1.2, -0.8), "drawdown": ("fear", 0.6, -0.4),
+    "stopped out": ("fear", 0.6, -0.4), "hit my stop": ("fear", 0.5, -0.3), "break": ("fear", 0.3, -0.2),
+    # greed / overconfidence
+    "greed": ("greed", 1.0, 0.2), "greedy": ("greed", 1.0, 0.2), "easy money": ("greed", 1.5, 0.6),
+    "so easy": ("greed", 1.2, 0.5), "easy": ("greed", 0.5, 0.3), "all in": ("greed", 1.5, 0.3),
+    "can't lose": ("greed", 1.5, 0.6), "double my account": ("greed", 1.4, 0.5), "max leverage": ("greed", 1.4, 0.2),
+    "crushing it": ("greed", 1.0, 0.8), "printing": ("greed", 0.9, 0.7), "to the moon": ("greed", 1.0, 0.6),
+    "win": ("greed", 0.4, 0.5), "won": ("greed", 0.5, 0.6), "profit": ("greed", 0.4, 0.5),
+    "big win": ("greed", 1.0, 0.8), "winning streak": ("greed", 1.0, 0.7),
+    # revenge trading
+    "revenge": ("revenge", 1.5, -0.6), "win it back": ("revenge", 1.5, -0.5), "make it back": ("revenge", 1.5, -0.5),
+    "get it back": ("revenge", 1.3, -0.5), "get even": ("revenge", 1.3, -0.5), "payback": ("revenge", 1.2, -0.5),
+    "one more trade": ("revenge", 1.2, -0.4), "double down": ("revenge", 1.3, -0.4), "recover my loss": ("revenge", 1.4, -0.5),
+    "angry": ("revenge", 1.0, -0.7), "furious": ("revenge", 1.2, -0.8), "pissed": ("revenge", 1.0, -0.7),
+    "market owes me": ("revenge", 1.5, -0.6),
+    # fomo
+    "fomo": ("fomo", 1.5, -0.3), "missed the move": ("fomo", 1.3, -0.4), "missing out": ("fomo", 1.3, -0.3),
+    "chasing": ("fomo", 1.2, -0.3), "chased": ("fomo", 1.2, -0.4), "jumped in": ("fomo", 1.0, -0.2),
+    "everyone is buying": ("fomo", 1.3, -0.1), "before it's too late": ("fomo", 1.4, -0.3),
+    "late entry": ("fomo", 1.0, -0.3), "can't miss": ("fomo", 1.2, 0.0), "pumping": ("fomo", 0.8, 0.1),
+    # discipline (healthy)
+    "stuck to my plan": ("discipline", 1.5, 0.7), "followed my plan": ("discipline", 1.5, 0.7),
+    "followed the plan": ("discipline", 1.5, 0.7), "stopping for the day": ("discipline", 1.4, 0.3),
+    "done for the day": ("discipline", 1.3, 0.3), "took a break": ("discipline", 1.0, 0.3),
+    "respected my stop": ("discipline", 1.4, 0.5), "waiting for my setup": ("discipline", 1.2, 0.4),
+    "patient": ("discipline", 0.9, 0.4), "calm": ("discipline", 0.8, 0.4), "disciplined": ("discipline", 1.2, 0.6),
+}
+
+NEGATORS = re.compile(r"\b(?:not|no|never|don't|didn't|isn't|wasn't|won't|without)\s+(?:\w+\s+){0,2}$")
+
+FEEDBACK = {
+    "fear": "It sounds like you're under pressure. Remember: stick to your plan. Stop trading if you are emotional.",
+    "greed": "Great result, but stay humble. Don't give it back. Lock in your profits.",
+    "revenge": "This reads like revenge trading. The market owes you nothing. Step away before the next click.",
+    "fomo": "Chasing a move you missed is how small losses start. Wait for your setup, there is always another one.",
+    "discipline": "That's the process working. Protecting capital on days like this is what keeps you in the game.",
+    "neutral": "Keep journaling. Tracking your state is the first step to mastery. What's your next move?",
+}
+
+
+@dataclass
+class Classification:
+    sentiment_score: float
+    tags: List[str]
+    confidence: float
+    matches: List[str] = field(default_factory=list)
+
+
+class SentimentClassifier:
+    """
+    Local, dependency-free journal classifier.
+    The whole lexicon is compiled into one regex alternation (longest phrase first). That's
+    a backtracking match, not an automaton: at each word boundary re tries the phrases in
+    turn, so the cost grows with the lexicon, fine at this size (about 100 phrases). Matches
+    add weighted evidence per tag and to the sentiment score; a negation just before a
+    phrase weakens / flips it.
+    Confidence grows with total evidence and with how clearly one tag dominates.
+    """
+    def __init__(self, lexicon: Dict[str, Tuple[str, float, float]] = None):
+        self.lexicon = {k.lower(): v for k, v in (lexicon or LEXICON).items()}
+        phrases = sorted(self.lexicon, key=len, reverse=True)
+        self._pattern = re.compile(r"\b(?:" + "|".join(re.escape(p) for p in phrases) + r")\b")
+
+    def classify(self, content: str) -> Classification:
+        text = content.lower().replace("’", "'")
+        tag_weights: Dict[str, float] = {}
+        sentiment = 0.0
+        matches = []
+
+        for m in self._pattern.finditer(text):
+            phrase = m.group(0)
+            tag, weight, polarity = self.lexicon[phrase]
+            if NEGATORS.search(text, max(0, m.start() - 30), m.start()):
+                # "not scared", "didn't follow the plan" -> weak evidence, opposite mood
+                weight *= 0.25
+                polarity *= -0.5
+            tag_weights[tag] = tag_weights.get(tag, 0.0) + weight
+            sentiment += polarity
+            matches.append(phrase)
+
+        if not tag_weights:
+            return Classification(0.0, ["neutral"], 0.0, matches)
+
+        total = sum(tag_weights.values())
+        top = max(tag_weights.values())
+        # Secondary tags only if they carry at least half the top tag's evidence
+        tags = [t for t, w in sorted(tag_weights.items(), key=lambda kv: -kv[1]) if w >= top / 2]
+        confidence = (total / (total + 1.0)) * (top / total)
+        return Classification(round(math.tanh(sentiment), 2), tags, round(confidence, 3), matches)
+
+    def feedback(self, classification: Classification) -> str:
+        return FEEDBACK.get(classification.tags[0], FEEDBACK["neutral"])
+
+sentiment_classifier = SentimentClassifier()
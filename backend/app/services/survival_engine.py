@@ -1,6 +1,81 @@
 import math
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, asdict
+from typing import Callable, Hashable, Optional, Sequence, Tuple
+import numpy as np
+from app.core.config import settings
+
+# Paths per chunk. Fixed, so a given seed gives the same result whatever the worker count.
+SIM_CHUNK_PATHS = 2500
+
+
+@dataclass(frozen=True)
+class SimulationResult:
+    paths: int
+    horizon_trades: int
+    ruin_probability: float
+    # Max drawdown per path, as a fraction of the starting balance
+    drawdown_p50: float
+    drawdown_p95: float
+    drawdown_p99: float
+    # Trades survived before ruin (censored at the horizon)
+    expected_runway_trades: float
+    median_runway_trades: float
+    runway_days: float
+    final_balance_p5: float
+    final_balance_p50: float
+    final_balance_p95: float
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def _simulate_chunk(values: np.ndarray, balance: float, ruin_level: float, horizon: int, paths: int, seed) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    One chunk of bootstrapped equity paths. Time-major: trade indices are drawn a block of
+    steps at a time and the per-path state (equity, peak, min, drawdown, steps alive) is
+    advanced with whole-vector ops, so memory is O(paths) instead of O(paths x horizon).
+    Returns (steps survived, max drawdown, final equity) per path.
+    """
+    rng = np.random.default_rng(seed)
+    n = len(values)
+    idx_dtype = np.uint16 if n <= np.iinfo(np.uint16).max else np.int64
+    # float32 halves memory traffic; sub-dollar drift over a few hundred steps is irrelevant here
+    values = values.astype(np.float32)
+    equity = np.full(paths, balance, dtype=np.float32)
+    peak = equity.copy()
+    min_equity = equity.copy()
+    max_dd = np.zeros(paths, dtype=np.float32)
+    survived = np.zeros(paths, dtype=np.int32)
+    step = np.empty(paths, dtype=np.float32)
+    scratch = np.empty(paths, dtype=np.float32)
+    alive = np.empty(paths, dtype=bool)
+
+    block = 64
+    for start in range(0, horizon, block):
+        draws = rng.integers(0, n, size=(min(block, horizon - start), paths), dtype=idx_dtype)
+        for row in draws:
+            np.take(values, row, out=step)
+            equity += step
+            np.maximum(peak, equity, out=peak)
+            np.subtract(peak, equity, out=scratch)
+            np.maximum(max_dd, scratch, out=max_dd)
+            np.minimum(min_equity, equity, out=min_equity)
+            # Ruin is absorbing: a path counts steps only until its equity first hits the ruin level
+            np.greater(min_equity, ruin_level, out=alive)
+            survived += alive
+    return survived, max_dd, equity
+
 
 class SurvivalEngine:
+    def __init__(self):
+        self._cache: "OrderedDict[Hashable, SimulationResult]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.cache_size = 64
+
     @staticmethod
     def calculate_runway_days(current_balance: float, max_daily_loss: float) -> float:
         """
@@ -47,4 +122,86 @@ class SurvivalEngine:
         risk = max(0.0, 1.0 - (buffer * 5)) # Linear decay for simplicity
         return round(risk, 2)
 
+    def simulate(
+        self,
+        outcomes: Sequence[float],
+        balance: float,
+        scale: float = 1.0,
+        paths: int = None,
+        horizon: int = None,
+        ruin_drawdown: float = None,
+        trades_per_day: float = 1.0,
+        seed: int = None,
+        workers: int = None
+    ) -> Optional[SimulationResult]:
+        """
+        Monte Carlo risk of ruin: bootstraps the account's own trade outcomes (R multiples
+        times scale = $ per R, or $ PnL with scale 1) into `paths` equity paths of `horizon`
+        trades. Ruin = equity falls ruin_drawdown below the starting balance.
+        Deterministic for a given seed; chunks run on a process pool when workers > 1.
+        """
+        values = np.asarray([v for v in outcomes if v is not None], dtype=np.float64) * scale
+        if values.size == 0 or balance <= 0:
+            return None
+        paths = paths or settings.SIM_PATHS
+        horizon = horizon or settings.SIM_HORIZON_TRADES
+        ruin_drawdown = ruin_drawdown if ruin_drawdown is not None else settings.SIM_RUIN_DRAWDOWN
+        seed = seed if seed is not None else settings.SIM_SEED
+        workers = workers if workers is not None else settings.SIM_WORKERS
+        ruin_level = balance * (1 - ruin_drawdown)
+
+        sizes = [min(SIM_CHUNK_PATHS, paths - i) for i in range(0, paths, SIM_CHUNK_PATHS)]
+        seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+        args = [(values, balance, ruin_level, horizon, size, child) for size, child in zip(sizes, seeds)]
+        if workers > 1 and len(args) > 1:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=workers)
+            chunks = list(self._pool.map(_simulate_chunk, *zip(*args)))
+        else:
+            chunks = [_simulate_chunk(*a) for a in args]
+
+        survived = np.concatenate([c[0] for c in chunks])
+        max_dd = np.concatenate([c[1] for c in chunks]) / balance
+        final = np.concatenate([c[2] for c in chunks])
+        dd50, dd95, dd99 = np.percentile(max_dd, [50, 95, 99])
+        f5, f50, f95 = np.percentile(final, [5, 50, 95])
+        median_runway = float(np.median(survived))
+        return SimulationResult(
+            paths=paths,
+            horizon_trades=horizon,
+            ruin_probability=round(float(np.mean(survived < horizon)), 4),
+            drawdown_p50=round(float(dd50), 4),
+            drawdown_p95=round(float(dd95), 4),
+            drawdown_p99=round(float(dd99), 4),
+            expected_runway_trades=round(float(survived.mean()), 1),
+            median_runway_trades=median_runway,
+            runway_days=round(median_runway / max(trades_per_day, 1e-9), 1),
+            final_balance_p5=round(float(f5), 2),
+            final_balance_p50=round(float(f50), 2),
+            final_balance_p95=round(float(f95), 2)
+        )
+
+    def cached_simulation(self, key: Hashable, load_outcomes: Callable[[], Tuple[Sequence[float], float]], balance: float, **params) -> Optional[SimulationResult]:
+        """
+        simulate() memoized on key (e.g. account id + closed trade count, which changes on
+        every close) plus the parameters. load_outcomes() -> (outcomes, scale) only runs on a miss.
+        """
+        cache_key = (key, round(balance, 2), tuple(sorted(params.items())))
+        with self._cache_lock:
+            if cache_key in self._cache:
+                self._cache.move_to_end(cache_key)
+                return self._cache[cache_key]
+        outcomes, scale = load_outcomes()
+        result = self.simulate(outcomes, balance, scale, **params)
+        with self._cache_lock:
+            self._cache[cache_key] = result
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
 survival_engine = SurvivalEngine()
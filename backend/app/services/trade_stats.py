@@ -0,0 +1,203 @@
+import math
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, object_session
+from app.core.config import settings
+from app.db.base import SessionLocal, dialect_insert
+from app.models.models import Account, Trade, TradeStats
+
+_COUNTERS = (
+    "trades", "wins", "losses", "total_pnl", "gross_win", "gross_loss",
+    "r_count", "sum_r", "sum_r2", "win_r_count", "win_r_sum", "loss_r_count", "loss_r_sum",
+    "current_streak", "max_win_streak", "max_loss_streak",
+)
+
+
+class TradeStatsService:
+    """
+    Per-account trade statistics kept in the trade_stats row and updated in O(1) as each
+    trade closes (record_close, same transaction as the close), so survival / ruin numbers
+    never need a scan over the trade history. A full scan only happens once, to backfill
+    an account whose history predates the table.
+    """
+    def __init__(self, window: int = None):
+        self.window = window or settings.STATS_WINDOW
+
+    @staticmethod
+    def _empty(account_id: int) -> TradeStats:
+        stats = TradeStats(account_id=account_id, recent=[])
+        for name in _COUNTERS:
+            setattr(stats, name, 0)
+        return stats
+
+    def apply(self, stats: TradeStats, pnl: Optional[float], r_multiple: Optional[float]):
+        pnl = pnl or 0.0
+        stats.trades += 1
+        stats.total_pnl += pnl
+        if pnl > 0:
+            stats.wins += 1
+            stats.gross_win += pnl
+            stats.current_streak = stats.current_streak + 1 if stats.current_streak > 0 else 1
+            stats.max_win_streak = max(stats.max_win_streak, stats.current_streak)
+        elif pnl < 0:
+            stats.losses += 1
+            stats.gross_loss += -pnl
+            stats.current_streak = stats.current_streak - 1 if stats.current_streak < 0 else -1
+            stats.max_loss_streak = max(stats.max_loss_streak, -stats.current_streak)
+        else:
+            stats.current_streak = 0 # scratch trade breaks either streak
+
+        if r_multiple is not None:
+            stats.r_count += 1
+            stats.sum_r += r_multiple
+            stats.sum_r2 += r_multiple * r_multiple
+            if pnl > 0:
+                stats.win_r_count += 1
+                stats.win_r_sum += abs(r_multiple)
+            elif pnl < 0:
+                stats.loss_r_count += 1
+                stats.loss_r_sum += abs(r_multiple)
+
+        # New list, in-place changes to a JSON column aren't tracked
+        stats.recent = ((stats.recent or []) + [[pnl, r_multiple]])[-self.window:]
+
+    def _rebuild(self, db: Session, account_id: int, exclude_trade_id: int = None) -> TradeStats:
+        stats = self._empty(account_id)
+        stmt = select(Trade.pnl, Trade.r_multiple).where(Trade.account_id == account_id, Trade.status == "CLOSED")
+        if exclude_trade_id is not None:
+            stmt = stmt.where(Trade.id != exclude_trade_id)
+        stmt = stmt.order_by(Trade.exit_time, Trade.id).execution_options(yield_per=settings.EXPORT_FETCH_SIZE)
+        for pnl, r_multiple in db.execute(stmt):
+            self.apply(stats, pnl, r_multiple)
+        return stats
+
+    def get(self, db: Session, account_id: int) -> TradeStats:
+        """
+        Current stats row (one primary key lookup). Missing rows are backfilled once in a
+        separate transaction so a read never leaves pending writes in the caller's session.
+        """
+        stats = db.get(TradeStats, account_id)
+        if stats is not None:
+            return stats
+        with Session(bind=db.get_bind()) as backfill:
+            backfill.add(self._rebuild(backfill, account_id))
+            try:
+                backfill.commit()
+            except IntegrityError:
+                backfill.rollback() # another request backfilled first
+        return db.get(TradeStats, account_id)
+
+    def record_close(self, db: Session, trade: Trade) -> TradeStats:
+        """
+        Folds a just-closed trade into its account's stats. Doesn't commit, call it inside
+        the transaction that closes the trade.
+        """
+        # apply() works on the loaded values, so lock the row before reading it. A no-op UPDATE
+        # rather than SELECT ... FOR UPDATE, which SQLite ignores: the write is what takes its lock.
+        locked = db.execute(
+            update(TradeStats).where(TradeStats.account_id == trade.account_id).values(trades=TradeStats.trades),
+            execution_options={"synchronize_session": False}
+        ).rowcount
+        if not locked:
+            # First close since the table came in, backfill the row. A concurrent close may
+            # insert it first, then this waits on its lock and leaves the row alone.
+            rebuilt = self._rebuild(db, trade.account_id, exclude_trade_id=trade.id)
+            values = {name: getattr(rebuilt, name) for name in _COUNTERS}
+            db.execute(
+                dialect_insert(db)(TradeStats)
+                .values(account_id=trade.account_id, recent=rebuilt.recent, **values)
+                .on_conflict_do_nothing(index_elements=[TradeStats.account_id])
+            )
+        stats = db.get(TradeStats, trade.account_id, with_for_update=True, populate_existing=True)
+        self.apply(stats, trade.pnl, trade.r_multiple)
+        return stats
+
+    def invalidate(self, db: Session, account_id: int):
+        """
+        Drops the row after closed trades were corrected in place (the aggregates can't
+        be un-applied), the next get() / record_close() rebuilds it. Doesn't commit.
+        """
+        stats = db.get(TradeStats, account_id)
+        if stats is not None:
+            db.delete(stats)
+
+    def for_account(self, account: Account) -> TradeStats:
+        db = object_session(account)
+        if db is not None:
+            return self.get(db, account.id)
+        with SessionLocal() as own:
+            stats = self.get(own, account.id)
+            own.expunge(stats)
+            return stats
+
+    def outcome_sample(self, account: Account, stats: TradeStats, limit: int = None) -> Tuple[List[float], float]:
+        """
+        Most recent closed outcomes for the Monte Carlo bootstrap, as (values, $ per unit):
+        R multiples scaled by the account's realized $ per R when most trades carry an R,
+        otherwise raw $ PnL with scale 1.
+        """
+        limit = limit or settings.SIM_SAMPLE_TRADES
+        stmt = (
+            select(Trade.pnl, Trade.r_multiple)
+            .where(Trade.account_id == account.id, Trade.status == "CLOSED")
+            .order_by(Trade.exit_time.desc(), Trade.id.desc())
+            .limit(limit)
+        )
+        db = object_session(account)
+        if db is not None:
+            rows = db.execute(stmt).all()
+        else:
+            with SessionLocal() as own:
+                rows = own.execute(stmt).all()
+
+        r_values = [r for _, r in rows if r is not None]
+        if stats.loss_r_count and stats.losses and len(r_values) * 2 >= len(rows):
+            per_r = (stats.gross_loss / stats.losses) / (stats.loss_r_sum / stats.loss_r_count)
+            return r_values, per_r
+        return [pnl or 0.0 for pnl, _ in rows], 1.0
+
+    def summary(self, stats: TradeStats) -> Dict[str, Any]:
+        wins, losses = stats.wins, stats.losses
+        mean_r = stats.sum_r / stats.r_count if stats.r_count else None
+        std_r = None
+        if stats.r_count > 1:
+            var = (stats.sum_r2 - stats.r_count * mean_r * mean_r) / (stats.r_count - 1)
+            std_r = math.sqrt(max(var, 0.0))
+        recent = stats.recent or []
+        recent_r = [r for _, r in recent if r is not None]
+        return {
+            "trades": stats.trades,
+            "win_rate": wins / stats.trades if stats.trades else None,
+            "avg_win": stats.gross_win / wins if wins else None,
+            "avg_loss": stats.gross_loss / losses if losses else None,
+            "profit_factor": stats.gross_win / stats.gross_loss if stats.gross_loss else None,
+            "expectancy_r": mean_r,
+            "std_r": std_r,
+            "current_streak": stats.current_streak,
+            "max_win_streak": stats.max_win_streak,
+            "max_loss_streak": stats.max_loss_streak,
+            "rolling_win_rate": sum(1 for pnl, _ in recent if pnl > 0) / len(recent) if recent else None,
+            "rolling_expectancy_r": sum(recent_r) / len(recent_r) if recent_r else None,
+        }
+
+    def ruin_inputs(self, stats: TradeStats, balance: float) -> Tuple[float, float, float]:
+        """
+        (win rate, reward/risk, risk per trade %) for SurvivalEngine.calculate_ruin_probability.
+        Falls back to the configured defaults until there are STATS_MIN_TRADES closes.
+        """
+        if stats.trades < settings.STATS_MIN_TRADES:
+            return settings.DEFAULT_WIN_RATE, settings.DEFAULT_REWARD_RISK, 1.0
+
+        win_rate = stats.wins / stats.trades
+        if stats.win_r_count and stats.loss_r_count:
+            reward_risk = (stats.win_r_sum / stats.win_r_count) / (stats.loss_r_sum / stats.loss_r_count)
+        elif stats.wins and stats.losses:
+            reward_risk = (stats.gross_win / stats.wins) / (stats.gross_loss / stats.losses)
+        else:
+            reward_risk = settings.DEFAULT_REWARD_RISK
+        avg_loss = stats.gross_loss / stats.losses if stats.losses else 0.0
+        risk_pct = avg_loss / balance * 100 if balance > 0 else 100.0
+        return win_rate, reward_risk, risk_pct
+
+trade_stats = TradeStatsService()
@@ -0,0 +1,106 @@
+"""
+Daily rollover cost as the number of accounts grows: the DailyResetScheduler pass (one
+INSERT ... SELECT into daily_summaries, one bulk UPDATE) vs. a per-account ORM loop doing
+the same work (load account, count its closes, add the summary, reset, one commit).
+
+    cd backend && python -m benchmarks.bench_daily_reset --accounts 1000 10000 --trades 5
+
+Each account gets --trades closed trades inside the day being rolled over. Both paths are
+checked to write the same summaries.
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+from app.db.base import Base
+from app.models.models import Account, DailySummary, SyncCursor, Trade
+from app.services.daily_reset import ROLLOVER_CURSOR, DailyResetScheduler
+
+
+def seed(Session, n_accounts: int, n_trades: int, start: datetime, boundary: datetime):
+    with Session() as db:
+        db.execute(Account.__table__.insert(), [
+            dict(balance=10000.0, locked=i % 7 == 0, max_daily_loss=300.0, max_trades_per_day=5,
+                 current_daily_loss=float(i % 50), trades_today_count=i % 5, reserved_risk=0.0,
+                 last_violation_time=start + timedelta(hours=1) if i % 7 == 0 else None)
+            for i in range(n_accounts)
+        ])
+        ids = db.scalars(select(Account.id)).all()
+        span = (boundary - start) / (n_trades + 1)
+        db.execute(Trade.__table__.insert(), [
+            dict(account_id=a, symbol="BTCUSDT", side="LONG", quantity=1.0, entry_price=65000.0, status="CLOSED",
+                 pnl=10.0 if j % 2 else -5.0, entry_time=start + span * j, exit_time=start + span * (j + 1))
+            for a in ids for j in range(n_trades)
+        ])
+        db.add(SyncCursor(name=ROLLOVER_CURSOR, last_time=int(start.timestamp() * 1_000_000)))
+        db.commit()
+
+
+def loop_rollover(Session, start: datetime, boundary: datetime):
+    # The naive job: one account at a time through the ORM
+    with Session() as db:
+        for account in db.scalars(select(Account)).all():
+            closes = db.scalars(select(Trade.pnl).where(
+                Trade.account_id == account.id, Trade.status == "CLOSED",
+                Trade.exit_time >= start, Trade.exit_time < boundary)).all()
+            db.add(DailySummary(
+                account_id=account.id, day=start.date(), trades=account.trades_today_count,
+                closed_trades=len(closes), wins=sum(1 for p in closes if p > 0),
+                net_pnl=-account.current_daily_loss, max_daily_loss=account.max_daily_loss,
+                hit_lockout=account.last_violation_time is not None, balance=account.balance))
+            account.trades_today_count = 0
+            account.current_daily_loss = 0.0
+            if account.last_violation_time is not None:
+                account.locked = False
+        db.commit()
+
+
+def summaries(Session):
+    with Session() as db:
+        return db.execute(select(
+            func.count(), func.sum(DailySummary.trades), func.sum(DailySummary.closed_trades),
+            func.sum(DailySummary.wins), func.sum(DailySummary.net_pnl)
+        )).one()
+
+
+def main(args):
+    boundary = datetime(2026, 1, 2, tzinfo=timezone.utc)
+    start = boundary - timedelta(days=1)
+    print(f"{'accounts':>9} {'bulk':>9} {'per-account loop':>17} {'speedup':>8}")
+    for n in args.accounts:
+        results = {}
+        for name in ("bulk", "loop"):
+            path = os.path.join(tempfile.mkdtemp(), "bench.db")
+            engine = create_engine(f"sqlite:///{path}")
+            Base.metadata.create_all(bind=engine)
+            Session = sessionmaker(bind=engine, autoflush=False)
+            seed(Session, n, args.trades, start, boundary)
+
+            begin = time.perf_counter()
+            if name == "bulk":
+                # run_due's DB work, without the snapshot publish on the app's own database
+                scheduler = DailyResetScheduler(session_factory=Session)
+                now = boundary + timedelta(seconds=1)
+                with Session() as db:
+                    scheduler._rollover(db, boundary, now)
+                    scheduler._expire_lockouts(db, boundary, now)
+                    db.commit()
+            else:
+                loop_rollover(Session, start, boundary)
+            results[name] = (time.perf_counter() - begin, summaries(Session))
+            engine.dispose()
+            os.remove(path)
+
+        assert results["bulk"][1] == results["loop"][1], results
+        bulk, loop = results["bulk"][0], results["loop"][0]
+        print(f"{n:>9} {bulk * 1000:>7.0f}ms {loop * 1000:>15.0f}ms {loop / bulk:>7.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--accounts", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--trades", type=int, default=5)
+    main(parser.parse_args())
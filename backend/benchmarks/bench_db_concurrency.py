@@ -0,0 +1,165 @@
+"""
+Requests/sec of the DB-backed read routes at 50-500 concurrent clients. The app runs as a
+uvicorn subprocess on a seeded SQLite file; an asyncio httpx client keeps --clients requests
+in flight, cycling through /trades/, /journal/, /account/stats and /account/daily.
+
+    cd backend && python -m benchmarks.bench_db_concurrency --clients 50 100 250 500
+
+--baseline runs the same load against another checkout of the backend, e.g. the sync
+engine before the routes moved to the async session:
+
+    git worktree add /tmp/sync-baseline <commit> && \\
+    python -m benchmarks.bench_db_concurrency --baseline /tmp/sync-baseline/backend
+
+Client and server share the machine, so on few cores the client's own CPU shows up in the
+numbers; compare rows, not absolutes. "cpu/req" is the server process' CPU time per request
+(Linux /proc), which the client doesn't skew. Pool settings come from the environment as usual
+(DB_POOL_SIZE, DB_MAX_OVERFLOW, ...).
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta, timezone
+
+# Only the models are used here, the servers get their own database
+os.environ["DATABASE_URL"] = "sqlite://"
+
+import httpx  # noqa: E402
+from sqlalchemy import create_engine  # noqa: E402
+from app.db.base import Base  # noqa: E402
+from app.models.models import Account, DailySummary, JournalEntry, Trade  # noqa: E402
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PATHS = [
+    "/api/v1/trades/?limit=100",
+    "/api/v1/journal/?limit=50",
+    "/api/v1/account/stats",
+    "/api/v1/account/daily",
+]
+
+
+def seed(path: str, n_trades: int, n_entries: int):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    start = datetime.now(timezone.utc) - timedelta(days=60)
+    with engine.begin() as conn:
+        conn.execute(Account.__table__.insert(), [dict(balance=10000.0, max_daily_loss=300.0, max_trades_per_day=5)])
+        conn.execute(Trade.__table__.insert(), [
+            dict(account_id=1, symbol="BTCUSDT", side="LONG" if i % 2 else "SHORT", quantity=1.0, entry_price=65000.0,
+                 stop_loss=64000.0, exit_price=65500.0 if i % 3 else 64500.0, pnl=50.0 if i % 3 else -50.0,
+                 r_multiple=0.5 if i % 3 else -0.5, status="CLOSED", tags=[],
+                 entry_time=start + timedelta(minutes=i), exit_time=start + timedelta(minutes=i + 1))
+            for i in range(n_trades)
+        ])
+        conn.execute(JournalEntry.__table__.insert(), [
+            dict(account_id=1, content=f"Entry {i}: stuck to the plan", sentiment_score=0.2, emotional_tags=["calm"],
+                 ai_feedback="Keep it up.", created_at=start + timedelta(minutes=i))
+            for i in range(n_entries)
+        ])
+        conn.execute(DailySummary.__table__.insert(), [
+            dict(account_id=1, day=date.today() - timedelta(days=i), trades=5, closed_trades=5, wins=3, net_pnl=50.0,
+                 max_daily_loss=300.0, hit_lockout=False, balance=10000.0, created_at=start)
+            for i in range(1, 31)
+        ])
+    engine.dispose()
+
+
+class Server:
+    def __init__(self, app_dir: str, db_path: str):
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            self.port = sock.getsockname()[1]
+        self.url = f"http://127.0.0.1:{self.port}"
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_path}", PRICE_BOOK_ENABLED="false",
+                   DELTA_API_KEY="", DELTA_API_SECRET="", GEMINI_API_KEY="")
+        self.proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--app-dir", app_dir, "--port", str(self.port),
+             "--log-level", "warning", "--backlog", "4096"],
+            cwd=app_dir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+
+    def __enter__(self):
+        for _ in range(600):
+            try:
+                if httpx.get(f"{self.url}/health").status_code == 200:
+                    httpx.get(f"{self.url}/api/v1/account/") # first snapshot load
+                    return self
+            except httpx.TransportError:
+                pass
+            time.sleep(0.05)
+        self.proc.kill()
+        raise RuntimeError("server did not start")
+
+    def cpu_seconds(self) -> float:
+        try:
+            with open(f"/proc/{self.proc.pid}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+        except OSError:
+            return float("nan")
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK") # utime + stime
+
+    def __exit__(self, *exc):
+        self.proc.terminate()
+        self.proc.wait(10)
+
+
+async def load(url: str, clients: int, total: int):
+    latencies, errors = [], 0
+    remaining = iter(range(total))
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=url, timeout=60, limits=limits) as client:
+        async def worker():
+            nonlocal errors
+            for i in remaining:
+                begin = time.perf_counter()
+                try:
+                    ok = (await client.get(PATHS[i % len(PATHS)])).status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                if ok:
+                    latencies.append(time.perf_counter() - begin)
+                else:
+                    errors += 1
+
+        begin = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(clients)))
+        elapsed = time.perf_counter() - begin
+    return len(latencies) / elapsed, latencies, errors
+
+
+def run(label: str, app_dir: str, args):
+    db_path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    seed(db_path, args.trades, args.entries)
+    with Server(app_dir, db_path) as server:
+        asyncio.run(load(server.url, 10, 200)) # warm up
+        for clients in args.clients:
+            cpu = server.cpu_seconds()
+            rps, latencies, errors = asyncio.run(load(server.url, clients, max(args.requests, clients * 4)))
+            cpu = (server.cpu_seconds() - cpu) / max(len(latencies) + errors, 1)
+            q = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else [float("nan")] * 99
+            print(f"{label:<10} {clients:>7} {rps:>9.0f} {q[49] * 1000:>8.1f}ms {q[94] * 1000:>8.1f}ms "
+                  f"{q[98] * 1000:>8.1f}ms {cpu * 1000:>7.2f}ms {errors:>7}")
+    os.remove(db_path)
+
+
+def main(args):
+    print(f"{'app':<10} {'clients':>7} {'req/s':>9} {'p50':>10} {'p95':>10} {'p99':>10} {'cpu/req':>9} {'errors':>7}")
+    run("current", BACKEND, args)
+    if args.baseline:
+        run("baseline", os.path.abspath(args.baseline), args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, nargs="+", default=[50, 100, 250, 500])
+    parser.add_argument("--requests", type=int, default=4000, help="Per concurrency level")
+    parser.add_argument("--trades", type=int, default=2000)
+    parser.add_argument("--entries", type=int, default=500)
+    parser.add_argument("--baseline", help="Backend directory of another checkout to run the same load against")
+    main(parser.parse_args())
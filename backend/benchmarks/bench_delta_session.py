@@ -0,0 +1,104 @@
+"""
+Delta client transport benchmark against the local fake exchange.
+
+Compares the old per-call `requests.request` (new TCP connection every time) with the
+pooled DeltaService session and the AsyncDeltaService, sequentially and under concurrency.
+
+    cd backend && python -m benchmarks.bench_delta_session --calls 500 --concurrency 50
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault("DELTA_RATE_LIMIT_PER_SECOND", "0") # Transport only, no client-side rate limit
+
+import requests  # noqa: E402
+from app.services.delta_service import DeltaService, AsyncDeltaService  # noqa: E402
+from benchmarks.fake_delta import FakeDeltaServer, fetch_stats  # noqa: E402
+
+
+def legacy_get(client: DeltaService, endpoint: str):
+    # What DeltaService.request did before: module-level requests.request, no connection reuse
+    full_url, headers, body = client._prepare_request("GET", endpoint)
+    response = requests.request("GET", full_url, headers=headers, data=body, timeout=5)
+    response.raise_for_status()
+    return response.json()
+
+
+def report(name: str, latencies: list, wall: float, url: str, conns_before: int):
+    latencies = sorted(latencies)
+    p = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+    print(f"{name:<28} n={len(latencies):<5} mean={statistics.mean(latencies) * 1000:7.3f}ms "
+          f"p50={p(0.50):7.3f}ms p99={p(0.99):7.3f}ms  {len(latencies) / wall:8.0f} req/s  "
+          f"tcp_connects={fetch_stats(url)['connections'] - conns_before}")
+
+
+def bench_sequential(name, fn, calls, url):
+    conns = fetch_stats(url)['connections']
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(calls):
+        t0 = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - t0)
+    report(name, latencies, time.perf_counter() - start, url, conns)
+
+
+def bench_threads(name, fn, calls, concurrency, url):
+    conns = fetch_stats(url)['connections']
+
+    def timed(_):
+        t0 = time.perf_counter()
+        fn()
+        return time.perf_counter() - t0
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        latencies = list(pool.map(timed, range(calls)))
+    report(name, latencies, time.perf_counter() - start, url, conns)
+
+
+async def bench_async(name, client: AsyncDeltaService, calls, concurrency, url):
+    conns = fetch_stats(url)['connections']
+    sem = asyncio.Semaphore(concurrency)
+
+    async def timed():
+        async with sem:
+            t0 = time.perf_counter()
+            await client.request("GET", "/tickers/BTCUSD")
+            return time.perf_counter() - t0
+
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*(timed() for _ in range(calls)))
+    report(name, list(latencies), time.perf_counter() - start, url, conns)
+    await client.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=1.0, help="Simulated exchange processing time")
+    args = parser.parse_args()
+
+    with FakeDeltaServer.spawn(latency_ms=args.latency_ms) as url:
+        creds = dict(base_url=url, api_key="bench", api_secret="bench")
+        pooled = DeltaService(**creds)
+        pooled.request("GET", "/tickers/BTCUSD") # warm the pool
+
+        print(f"--- sequential ({args.calls} calls) ---")
+        bench_sequential("legacy requests.request", lambda: legacy_get(pooled, "/tickers/BTCUSD"), args.calls, url)
+        bench_sequential("pooled DeltaService", lambda: pooled.request("GET", "/tickers/BTCUSD"), args.calls, url)
+
+        print(f"--- concurrent ({args.calls} calls, {args.concurrency} in flight) ---")
+        bench_threads("legacy requests.request", lambda: legacy_get(pooled, "/tickers/BTCUSD"), args.calls, args.concurrency, url)
+        bench_threads("pooled DeltaService", lambda: pooled.request("GET", "/tickers/BTCUSD"), args.calls, args.concurrency, url)
+        asyncio.run(bench_async("AsyncDeltaService", AsyncDeltaService(**creds), args.calls, args.concurrency, url))
+        pooled.close()
+
+
+if __name__ == "__main__":
+    main()
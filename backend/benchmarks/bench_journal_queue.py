@@ -0,0 +1,63 @@
+"""
+Journal posting with a slow (fake) Gemini model: the POST returns once the entry is
+saved, other requests keep flowing while analyses run in the background pool.
+
+    cd backend && DATABASE_URL=sqlite:////tmp/bench.db python -m benchmarks.bench_journal_queue --posts 20 --latency-ms 1000
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import httpx
+from app.db.base import Base, engine
+import app.models.models
+from app.main import app
+from app.services.analysis_queue import analysis_queue
+from app.services.gemini_service import GeminiService
+from benchmarks.fake_gemini import FakeGeminiModel
+
+
+async def main(args):
+    Base.metadata.create_all(bind=engine)
+    analysis_queue.service = GeminiService(model=FakeGeminiModel(latency_ms=args.latency_ms))
+
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            health = []
+            stop = asyncio.Event()
+
+            async def ping():
+                while not stop.is_set():
+                    t0 = time.perf_counter()
+                    await client.get("/health")
+                    health.append(time.perf_counter() - t0)
+                    await asyncio.sleep(0.01)
+
+            pinger = asyncio.create_task(ping())
+            post_latency = []
+
+            async def post(i):
+                t0 = time.perf_counter()
+                r = await client.post("/api/v1/journal/", json={"content": f"lost again #{i}"})
+                r.raise_for_status()
+                post_latency.append(time.perf_counter() - t0)
+
+            start = time.perf_counter()
+            await asyncio.gather(*(post(i) for i in range(args.posts)))
+            await analysis_queue._queue.join()
+            total = time.perf_counter() - start
+            stop.set()
+            await pinger
+
+    print(f"{args.posts} journal posts, model latency {args.latency_ms:.0f} ms, {analysis_queue.workers} workers")
+    print(f"POST /journal      mean {statistics.mean(post_latency) * 1000:8.1f} ms  max {max(post_latency) * 1000:8.1f} ms")
+    print(f"GET /health        mean {statistics.mean(health) * 1000:8.1f} ms  max {max(health) * 1000:8.1f} ms  (n={len(health)})")
+    print(f"all analyses done in {total:.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--posts", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=1000)
+    asyncio.run(main(parser.parse_args()))
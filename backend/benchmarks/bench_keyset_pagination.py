@@ -0,0 +1,73 @@
+"""
+Per-page latency of trade listing at increasing depth: the old OFFSET query vs. keyset
+pagination on (account_id, entry_time, id).
+
+    cd backend && python -m benchmarks.bench_keyset_pagination --n 1000000
+
+Both run against the same throwaway SQLite file, with the model's composite indexes in
+place; the OFFSET query is the previous get_trades statement unchanged.
+"""
+import argparse
+import os
+import tempfile
+import time
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+from app.api.pagination import encode_cursor, keyset_page
+from app.db.base import Base
+from app.models.models import Trade
+from benchmarks.bench_pdf_export import seed
+
+
+def timed(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main(args):
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    t0 = time.perf_counter()
+    account_id = seed(Session, args.n)
+    print(f"seeded {args.n:,} trades in {time.perf_counter() - t0:.1f}s")
+
+    limit = args.limit
+    pages = args.n // limit
+    print(f"{'page':>8} {'offset':>10} {'keyset':>10}")
+    with Session() as db:
+        for page in [0, 10, 100, pages // 10, pages // 2, pages - 1]:
+            skip = page * limit
+            # cursor = last row of the previous page (not timed)
+            cursor = None
+            if skip:
+                prev = db.execute(
+                    select(Trade.entry_time, Trade.id).where(Trade.account_id == account_id)
+                    .order_by(Trade.entry_time.desc(), Trade.id.desc()).offset(skip - 1).limit(1)
+                ).one()
+                cursor = encode_cursor(prev.entry_time, prev.id)
+
+            def offset_page():
+                return db.query(Trade).order_by(Trade.entry_time.desc()).offset(skip).limit(limit).all()
+
+            def keyset():
+                stmt = keyset_page(select(Trade).where(Trade.account_id == account_id), Trade.entry_time, Trade.id, cursor, limit)
+                return db.scalars(stmt).all()
+
+            assert [t.id for t in keyset()[:limit]] == [t.id for t in offset_page()]
+            db.expunge_all()
+            print(f"{page:>8} {timed(offset_page, args.repeat):>8.1f}ms {timed(keyset, args.repeat):>8.1f}ms")
+            db.expunge_all()
+    engine.dispose()
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=1000000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    main(parser.parse_args())
@@ -0,0 +1,331 @@
+"""
+End-to-end load test: the app served by uvicorn in its own process, against the fake Delta
+(own process: tickers, wallet, orders, fills) and the fake Gemini model, driven by --users
+virtual clients cycling through a weighted mix of what the UI does. Reports throughput and
+p50/p95/p99 per endpoint.
+
+    cd backend && python -m benchmarks.bench_load --users 50 --duration 30
+    python -m benchmarks.bench_load --save baseline.json      # on a known good build
+    python -m benchmarks.bench_load --compare baseline.json   # exit 1 on a regression
+
+--compare fails if an endpoint's p95 grew by more than --tolerance (and at least 2ms), or its
+error rate rose by more than a point. Runs on a fresh SQLite file unless --database-url
+points elsewhere (e.g. a scratch Postgres database; the schema is migrated, the account's
+limits are raised, rows are added not cleared).
+
+Mixes (--mix):
+  default  dashboard open: account / positions polling with If-None-Match, validations,
+           the odd order, close and journal note
+  polling  read routes only, many idle tabs
+  trading  validate -> order -> close heavy, exchange bound
+
+Virtual users are closed loop (next request when the last one returned, after --think-ms
+on average), so overload shows up as latency rather than a growing client queue. Client and
+server share the machine: on few cores compare runs made on the same host.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+
+# The schema is set up from this process against --database-url, the server gets its own environment
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ORDER = {"symbol": "BTCUSDT", "quantity": 1, "order_type": "MARKET", "sl_percent": 1, "tp_percent": 2}
+MOODS = ["Calm, followed the plan", "Frustrated after the stop hit", "Took a revenge trade, should have walked away",
+         "Patient entry, let it run", "Anxious about the news, sized down", "FOMO chased the breakout"]
+
+MIXES = {
+    "default": {"account": 25, "stats": 10, "positions": 20, "trades": 8, "journal_list": 5,
+                "validate": 16, "order": 5, "close": 4, "journal": 6, "journal_detailed": 1},
+    "polling": {"account": 40, "stats": 15, "positions": 30, "trades": 10, "journal_list": 5},
+    "trading": {"positions": 10, "validate": 35, "order": 25, "close": 20, "account": 10},
+}
+
+CLOSE_AFTER_SECONDS = 1.0 # The PENDING -> OPEN write runs after the order response, give it time
+
+
+class User:
+    def __init__(self, seed: int):
+        self.rng = random.Random(seed)
+        self.open = [] # (trade id, opened at)
+        self.etags = {}
+        self.notes = 0
+
+
+def plan(action: str, user: User):
+    """
+    -> (label, method, path, json body) for one request of the mix.
+    """
+    side = user.rng.choice(["LONG", "SHORT"])
+    if action == "close":
+        if user.open and time.monotonic() - user.open[0][1] > CLOSE_AFTER_SECONDS:
+            trade_id, _ = user.open.pop(0)
+            return "POST /trades/{trade_id}/close", "POST", f"/api/v1/trades/{trade_id}/close", {}
+        action = "order" # Nothing to close yet, open something instead
+    if action == "order":
+        return "POST /trades/", "POST", "/api/v1/trades/", dict(ORDER, side=side)
+    if action == "validate":
+        return "POST /trades/validate", "POST", "/api/v1/trades/validate", dict(ORDER, side=side)
+    if action in ("journal", "journal_detailed"):
+        user.notes += 1
+        # Unique text so the analysis cache doesn't answer every note
+        content = f"{user.rng.choice(MOODS)} (note {user.notes}, {user.rng.random():.6f})"
+        return "POST /journal/", "POST", "/api/v1/journal/", {"content": content, "detailed": action == "journal_detailed"}
+    path = {
+        "account": "/api/v1/account/",
+        "stats": "/api/v1/account/stats",
+        "positions": "/api/v1/trades/positions",
+        "trades": "/api/v1/trades/?limit=50",
+        "journal_list": "/api/v1/journal/?limit=20",
+    }[action]
+    return f"GET {path[len('/api/v1'):].split('?')[0]}", "GET", path, None
+
+
+def pct(values, p):
+    values = sorted(values)
+    return values[min(int(len(values) * p / 100), len(values) - 1)]
+
+
+# --- Setup ---
+
+def seed(url: str, n_trades: int, n_entries: int):
+    from sqlalchemy import create_engine
+    from app.db.migrate import migrate
+    from app.models.models import Account, JournalEntry, Trade
+
+    engine = create_engine(url)
+    migrate(engine)
+    with engine.begin() as conn:
+        account_id = conn.execute(Account.__table__.select().with_only_columns(Account.id).limit(1)).scalar()
+        if account_id is None:
+            account_id = conn.execute(Account.__table__.insert().values(balance=10000.0)).inserted_primary_key[0]
+        # Limits out of the way, the test is about latency not the risk rules
+        conn.execute(Account.__table__.update().where(Account.id == account_id).values(
+            max_daily_loss=10.0 ** 9, max_trades_per_day=10 ** 6, locked=False))
+        start = datetime.now(timezone.utc) - timedelta(days=60)
+        if n_trades:
+            conn.execute(Trade.__table__.insert(), [
+                dict(account_id=account_id, symbol="BTCUSDT", side="LONG" if i % 2 else "SHORT", quantity=1.0,
+                     entry_price=65000.0, stop_loss=64350.0, exit_price=65650.0 if i % 3 else 64350.0,
+                     pnl=0.65 if i % 3 else -0.65, r_multiple=1.0 if i % 3 else -1.0, status="CLOSED", tags=[],
+                     entry_time=start + timedelta(minutes=i), exit_time=start + timedelta(minutes=i + 1))
+                for i in range(n_trades)
+            ])
+        if n_entries:
+            conn.execute(JournalEntry.__table__.insert(), [
+                dict(account_id=account_id, content=f"{MOODS[i % len(MOODS)]} ({i})", sentiment_score=0.1,
+                     emotional_tags=["calm"], ai_feedback="Keep it up.", created_at=start + timedelta(minutes=i))
+                for i in range(n_entries)
+            ])
+    engine.dispose()
+
+
+def serve(args):
+    """
+    Server process: the app with the fake Gemini model injected (--serve PORT).
+    """
+    import uvicorn
+    from app.main import app
+    from app.services.gemini_service import gemini_service
+    from benchmarks.fake_gemini import FakeGeminiModel
+
+    gemini_service._model = FakeGeminiModel(latency_ms=args.gemini_latency_ms, fail_rate=args.gemini_fail_rate, seed=1)
+    uvicorn.run(app, host="127.0.0.1", port=args.serve, log_level="warning", backlog=4096)
+
+
+class Server:
+    def __init__(self, database_url: str, delta_url: str, args):
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            self.port = sock.getsockname()[1]
+        self.url = f"http://127.0.0.1:{self.port}"
+        env = dict(os.environ, DATABASE_URL=database_url, DELTA_BASE_URL=delta_url,
+                   DELTA_API_KEY="bench", DELTA_API_SECRET="bench", GEMINI_API_KEY="", PRICE_BOOK_ENABLED="false")
+        env.pop("ASYNC_DATABASE_URL", None)
+        self.proc = subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.bench_load", "--serve", str(self.port),
+             "--gemini-latency-ms", str(args.gemini_latency_ms), "--gemini-fail-rate", str(args.gemini_fail_rate)],
+            cwd=BACKEND, env=env, stdout=subprocess.DEVNULL, stderr=None if args.verbose else subprocess.DEVNULL
+        )
+
+    def __enter__(self):
+        import httpx
+        for _ in range(600):
+            try:
+                if httpx.get(f"{self.url}/health").status_code == 200:
+                    return self
+            except httpx.TransportError:
+                if self.proc.poll() is not None:
+                    raise RuntimeError("server exited during startup (--verbose shows its output)")
+            time.sleep(0.05)
+        self.proc.kill()
+        raise RuntimeError("server did not start")
+
+    def __exit__(self, *exc):
+        self.proc.terminate()
+        self.proc.wait(10)
+
+
+# --- Load ---
+
+async def load(url: str, args):
+    import httpx
+
+    weights = MIXES[args.mix]
+    actions, action_weights = list(weights), list(weights.values())
+    samples = defaultdict(list) # label -> latencies (s) inside the measured window
+    errors = defaultdict(Counter) # label -> status -> count
+    counted = Counter()
+    begin = time.monotonic()
+    measure_from = begin + args.warmup
+    stop_at = measure_from + args.duration
+    limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+
+    async with httpx.AsyncClient(base_url=url, timeout=60, limits=limits) as client:
+        async def run_user(n: int):
+            user = User(args.seed * 100_003 + n)
+            await asyncio.sleep(user.rng.random() * min(args.warmup, 1.0)) # stagger the first requests
+            while time.monotonic() < stop_at:
+                label, method, path, body = plan(user.rng.choices(actions, action_weights)[0], user)
+                headers = {"If-None-Match": user.etags[path]} if path in user.etags else None
+                start = time.monotonic()
+                try:
+                    response = await client.request(method, path, json=body, headers=headers)
+                    status = response.status_code
+                except httpx.HTTPError as e:
+                    response, status = None, type(e).__name__
+                end = time.monotonic()
+
+                if response is not None and status < 400:
+                    if "etag" in response.headers:
+                        user.etags[path] = response.headers["etag"]
+                    if label == "POST /trades/":
+                        user.open.append((response.json()["id"], end))
+                if measure_from <= start and end <= stop_at:
+                    counted[label] += 1
+                    if isinstance(status, int) and status < 400:
+                        samples[label].append(end - start)
+                    else:
+                        errors[label][status] += 1
+                if args.think_ms:
+                    await asyncio.sleep(user.rng.expovariate(1000 / args.think_ms))
+
+        await asyncio.gather(*(run_user(n) for n in range(args.users)))
+
+    results = {}
+    for label in sorted(counted):
+        latencies = samples[label]
+        results[label] = {
+            "requests": counted[label],
+            "errors": sum(errors[label].values()),
+            "rps": counted[label] / args.duration,
+            "p50_ms": pct(latencies, 50) * 1000 if latencies else None,
+            "p95_ms": pct(latencies, 95) * 1000 if latencies else None,
+            "p99_ms": pct(latencies, 99) * 1000 if latencies else None,
+        }
+    return results, errors
+
+
+def fmt_ms(value) -> str:
+    return f"{value:>8.1f}ms" if value is not None else f"{'-':>10}"
+
+
+def report(results: dict, errors: dict, duration: float):
+    print(f"{'endpoint':<32} {'requests':>8} {'req/s':>8} {'p50':>10} {'p95':>10} {'p99':>10} {'errors':>7}")
+    for label, r in results.items():
+        print(f"{label:<32} {r['requests']:>8} {r['rps']:>8.1f} {fmt_ms(r['p50_ms'])} {fmt_ms(r['p95_ms'])} "
+              f"{fmt_ms(r['p99_ms'])} {r['errors']:>7}")
+    total = sum(r["requests"] for r in results.values())
+    print(f"{'total':<32} {total:>8} {total / duration:>8.1f}")
+    for label, statuses in errors.items():
+        if statuses:
+            print(f"  errors {label}: " + ", ".join(f"{s} x{n}" for s, n in statuses.most_common()))
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> bool:
+    """
+    Prints p95 against the baseline run, returns False if any endpoint regressed.
+    """
+    ok = True
+    print(f"\n{'vs baseline':<32} {'p95 then':>10} {'p95 now':>10} {'change':>8}")
+    for label, then in baseline["endpoints"].items():
+        now = results.get(label)
+        if now is None or now["p95_ms"] is None or then["p95_ms"] is None or then["requests"] < 20:
+            continue # Not exercised by this mix, or too few samples to judge
+        change = now["p95_ms"] / then["p95_ms"] - 1
+        slower = change > tolerance and now["p95_ms"] - then["p95_ms"] > 2.0
+        failing = now["errors"] / now["requests"] > then["errors"] / then["requests"] + 0.01
+        flag = "  REGRESSED" if slower else ("  ERRORS" if failing else "")
+        print(f"{label:<32} {fmt_ms(then['p95_ms'])} {fmt_ms(now['p95_ms'])} {change * 100:>+7.0f}%{flag}")
+        ok = ok and not (slower or failing)
+    return ok
+
+
+def main(args):
+    from benchmarks.fake_delta import FakeDeltaServer, fetch_stats
+
+    db_path = None
+    database_url = args.database_url
+    if database_url is None:
+        db_path = os.path.join(tempfile.mkdtemp(), "load.db")
+        database_url = f"sqlite:///{db_path}"
+    seed(database_url, args.trades, args.entries)
+
+    with FakeDeltaServer.spawn(latency_ms=args.delta_latency_ms) as delta_url, Server(database_url, delta_url, args) as server:
+        print(f"mix {args.mix}, {args.users} users, think {args.think_ms}ms, {args.duration}s after {args.warmup}s warm up; "
+              f"Delta {args.delta_latency_ms}ms, Gemini {args.gemini_latency_ms}ms")
+        results, errors = asyncio.run(load(server.url, args))
+        exchange = fetch_stats(delta_url)
+    report(results, errors, args.duration)
+    print(f"fake Delta: {exchange['requests']} requests over {exchange['connections']} connections, {exchange['orders']} orders")
+    if db_path:
+        os.remove(db_path)
+
+    run = {"config": {k: v for k, v in vars(args).items() if k not in ("save", "compare", "serve", "verbose")},
+           "endpoints": results}
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(run, f, indent=2)
+        print(f"saved to {args.save}")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        differs = [k for k, v in run["config"].items() if k != "tolerance" and baseline["config"].get(k) != v]
+        if differs:
+            print(f"note: baseline was run with different {', '.join(differs)}")
+        if not compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=50, help="Concurrent virtual clients")
+    parser.add_argument("--duration", type=float, default=30.0, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=5.0, help="Seconds of load before measuring")
+    parser.add_argument("--think-ms", type=float, default=100.0, help="Mean pause between a user's requests (0: none)")
+    parser.add_argument("--mix", choices=sorted(MIXES), default="default")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--delta-latency-ms", type=float, default=20.0, help="Fake exchange round trip")
+    parser.add_argument("--gemini-latency-ms", type=float, default=800.0)
+    parser.add_argument("--gemini-fail-rate", type=float, default=0.0)
+    parser.add_argument("--database-url", help="Sync SQLAlchemy URL, default a fresh SQLite file")
+    parser.add_argument("--trades", type=int, default=500, help="Closed trades seeded as history")
+    parser.add_argument("--entries", type=int, default=200, help="Journal entries seeded as history")
+    parser.add_argument("--save", help="Write the results as JSON")
+    parser.add_argument("--compare", help="Results JSON of a baseline run to check against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed p95 growth, 0.25 = +25%%")
+    parser.add_argument("--verbose", action="store_true", help="Show the server's output")
+    parser.add_argument("--serve", type=int, help=argparse.SUPPRESS) # Server process entry point
+    args = parser.parse_args()
+    serve(args) if args.serve else main(args)
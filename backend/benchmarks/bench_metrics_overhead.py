@@ -0,0 +1,97 @@
+"""
+Cost of the /metrics instrumentation: one Histogram.observe(), and whole requests driven
+straight through the ASGI app (no HTTP server or client in the way) without and with
+MetricsMiddleware + the DB session timers.
+
+    cd backend && python -m benchmarks.bench_metrics_overhead --requests 3000
+
+Routes: /health (no DB, so the middleware's share is as large as it gets), GET /trades/
+(async session, one query) and /account/stats (run_sync).
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+_db = os.path.join(tempfile.mkdtemp(), "bench.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db}"
+os.environ["PRICE_BOOK_ENABLED"] = "false"
+os.environ["METRICS_ENABLED"] = "false" # The app without instrumentation, wrapped below for the "on" runs
+
+from app.core import metrics  # noqa: E402
+from app.core.metrics import Histogram, MetricsMiddleware, instrument_sessions  # noqa: E402
+from app.db.migrate import migrate  # noqa: E402
+from app.main import app  # noqa: E402
+from app.services.account_sync import account_sync  # noqa: E402
+
+PATHS = ["/health", "/api/v1/trades/", "/api/v1/account/stats"]
+
+
+async def call(asgi, path: str):
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": path, "raw_path": path.encode(), "root_path": "", "query_string": b"", "headers": [],
+        "client": ("127.0.0.1", 1), "server": ("127.0.0.1", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start" and message["status"] != 200:
+            raise RuntimeError(f"{path}: {message['status']}")
+
+    await asgi(scope, receive, send)
+
+
+def uninstrument_sessions():
+    event.remove(Session, "after_begin", metrics._after_begin)
+    event.remove(Session, "after_commit", metrics._after_commit)
+    event.remove(Session, "after_transaction_end", metrics._after_transaction_end)
+
+
+async def run(n: int, batch: int = 100):
+    # Alternating batches, so drift over the run lands on both modes alike
+    samples = {(mode, path): [] for mode in ("off", "on") for path in PATHS}
+    wrapped = MetricsMiddleware(app)
+    for _ in range(max(n // batch, 1)):
+        for mode in ("off", "on"):
+            if mode == "on":
+                instrument_sessions()
+            for path in PATHS:
+                asgi = wrapped if mode == "on" else app
+                for _ in range(batch):
+                    begin = time.perf_counter()
+                    await call(asgi, path)
+                    samples[mode, path].append(time.perf_counter() - begin)
+            if mode == "on":
+                uninstrument_sessions()
+    median_us = {key: statistics.median(values) * 1e6 for key, values in samples.items()}
+    return {p: median_us["off", p] for p in PATHS}, {p: median_us["on", p] for p in PATHS}
+
+
+def main(args):
+    histogram = Histogram("bench_seconds", "observe() timing", ("route",))
+    begin = time.perf_counter()
+    for i in range(args.observes):
+        histogram.observe(0.003, "/api/v1/trades/")
+    print(f"Histogram.observe: {(time.perf_counter() - begin) / args.observes * 1e9:.0f}ns")
+
+    migrate()
+    account_sync.load_snapshot()
+    off, on = asyncio.run(run(args.requests))
+    print(f"{'route':<24} {'plain':>9} {'instrumented':>13} {'overhead':>9}")
+    for path in PATHS:
+        print(f"{path:<24} {off[path]:>7.0f}us {on[path]:>11.0f}us {on[path] - off[path]:>7.0f}us")
+    os.remove(_db)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=3000, help="Per route and mode, medians reported")
+    parser.add_argument("--observes", type=int, default=1_000_000)
+    main(parser.parse_args())
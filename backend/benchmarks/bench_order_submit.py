@@ -0,0 +1,139 @@
+"""
+POST /api/v1/trades/ end to end against the local fake Delta: latency percentiles of the
+whole request vs. the exchange call inside it (from the route's Server-Timing header), then
+a fault run checking that timeouts / 5xx never produce a duplicate or a lost order.
+
+    cd backend && PRICE_BOOK_ENABLED=false python -m benchmarks.bench_order_submit --orders 300 --latency-ms 5
+
+"ours" is everything in the request except the exchange stage (quote, validation, the intent
+write, framework and HTTP). The app is served by uvicorn in a thread, so the client gets its
+response before the route's background tasks run, as a real client would. The fake runs
+in-process with a simulated round trip of --latency-ms.
+"""
+import argparse
+import os
+import socket
+import statistics
+import tempfile
+import threading
+import time
+
+_db = os.path.join(tempfile.mkdtemp(), "bench.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db}"
+os.environ.setdefault("PRICE_BOOK_ENABLED", "false")
+os.environ.setdefault("DELTA_RATE_LIMIT_PER_SECOND", "0") # Measuring our side, not the client-side Delta rate limit
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+from app.main import app  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.db.base import SessionLocal  # noqa: E402
+from app.models.models import Account, Trade  # noqa: E402
+from app.services.delta_service import async_delta_service, DeltaService  # noqa: E402
+from app.services.order_service import order_service  # noqa: E402
+from app.services.reconciliation import ReconciliationService  # noqa: E402
+from benchmarks.fake_delta import FakeDeltaServer  # noqa: E402
+
+ORDER = {"symbol": "BTCUSDT", "side": "LONG", "quantity": 1, "order_type": "MARKET", "sl_percent": 1, "tp_percent": 2}
+
+
+def pct(values, p):
+    values = sorted(values)
+    return values[min(int(len(values) * p / 100), len(values) - 1)]
+
+
+def server_timing(header: str) -> dict:
+    stages = {}
+    for part in header.split(","):
+        name, _, dur = part.strip().partition(";dur=")
+        stages[name] = float(dur)
+    return stages
+
+
+def point_at(url: str, timeout: float):
+    # The route uses the module level async client, aim it at the fake
+    async_delta_service.base_url = url
+    async_delta_service.api_key = async_delta_service.api_secret = "bench"
+    async_delta_service.enabled = True
+    async_delta_service.timeout = timeout
+    async_delta_service._client = None
+    order_service.backoff_seconds = 0.05
+
+
+def serve_app():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server, f"http://127.0.0.1:{port}"
+
+
+def main(args):
+    with FakeDeltaServer(latency_ms=args.latency_ms) as server:
+        point_at(server.url, args.timeout)
+        app_server, app_url = serve_app()
+        client = httpx.Client(base_url=app_url, timeout=30)
+        client.get("/api/v1/account/")
+        with SessionLocal() as db:
+            account = db.get(Account, settings.ACCOUNT_ID)
+            account.max_trades_per_day = 10 ** 6
+            account.max_daily_loss = 10 ** 9
+            db.commit()
+
+        # Warm up (connections, caches)
+        for _ in range(10):
+            client.post("/api/v1/trades/", json=ORDER)
+
+        totals, exchange, stages = [], [], []
+        for _ in range(args.orders):
+            start = time.perf_counter()
+            response = client.post("/api/v1/trades/", json=ORDER)
+            totals.append((time.perf_counter() - start) * 1000)
+            assert response.status_code == 200, response.text
+            stages.append(server_timing(response.headers["server-timing"]))
+            exchange.append(stages[-1]["exchange"])
+        ours = [t - e for t, e in zip(totals, exchange)]
+
+        print(f"{args.orders} orders, fake exchange round trip {args.latency_ms}ms")
+        print(f"{'':>10} {'p50':>8} {'p95':>8} {'p99':>8}")
+        for name, values in (("total", totals), ("exchange", exchange), ("ours", ours)):
+            print(f"{name:>10} " + " ".join(f"{pct(values, p):>6.1f}ms" for p in (50, 95, 99)))
+        print(f"exchange share of p99 request: {pct(exchange, 99) / pct(totals, 99) * 100:.0f}%")
+        print("stage p50: " + ", ".join(f"{name} {statistics.median(s[name] for s in stages):.2f}ms" for name in stages[0]))
+
+        # Faults: every kind once, then one that exhausts the retries
+        server.state.stall_seconds = args.timeout * 3
+        scenarios = [["stall_after"], ["stall_before"], ["503"], ["503", "stall_after"], ["stall_before"] * (order_service.retries + 1)]
+        print("\nfault run")
+        for faults in scenarios:
+            server.state.faults = list(faults)
+            before = len(server.state.orders)
+            response = client.post("/api/v1/trades/", json=ORDER)
+            placed = len(server.state.orders) - before
+            print(f"  {'+'.join(faults):<40} -> {response.status_code}, exchange orders placed: {placed}")
+            assert placed <= 1
+
+        # Anything the request gave up on is resolved by the reconciler's client order id lookup
+        reconciler = ReconciliationService(client=DeltaService(base_url=server.url, api_key="k", api_secret="s"))
+        reconciler.settle_seconds = 0
+        reconciler.reconcile_once()
+        with SessionLocal() as db:
+            trades = {t.client_order_id: t.status for t in db.query(Trade).filter(Trade.client_order_id.is_not(None))}
+        placed = {o["client_order_id"] for o in server.state.orders}
+        assert all(trades[c] == "OPEN" for c in placed), "order on the exchange without an OPEN trade"
+        assert not any(s == "PENDING" for s in trades.values())
+        print(f"  after reconcile: {len(placed)} exchange orders, {sum(s == 'OPEN' for s in trades.values())} OPEN trades, "
+              f"{sum(s == 'REJECTED' for s in trades.values())} REJECTED, 0 PENDING")
+        client.close()
+        app_server.should_exit = True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--orders", type=int, default=300)
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    parser.add_argument("--timeout", type=float, default=0.3)
+    main(parser.parse_args())
@@ -0,0 +1,152 @@
+"""
+Trade history PDF export: peak memory and latency of the streaming report vs. the old
+load-everything + FPDF path, at 1k / 10k / 100k trades.
+
+    cd backend && python -m benchmarks.bench_pdf_export --sizes 1000 10000 100000
+
+The old path is only run up to --legacy-max trades (it needs fpdf2 installed) since it gets
+slow well before 100k. Timings come from an untraced pass, peak memory (traced Python
+allocations) from a second pass under tracemalloc. The client side is simulated by discarding
+each chunk as it arrives.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import sessionmaker
+from app.db.base import Base
+from app.models.models import Account, Trade
+from app.services.report_service import report_service, TRADE_REPORT_COLUMNS
+
+
+def seed(Session, n: int) -> int:
+    rng = random.Random(n)
+    t0 = datetime(2021, 1, 1, tzinfo=timezone.utc)
+    with Session() as db:
+        account = Account(balance=10000.0, max_daily_loss=300.0)
+        db.add(account)
+        db.commit()
+        rows = []
+        for i in range(n):
+            entry = rng.uniform(20000, 70000)
+            exit_ = entry * rng.uniform(0.98, 1.02)
+            rows.append(dict(
+                account_id=account.id, symbol=rng.choice(["BTCUSD", "BTCUSDT", "ETHUSD"]), side=rng.choice(["LONG", "SHORT"]),
+                quantity=rng.randint(1, 50), entry_price=entry, exit_price=exit_, pnl=round(exit_ - entry, 2),
+                entry_time=t0 + timedelta(minutes=30 * i), status="CLOSED"
+            ))
+            if len(rows) == 10000:
+                db.execute(insert(Trade), rows)
+                rows = []
+        if rows:
+            db.execute(insert(Trade), rows)
+        db.commit()
+        return account.id
+
+
+def legacy_pdf(trades, account) -> bytes:
+    # The previous ReportService.generate_trade_pdf, kept here for comparison
+    from fpdf import FPDF
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("helvetica", "B", 16)
+    pdf.cell(0, 10, f"Trade History Report - Account #{account.id}", new_x="LMARGIN", new_y="NEXT", align="C")
+    pdf.ln(5)
+    pdf.set_font("helvetica", "", 12)
+    pdf.cell(0, 10, f"Current Balance: ${account.balance:.2f} | Daily Loss: ${account.current_daily_loss:.2f}", new_x="LMARGIN", new_y="NEXT")
+    pdf.ln(5)
+    pdf.set_font("helvetica", "B", 10)
+    col_widths = [10, 25, 15, 20, 25, 25, 25, 45]
+    for i, col in enumerate(["ID", "Symbol", "Side", "Size", "Entry", "Exit", "PnL", "Time"]):
+        pdf.cell(col_widths[i], 10, col, border=1, align="C")
+    pdf.ln()
+    pdf.set_font("helvetica", "", 9)
+    total_pnl = 0
+    wins = 0
+    for trade in trades:
+        pnl = trade.pnl if trade.pnl else 0
+        total_pnl += pnl
+        if pnl > 0: wins += 1
+        row_data = [str(trade.id), trade.symbol, trade.side, str(trade.quantity), f"{trade.entry_price:.2f}",
+                    f"{trade.exit_price:.2f}" if trade.exit_price else "-", f"{pnl:.2f}", trade.entry_time.strftime("%Y-%m-%d %H:%M")]
+        for i, data in enumerate(row_data):
+            pdf.cell(col_widths[i], 10, data, border=1, align="C")
+        pdf.ln()
+    pdf.ln(10)
+    pdf.set_font("helvetica", "B", 12)
+    count = len(trades)
+    win_rate = (wins / count * 100) if count > 0 else 0
+    pdf.cell(0, 10, f"Total Trades: {count} | Win Rate: {win_rate:.1f}% | Total Realized PnL: ${total_pnl:.2f}", new_x="LMARGIN", new_y="NEXT")
+    return bytes(pdf.output())
+
+
+def measure(produce, first_page_chunk: int):
+    """(seconds to first page, total seconds, traced peak MB, output bytes)"""
+    start = time.perf_counter()
+    first = None
+    size = 0
+    for i, chunk in enumerate(produce()):
+        size += len(chunk)
+        if i == first_page_chunk:
+            first = time.perf_counter() - start
+    total = time.perf_counter() - start
+
+    tracemalloc.start()
+    for chunk in produce():
+        pass
+    peak = tracemalloc.get_traced_memory()[1] / 1e6
+    tracemalloc.stop()
+    return first, total, peak, size
+
+
+def main(args):
+    try:
+        import fpdf # noqa: F401
+        have_fpdf = True
+    except ImportError:
+        have_fpdf = False
+
+    print(f"{'trades':>8} {'path':<10} {'first page':>11} {'total':>9} {'peak mem':>10} {'size':>10}")
+    for n in args.sizes:
+        path = os.path.join(tempfile.mkdtemp(), "bench.db")
+        engine = create_engine(f"sqlite:///{path}")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine, autoflush=False)
+        account_id = seed(Session, n)
+
+        with Session() as db:
+            account = db.get(Account, account_id)
+            db.expunge(account)
+
+        def streaming():
+            with Session() as db:
+                stmt = (select(*TRADE_REPORT_COLUMNS).where(Trade.account_id == account_id)
+                        .order_by(Trade.entry_time.desc()).execution_options(yield_per=1000))
+                yield from report_service.stream_trade_pdf(account, db.execute(stmt))
+
+        def legacy():
+            with Session() as db:
+                trades = db.query(Trade).filter(Trade.account_id == account_id).order_by(Trade.entry_time.desc()).all()
+                # whole document is built before the first byte goes out
+                yield legacy_pdf(trades, account)
+
+        # streaming: chunk 0 is the PDF header, chunk 1 the first page
+        runs = [("streaming", streaming, 1)]
+        if have_fpdf and n <= args.legacy_max:
+            runs.insert(0, ("old fpdf", legacy, 0))
+        for name, produce, first_page_chunk in runs:
+            first, total, peak, size = measure(produce, first_page_chunk)
+            print(f"{n:>8} {name:<10} {first * 1000:>9.0f}ms {total:>8.2f}s {peak:>8.1f}MB {size / 1e6:>8.1f}MB")
+        engine.dispose()
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--legacy-max", type=int, default=10000)
+    main(parser.parse_args())
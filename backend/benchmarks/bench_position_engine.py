@@ -0,0 +1,100 @@
+"""
+Mark-to-market latency of PositionEngine at thousands of open positions per tick:
+one vectorized pass vs. a per-position Python loop over the same trades
+(realized_pnl / initial_risk per position, what a naive "for trade in open_trades" tick does).
+
+    cd backend && python -m benchmarks.bench_position_engine --sizes 1000 10000 100000
+
+Before timing, the book is churned (random opens and swap-remove closes) and its marks are
+checked against the loop, so the numbers are for a book in a realistic, fragmented state.
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timezone
+import numpy as np
+from app.services.position_engine import PositionEngine, initial_risk, realized_pnl
+
+SYMBOLS = ["BTCUSD", "BTCUSDT", "ETHUSD", "ETHUSDT", "SOLUSDT", "XRPUSDT"]
+BASE = {"BTCUSD": 65000.0, "BTCUSDT": 65000.0, "ETHUSD": 3200.0, "ETHUSDT": 3200.0, "SOLUSDT": 150.0, "XRPUSDT": 0.6}
+
+
+class Position:
+    def __init__(self, id, symbol, side, quantity, entry_price, stop_loss):
+        self.id, self.account_id, self.symbol, self.side = id, 1 + id % 3, symbol, side
+        self.quantity, self.entry_price, self.stop_loss = quantity, entry_price, stop_loss
+
+
+def make_position(rng: random.Random, i: int) -> Position:
+    symbol = rng.choice(SYMBOLS)
+    side = rng.choice(["LONG", "SHORT"])
+    entry = BASE[symbol] * rng.uniform(0.97, 1.03)
+    sl = rng.uniform(0.3, 2.0) / 100
+    stop = entry * (1 - sl) if side == "LONG" else entry * (1 + sl)
+    qty = rng.randint(10, 5000) if symbol.endswith("USD") else rng.uniform(0.01, 5)
+    return Position(i, symbol, side, qty, entry, stop if rng.random() > 0.1 else None)
+
+
+def loop_tick(positions, prices):
+    # Per-position Python mark, the baseline
+    total = {}
+    out = {}
+    for p in positions:
+        mark = prices[p.symbol]
+        pnl = realized_pnl(p.symbol, p.side, p.quantity, p.entry_price, mark)
+        risk = initial_risk(p.symbol, p.quantity, p.entry_price, p.stop_loss)
+        stop_hit = p.stop_loss is not None and ((mark <= p.stop_loss) if p.side == "LONG" else (mark >= p.stop_loss))
+        out[p.id] = (pnl, pnl / risk if risk else None, stop_hit)
+        total[p.symbol] = total.get(p.symbol, 0.0) + pnl
+    return out, total
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(args):
+    print(f"{'positions':>10} {'vectorized':>11} {'python loop':>12} {'speedup':>8}")
+    for n in args.sizes:
+        rng = random.Random(n)
+        engine = PositionEngine(capacity=64)
+        live = {}
+        next_id = 0
+        # Churn: open 1.5n, close ~n/2 at random so rows get swap-moved around
+        for _ in range(n + n // 2):
+            p = make_position(rng, next_id)
+            next_id += 1
+            engine.add(p)
+            live[p.id] = p
+        for trade_id in rng.sample(sorted(live), n // 2):
+            assert engine.remove(trade_id)
+            del live[trade_id]
+        assert len(engine) == len(live) == n
+
+        prices = {s: BASE[s] * rng.uniform(0.97, 1.03) for s in SYMBOLS}
+        marks = engine.mark(prices, datetime.now(timezone.utc))
+        expected, totals = loop_tick(list(live.values()), prices)
+        for i, pnl, r, hit in zip(marks.ids, marks.unrealized_pnl, marks.open_r, marks.stop_hit):
+            e_pnl, e_r, e_hit = expected[int(i)]
+            assert abs(pnl - e_pnl) <= 1e-9 * max(1.0, abs(e_pnl))
+            assert (e_r is None and np.isnan(r)) or abs(r - e_r) <= 1e-9 * max(1.0, abs(e_r))
+            assert bool(hit) == e_hit
+        for s, v in totals.items():
+            assert abs(marks.by_symbol[s] - v) <= 1e-6 * max(1.0, abs(v))
+
+        positions = list(live.values())
+        vec = best_of(lambda: engine.mark(prices), args.repeat)
+        loop = best_of(lambda: loop_tick(positions, prices), max(1, args.repeat // 5))
+        print(f"{n:>10} {vec * 1000:>9.2f}ms {loop * 1000:>10.1f}ms {loop / vec:>7.0f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=20)
+    main(parser.parse_args())
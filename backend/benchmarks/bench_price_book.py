@@ -0,0 +1,56 @@
+"""
+PriceBook against the local replay server: ingestion rate, read cost and reconnect.
+
+    cd backend && python -m benchmarks.bench_price_book --ticks 200000
+"""
+import argparse
+import asyncio
+import json
+import time
+from app.core.config import settings
+from app.services.price_book import PriceBook
+from benchmarks.fake_delta_ws import ReplayTickServer, load_ticks
+
+
+async def main(args):
+    recorded = load_ticks()
+    ticks = (recorded * (args.ticks // len(recorded) + 1))[:args.ticks]
+    symbols = sorted({json.loads(t)["symbol"] for t in recorded})
+
+    # Fast reconnects so the drop scenario doesn't dominate the run
+    settings.PRICE_BOOK_RECONNECT_MIN_SECONDS = 0.05
+
+    async with ReplayTickServer(ticks=ticks, drop_after=args.drop_after) as server:
+        book = PriceBook(url=server.url, symbols=symbols)
+        start = time.perf_counter()
+        book.start()
+        while book.ticks < args.ticks:
+            await asyncio.sleep(0.01)
+            if time.perf_counter() - start > 60:
+                break
+        elapsed = time.perf_counter() - start
+        await book.stop()
+
+    print(f"ingested {book.ticks} ticks in {elapsed:.2f}s -> {book.ticks / elapsed:,.0f} ticks/s "
+          f"(connections={server.connections}, reconnects={book.reconnects})")
+
+    n = 1_000_000
+    t0 = time.perf_counter()
+    for _ in range(n):
+        book.get("BTCUSD")
+    print(f"PriceBook.get: {(time.perf_counter() - t0) / n * 1e9:.0f} ns/call")
+
+    t0 = time.perf_counter()
+    for _ in range(n):
+        book.update("BTCUSD", 65000.0)
+    print(f"PriceBook.update: {(time.perf_counter() - t0) / n * 1e9:.0f} ns/call")
+    for symbol in symbols:
+        quote = book.get(symbol)
+        print(f"  {symbol:<8} {quote.price:>12.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ticks", type=int, default=100_000)
+    parser.add_argument("--drop-after", type=int, default=25_000, help="Server drops the socket after this many ticks")
+    asyncio.run(main(parser.parse_args()))
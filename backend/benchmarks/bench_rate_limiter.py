@@ -0,0 +1,109 @@
+"""
+Delta rate limiting under a polling flood: --pollers async clients hammer the ticker
+endpoint and two threads the wallet (blocking client) while an order goes out every
+--order-every seconds, against the local fake Delta enforcing a quota of --quota req/s
+(429 + X-RATE-LIMIT-RESET past it).
+
+    cd backend && python -m benchmarks.bench_rate_limiter --quota 20 --seconds 10
+
+Rows:
+  no limiter     every request goes straight out, Delta's 429s hit whatever comes along
+  limiter        RequestScheduler at 90% of the quota, orders ahead of tickers ahead of wallet
+  over quota     scheduler set to twice the quota, so only the 429 backoff keeps it in line
+
+"sent" counts requests that reached the fake, "429" the ones it refused, "shed" the ones the
+scheduler refused unsent (lane queue full or no turn within --max-wait).
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from collections import Counter
+
+os.environ.setdefault("DELTA_RATE_LIMIT_PER_SECOND", "0") # Each row builds its own scheduler
+
+from app.services.delta_service import AsyncDeltaService, DeltaAPIError, DeltaRateLimited, DeltaService  # noqa: E402
+from app.services.rate_limiter import RequestScheduler  # noqa: E402
+from benchmarks.fake_delta import FakeDeltaServer  # noqa: E402
+
+
+def outcome(e: Exception) -> str:
+    if isinstance(e, DeltaRateLimited):
+        return "shed"
+    if isinstance(e, DeltaAPIError) and e.status_code == 429:
+        return "429"
+    return "error"
+
+
+async def scenario(rate: float, args):
+    with FakeDeltaServer(latency_ms=args.latency_ms) as server:
+        server.state.rate_limit = args.quota
+        scheduler = RequestScheduler(rate=rate, burst=max(int(args.quota // 2), 1), max_wait_seconds=args.max_wait)
+        client = AsyncDeltaService(base_url=server.url, api_key="k", api_secret="s", scheduler=scheduler)
+        wallet_client = DeltaService(base_url=server.url, api_key="k", api_secret="s", scheduler=scheduler)
+        counts = {lane: Counter() for lane in ("order", "ticker", "wallet")}
+        order_latencies = []
+        stop = time.monotonic() + args.seconds
+
+        async def poll_tickers():
+            while time.monotonic() < stop:
+                try:
+                    await client.request("GET", "/tickers/BTCUSDT")
+                    counts["ticker"]["ok"] += 1
+                except Exception as e:
+                    counts["ticker"][outcome(e)] += 1
+                    await asyncio.sleep(0.05) # a UI poller retrying
+
+        def poll_wallet():
+            while time.monotonic() < stop:
+                try:
+                    wallet_client.get_wallet_balance()
+                    counts["wallet"]["ok"] += 1
+                except Exception as e:
+                    counts["wallet"][outcome(e)] += 1
+                time.sleep(0.05)
+
+        async def place_orders():
+            while time.monotonic() < stop:
+                begin = time.perf_counter()
+                try:
+                    await client.place_order("BTCUSDT", "LONG", 1)
+                    counts["order"]["ok"] += 1
+                    order_latencies.append((time.perf_counter() - begin) * 1000)
+                except Exception as e:
+                    counts["order"][outcome(e)] += 1
+                await asyncio.sleep(args.order_every)
+
+        await asyncio.gather(
+            place_orders(), *(poll_tickers() for _ in range(args.pollers)),
+            *(asyncio.to_thread(poll_wallet) for _ in range(2))
+        )
+        await client.aclose()
+        wallet_client.close()
+        return counts, order_latencies, server.state.requests, server.state.throttled
+
+
+def main(args):
+    print(f"quota {args.quota} req/s, {args.pollers} ticker pollers + 2 wallet threads, an order every {args.order_every}s, "
+          f"{args.seconds}s per row")
+    print(f"{'':<12} {'sent/s':>7} {'429s':>6} | {'orders ok':>9} {'fail':>5} {'p50':>8} {'p99':>8} | "
+          f"{'tickers ok':>10} {'shed':>6} | {'wallet ok':>9} {'shed':>5}")
+    for label, rate in (("no limiter", 0.0), ("limiter", args.quota * 0.9), ("over quota", args.quota * 2.0)):
+        counts, latencies, sent, throttled = asyncio.run(scenario(rate, args))
+        order, ticker, wallet = counts["order"], counts["ticker"], counts["wallet"]
+        p50 = f"{statistics.median(latencies):>6.1f}ms" if latencies else f"{'-':>8}"
+        p99 = f"{sorted(latencies)[int(len(latencies) * 0.99)]:>6.1f}ms" if latencies else f"{'-':>8}"
+        print(f"{label:<12} {sent / args.seconds:>7.1f} {throttled:>6} | {order['ok']:>9} {order['429'] + order['shed'] + order['error']:>5} "
+              f"{p50} {p99} | {ticker['ok']:>10} {ticker['shed']:>6} | {wallet['ok']:>9} {wallet['shed']:>5}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--quota", type=float, default=20.0, help="Fake Delta's requests per second")
+    parser.add_argument("--seconds", type=float, default=10.0, help="Per row")
+    parser.add_argument("--pollers", type=int, default=10)
+    parser.add_argument("--order-every", type=float, default=0.5)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--max-wait", type=float, default=2.0, help="Scheduler's max queue wait")
+    main(parser.parse_args())
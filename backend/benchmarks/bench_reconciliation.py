@@ -0,0 +1,101 @@
+"""
+Fill / order reconciliation against the local fake Delta: cost of a run with the persisted
+SyncCursors (only pages newer than the last seen fill) vs. re-pulling the whole history
+window every run, as the exchange history grows.
+
+    cd backend && python -m benchmarks.bench_reconciliation --sizes 10000 50000 --new 50
+
+Each size seeds that many historical fills (two per order, half the orders known locally as
+trades), runs the initial backfill, then places --new market orders and times one more run.
+The fake server runs in-process, so times include its side of each page request.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+os.environ.setdefault("DELTA_RATE_LIMIT_PER_SECOND", "0") # Pages as fast as the fake serves them
+
+from sqlalchemy import create_engine, func, select  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.db.base import Base  # noqa: E402
+from app.models.models import Account, Fill, SyncCursor, Trade  # noqa: E402
+from app.services.delta_service import DeltaService  # noqa: E402
+from app.services.reconciliation import ReconciliationService  # noqa: E402
+from benchmarks.fake_delta import FakeDeltaServer  # noqa: E402
+
+
+def seed(state, Session, n_fills: int):
+    now_us = int(time.time() * 1_000_000)
+    span = int(settings.RECONCILE_LOOKBACK_HOURS * 3600 * 1_000_000) // 2
+    with Session() as db:
+        account = Account(id=settings.ACCOUNT_ID)
+        db.add(account)
+        db.commit()
+        trades = []
+        for i in range(n_fills // 2):
+            created = now_us - span + span * i // (n_fills // 2)
+            symbol = "BTCUSDT" if i % 2 else "ETHUSDT"
+            side = "buy" if i % 3 else "sell"
+            order = state.add_order({"product_symbol": symbol, "size": 10, "side": side, "order_type": "market_order"}, created)
+            price = state.prices[symbol]
+            state.add_fill(order, 5, price, created)
+            state.add_fill(order, 5, price * 1.0005, created + 1000)
+            if i % 2 == 0:
+                trades.append(dict(account_id=account.id, symbol=symbol, side="LONG" if side == "buy" else "SHORT",
+                                   quantity=10, entry_price=price, status="CLOSED" if i % 4 else "OPEN",
+                                   exit_price=price * 1.01 if i % 4 else None, pnl=0.0 if i % 4 else None,
+                                   exchange_order_id=str(order["id"])))
+        db.execute(Trade.__table__.insert(), trades)
+        db.commit()
+
+
+def timed(service):
+    start = time.perf_counter()
+    result = service.reconcile_once()
+    return time.perf_counter() - start, result
+
+
+def main(args):
+    print(f"{'history':>8} {'run':<22} {'requests':>9} {'fills':>7} {'time':>9}")
+    for n in args.sizes:
+        path = os.path.join(tempfile.mkdtemp(), "bench.db")
+        engine = create_engine(f"sqlite:///{path}")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine, autoflush=False)
+
+        with FakeDeltaServer() as server:
+            client = DeltaService(base_url=server.url, api_key="k", api_secret="s")
+            seed(server.state, Session, n)
+            service = ReconciliationService(client=client, session_factory=Session)
+            service.settle_seconds = 0
+
+            seconds, result = timed(service)
+            print(f"{n:>8} {'initial backfill':<22} {result.requests:>9} {result.fills:>7} {seconds * 1000:>7.0f}ms")
+
+            for _ in range(args.new):
+                client.place_order("BTCUSDT", "LONG", 4)
+            seconds, result = timed(service)
+            print(f"{n:>8} {f'+{args.new} orders, cursor':<22} {result.requests:>9} {result.fills:>7} {seconds * 1000:>7.0f}ms")
+
+            # Same run without the cursors: every pass pages through the whole window again
+            with Session() as db:
+                db.query(SyncCursor).delete()
+                db.commit()
+            seconds, result = timed(service)
+            print(f"{n:>8} {'full window, no cursor':<22} {result.requests:>9} {result.fills:>7} {seconds * 1000:>7.0f}ms")
+
+            with Session() as db:
+                stored = db.scalar(select(func.count()).select_from(Fill))
+                assert stored == len(server.state.fills), (stored, len(server.state.fills))
+            client.close()
+        engine.dispose()
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 50000])
+    parser.add_argument("--new", type=int, default=50)
+    main(parser.parse_args())
@@ -0,0 +1,62 @@
+"""
+Local journal classifier throughput over a synthetic corpus of journal lines,
+next to the old substring-scan heuristic it replaced.
+
+    cd backend && python -m benchmarks.bench_sentiment_classifier --lines 20000
+"""
+import argparse
+import random
+import time
+from collections import Counter
+from app.core.config import settings
+from app.services.sentiment_classifier import SentimentClassifier
+
+OPENERS = ["", "ugh ", "honestly ", "ok so ", "today ", "again ", "man, "]
+BODIES = [
+    "I lost again and I'm scared to click", "stopped out twice, feeling stressed", "hit my stop on BTC, nervous about tomorrow",
+    "easy money today, thinking of going all in", "crushing it, can't lose this week", "big win on ETH, max leverage next",
+    "need to win it back before close", "so angry, one more trade to get even", "going to double down and make it back",
+    "missed the move, chasing now", "fomo got me, jumped in late", "everyone is buying, have to get in before it's too late",
+    "stuck to my plan and respected my stop", "done for the day, took a break", "calm and patient, waiting for my setup",
+    "not scared, followed the plan", "market was choppy, nothing to report", "BTC ranging near 65k", "reviewing my trades from last week",
+]
+CLOSERS = ["", ".", "!!", " lol", " :(", " - need to think", " tbh"]
+
+
+def old_heuristic(content: str):
+    content_lower = content.lower()
+    if any(w in content_lower for w in ['fear', 'scared', 'afraid', 'loss', 'lost', 'break']):
+        return ['fear', 'anxiety'], -0.5
+    elif any(w in content_lower for w in ['greed', 'win', 'won', 'profit', 'easy']):
+        return ['greed', 'overconfidence'], 0.5
+    return ['neutral'], 0.0
+
+
+def main(args):
+    rng = random.Random(args.seed)
+    corpus = [rng.choice(OPENERS) + rng.choice(BODIES) + rng.choice(CLOSERS) for _ in range(args.lines)]
+    classifier = SentimentClassifier()
+
+    t0 = time.perf_counter()
+    for line in corpus:
+        old_heuristic(line)
+    old = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    results = [classifier.classify(line) for line in corpus]
+    new = time.perf_counter() - t0
+
+    escalated = sum(r.confidence < settings.LOCAL_CLASSIFIER_MIN_CONFIDENCE for r in results)
+    tags = Counter(r.tags[0] for r in results)
+    print(f"{len(corpus)} lines")
+    print(f"old substring heuristic: {len(corpus) / old:>10,.0f} lines/s ({old / len(corpus) * 1e6:5.1f} us/line)")
+    print(f"SentimentClassifier:     {len(corpus) / new:>10,.0f} lines/s ({new / len(corpus) * 1e6:5.1f} us/line)")
+    print(f"answered locally: {1 - escalated / len(corpus):.1%} (threshold {settings.LOCAL_CLASSIFIER_MIN_CONFIDENCE}), escalated to Gemini: {escalated}")
+    print("top tags:", ", ".join(f"{t}={n}" for t, n in tags.most_common()))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lines", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=1)
+    main(parser.parse_args())
@@ -0,0 +1,105 @@
+"""
+Per-worker startup cost: how long `import app.main` takes in a fresh interpreter, and how long
+a new uvicorn worker takes from spawn to its first /health and first DB-backed response
+(/api/v1/account/). Runs against an up-to-date SQLite file, as a worker joining a deployed
+app would.
+
+    cd backend && python -m benchmarks.bench_startup --runs 5
+
+Modes: "migrate" checks the schema in the lifespan (DB_MIGRATE_ON_STARTUP, the default),
+"fast" skips it (schema managed by `python -m app.db.migrate`). --baseline times another
+checkout of the backend the same way, e.g. one from before imports stopped running DDL.
+Gemini is given a key, the SDK's import cost is part of what's measured.
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# The schema is set up from this checkout, the timed processes get their own environment
+os.environ["DATABASE_URL"] = "sqlite://"
+
+import httpx  # noqa: E402
+from sqlalchemy import create_engine  # noqa: E402
+from app.db.migrate import migrate  # noqa: E402
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+
+
+def worker_env(db_path: str, migrate_on_startup: bool) -> dict:
+    return dict(os.environ, DATABASE_URL=f"sqlite:///{db_path}", PRICE_BOOK_ENABLED="false",
+                DB_MIGRATE_ON_STARTUP=str(migrate_on_startup).lower(),
+                DELTA_API_KEY="", DELTA_API_SECRET="", GEMINI_API_KEY="bench")
+
+
+def import_seconds(app_dir: str, env: dict) -> float:
+    out = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET], cwd=app_dir, env=env,
+                         capture_output=True, text=True, check=True).stdout
+    return float(out.strip().splitlines()[-1])
+
+
+def first_responses(app_dir: str, env: dict):
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    url = f"http://127.0.0.1:{port}"
+    begin = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--app-dir", app_dir, "--port", str(port), "--log-level", "warning"],
+        cwd=app_dir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        with httpx.Client(base_url=url, timeout=30) as client:
+            while True:
+                try:
+                    if client.get("/health").status_code == 200:
+                        break
+                except httpx.TransportError:
+                    if proc.poll() is not None:
+                        raise RuntimeError("worker exited during startup")
+                    time.sleep(0.005)
+            health = time.perf_counter() - begin
+            client.get("/api/v1/account/").raise_for_status()
+            account = time.perf_counter() - begin
+    finally:
+        proc.terminate()
+        proc.wait(10)
+    return health, account
+
+
+def run(label: str, app_dir: str, db_path: str, migrate_on_startup: bool, runs: int):
+    env = worker_env(db_path, migrate_on_startup)
+    imports, health, account = [], [], []
+    for _ in range(runs):
+        imports.append(import_seconds(app_dir, env))
+        h, a = first_responses(app_dir, env)
+        health.append(h)
+        account.append(a)
+    print(f"{label:<18} {statistics.median(imports) * 1000:>9.0f}ms {statistics.median(health) * 1000:>13.0f}ms "
+          f"{statistics.median(account) * 1000:>15.0f}ms")
+
+
+def main(args):
+    db_path = os.path.join(tempfile.mkdtemp(), "startup.db")
+    engine = create_engine(f"sqlite:///{db_path}")
+    migrate(engine)
+    engine.dispose()
+
+    print(f"{'app':<18} {'import':>11} {'first /health':>15} {'first /account/':>17}")
+    run("current, migrate", BACKEND, db_path, True, args.runs)
+    run("current, fast", BACKEND, db_path, False, args.runs)
+    if args.baseline:
+        run("baseline", os.path.abspath(args.baseline), db_path, True, args.runs)
+    os.remove(db_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5, help="Fresh processes per row, medians reported")
+    parser.add_argument("--baseline", help="Backend directory of another checkout to time the same way")
+    main(parser.parse_args())
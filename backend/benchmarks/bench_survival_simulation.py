@@ -0,0 +1,47 @@
+"""
+Monte Carlo risk-of-ruin cost: 10k paths x 500 trades bootstrapped from a sample of R multiples.
+Target is < 50 ms per simulation; cached lookups (same stats snapshot) should be ~free.
+
+    cd backend && python -m benchmarks.bench_survival_simulation --paths 10000 --horizon 500 --workers 1 4
+"""
+import argparse
+import os
+import time
+import numpy as np
+from app.services.survival_engine import SurvivalEngine
+
+
+def main(args):
+    rng = np.random.default_rng(7)
+    outcomes = rng.choice([-1.0, -1.0, -0.5, 0.0, 1.0, 2.0, 3.0], size=args.sample)
+    print(f"{args.paths:,} paths x {args.horizon} trades, {args.sample} bootstrapped outcomes, {os.cpu_count()} CPUs")
+
+    for workers in args.workers:
+        engine = SurvivalEngine()
+        engine.simulate(outcomes, 10000.0, 100.0, paths=args.paths, horizon=args.horizon, workers=workers) # warm up (pool start)
+        times = []
+        for i in range(args.repeat):
+            start = time.perf_counter()
+            result = engine.simulate(outcomes, 10000.0, 100.0, paths=args.paths, horizon=args.horizon, workers=workers, seed=i)
+            times.append(time.perf_counter() - start)
+        engine.close()
+        best, median = min(times) * 1000, float(np.median(times)) * 1000
+        flag = "ok" if median < 50 else "over target"
+        print(f"workers={workers:<2} median {median:6.1f} ms  best {best:6.1f} ms  ({flag})  ruin={result.ruin_probability:.3f} dd95={result.drawdown_p95:.3f}")
+
+    engine = SurvivalEngine()
+    engine.cached_simulation(("acct", 1), lambda: (outcomes, 100.0), 10000.0, paths=args.paths, horizon=args.horizon)
+    start = time.perf_counter()
+    for _ in range(10000):
+        engine.cached_simulation(("acct", 1), lambda: (outcomes, 100.0), 10000.0, paths=args.paths, horizon=args.horizon)
+    print(f"cached lookup: {(time.perf_counter() - start) / 10000 * 1e6:.1f} us")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--paths", type=int, default=10000)
+    parser.add_argument("--horizon", type=int, default=500)
+    parser.add_argument("--sample", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 4])
+    main(parser.parse_args())
@@ -0,0 +1,82 @@
+"""
+Bulk trade export (CSV / Parquet / Arrow) vs. scraping GET /trades in pages of 100.
+
+    cd backend && python -m benchmarks.bench_trade_export --n 1000000
+
+Exports run the same statement + writer the route streams from, against a throwaway SQLite
+file. The paginated baseline is timed on a sample of pages (start, middle, end of the history,
+since OFFSET cost grows with depth) and extrapolated to the full history.
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.db.base import Base
+from app.models.models import Trade
+from app.schemas.schemas import TradeResponse
+from app.services.export_service import export_service, parse_columns
+from benchmarks.bench_pdf_export import seed
+
+
+def run_export(Session, account_id: int, fmt: str, columns):
+    with Session() as db:
+        result = db.execute(export_service.query(account_id, columns))
+        if fmt == "csv":
+            chunks = export_service.iter_csv(result, columns)
+        else:
+            chunks = export_service.iter_arrow(result, columns, fmt)
+        return sum(len(c) for c in chunks)
+
+
+def page_json(Session, skip: int, limit: int = 100) -> int:
+    # GET /trades as it serves each page: offset query, model validation, JSON encode
+    with Session() as db:
+        trades = db.query(Trade).order_by(Trade.entry_time.desc()).offset(skip).limit(limit).all()
+        return sum(len(TradeResponse.model_validate(t).model_dump_json()) for t in trades)
+
+
+def main(args):
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    t0 = time.perf_counter()
+    account_id = seed(Session, args.n)
+    print(f"seeded {args.n:,} trades in {time.perf_counter() - t0:.1f}s")
+
+    print(f"{'export':<22} {'time':>8} {'rows/s':>12} {'peak mem':>10} {'size':>9}")
+    for fmt, columns in [("csv", None), ("parquet", None), ("arrow", None), ("csv", "symbol,side,pnl,entry_time")]:
+        names = parse_columns(columns)
+        label = fmt + (" (4 columns)" if columns else "")
+        start = time.perf_counter()
+        size = run_export(Session, account_id, fmt, names)
+        elapsed = time.perf_counter() - start
+        tracemalloc.start()
+        run_export(Session, account_id, fmt, names)
+        peak = tracemalloc.get_traced_memory()[1] / 1e6
+        tracemalloc.stop()
+        print(f"{label:<22} {elapsed:>7.1f}s {args.n / elapsed:>12,.0f} {peak:>8.1f}MB {size / 1e6:>7.1f}MB")
+
+    pages = (args.n + 99) // 100
+    sample = [0, pages // 2, pages - 1]
+    per_page = []
+    for p in sample:
+        start = time.perf_counter()
+        for i in range(args.sample_pages):
+            page_json(Session, min(p + i, pages - 1) * 100)
+        per_page.append((time.perf_counter() - start) / args.sample_pages)
+    avg = sum(per_page) / len(per_page)
+    print(f"paginated GET /trades: {pages:,} calls, {' / '.join(f'{t * 1000:.1f}' for t in per_page)} ms per page "
+          f"(start / middle / end) -> ~{avg * pages:,.0f}s total, before HTTP overhead")
+    engine.dispose()
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=1000000)
+    parser.add_argument("--sample-pages", type=int, default=20)
+    main(parser.parse_args())
@@ -0,0 +1,64 @@
+"""
+Ruin-probability inputs per account request: full scan over closed trades vs. the
+incrementally maintained trade_stats row, plus the cost of folding in one close.
+
+    cd backend && python -m benchmarks.bench_trade_stats --n 100000
+"""
+import argparse
+import os
+import tempfile
+import time
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import sessionmaker
+from app.db.base import Base
+from app.models.models import Account, Trade
+from app.services.trade_stats import trade_stats
+from benchmarks.bench_pdf_export import seed
+
+
+def main(args):
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    account_id = seed(Session, args.n)
+    with Session() as db:
+        db.execute(update(Trade).values(exit_time=Trade.entry_time, r_multiple=Trade.pnl / 100))
+        db.commit()
+
+    with Session() as db:
+        balance = db.get(Account, account_id).balance
+
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            stats = trade_stats._rebuild(db, account_id)
+            trade_stats.ruin_inputs(stats, balance)
+        scan = (time.perf_counter() - start) / args.repeat
+
+        trade_stats.get(db, account_id) # one-off backfill
+        start = time.perf_counter()
+        for _ in range(args.repeat * 100):
+            db.expire_all() # force the PK lookup each time, like a fresh request
+            trade_stats.ruin_inputs(trade_stats.get(db, account_id), balance)
+        lookup = (time.perf_counter() - start) / (args.repeat * 100)
+
+        trade = db.get(Trade, 1)
+        start = time.perf_counter()
+        for _ in range(args.repeat * 100):
+            trade_stats.record_close(db, trade)
+            db.rollback()
+        close = (time.perf_counter() - start) / (args.repeat * 100)
+
+    print(f"{args.n:,} closed trades")
+    print(f"full scan per request:   {scan * 1000:9.2f} ms")
+    print(f"trade_stats row lookup:  {lookup * 1000:9.3f} ms  x{scan / lookup:,.0f}")
+    print(f"record_close (per close): {close * 1000:8.3f} ms")
+    engine.dispose()
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    main(parser.parse_args())
@@ -0,0 +1,294 @@
+"""
+Local stand-in for the Delta Exchange REST API, for benchmarks and offline runs.
+Speaks keep-alive HTTP/1.1 and counts accepted TCP connections so benchmarks can
+show how many handshakes a client actually paid for.
+"""
+import bisect
+import json
+import multiprocessing
+import re
+import socket
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+
+class FakeDeltaState:
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency_ms = latency_ms
+        self.prices = {"BTCUSD": 65000.0, "BTCUSDT": 65000.0, "ETHUSD": 3200.0, "ETHUSDT": 3200.0}
+        self.balance = 1000.0
+        self.orders = []
+        self.fills = [] # oldest first
+        # Injected failures for POST /v2/orders, one popped per request:
+        #   "stall_after"  apply the order, then stall past the client's timeout (response lost)
+        #   "stall_before" stall without applying (request lost)
+        #   "503"          reply 503 without applying
+        #   "reject"       reply 400 (insufficient margin) without applying
+        self.faults = []
+        self.stall_seconds = 1.0
+        # Quota per 1s window like Delta's (requests over it get 429 + X-RATE-LIMIT-RESET), None: unlimited
+        self.rate_limit = None
+        self._window = (0, 0) # (second, requests in it)
+        self.throttled = 0
+        self.connections = 0
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _now_us() -> int:
+        return int(time.time() * 1_000_000)
+
+    def add_fill(self, order: dict, size: float, price: float, created_at: int = None) -> dict:
+        # created_at in microseconds, like Delta's start_time / end_time filters
+        with self.lock:
+            fill = {
+                "id": len(self.fills) + 1, "order_id": order["id"], "product_symbol": order["product_symbol"],
+                "side": order["side"], "size": size, "price": str(price), "commission": str(round(size * price * 0.0005, 8)),
+                "created_at": created_at or self._now_us(),
+            }
+            self.fills.append(fill)
+            order["unfilled_size"] = max(order["unfilled_size"] - size, 0)
+            if not order["unfilled_size"]:
+                order["state"] = "closed"
+            return fill
+
+    def add_order(self, payload: dict, created_at: int = None) -> dict:
+        with self.lock:
+            client_id = payload.get("client_order_id")
+            if client_id and any(o.get("client_order_id") == client_id for o in self.orders):
+                return None
+            order = dict(payload, id=len(self.orders) + 1, state="open", unfilled_size=payload["size"], created_at=created_at or self._now_us())
+            self.orders.append(order)
+            return order
+
+    def cancel(self, order_id: int) -> dict:
+        with self.lock:
+            order = self.orders[order_id - 1]
+            order["state"] = "cancelled"
+            return order
+
+    def execute(self, order: dict, slippage: float = 0.0005):
+        # Market orders fill in two parts around the mark, limits rest until fill() / cancel()
+        if order["order_type"] != "market_order" or not order["size"]:
+            return
+        price = self.prices.get(order["product_symbol"], 100.0)
+        direction = 1 if order["side"] == "buy" else -1
+        first = max(order["size"] // 2, 1) if order["size"] >= 1 else order["size"]
+        self.add_fill(order, first, price)
+        if order["size"] - first > 0:
+            self.add_fill(order, order["size"] - first, round(price * (1 + direction * slippage), 2))
+
+    def history(self, items: list, query: dict) -> dict:
+        """
+        Newest first page of items in [start_time, end_time], "after" is an opaque offset.
+        """
+        start = int(query.get("start_time", [0])[0])
+        end = int(query.get("end_time", [2 ** 62])[0])
+        size = int(query.get("page_size", [100])[0])
+        offset = int(query.get("after", [0])[0])
+        with self.lock:
+            # items are appended in time order
+            lo = bisect.bisect_left(items, start, key=lambda i: i["created_at"])
+            hi = bisect.bisect_right(items, end, key=lambda i: i["created_at"])
+            top = hi - offset
+            page = items[max(top - size, lo):top][::-1]
+        after = str(offset + size) if top - size > lo else None
+        return {"success": True, "result": [_iso(i) for i in page], "meta": {"after": after, "before": None}}
+
+
+def _iso(item: dict) -> dict:
+    ts = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(item["created_at"] // 1_000_000))
+    return dict(item, created_at=f"{ts}.{item['created_at'] % 1_000_000:06d}Z")
+
+
+class FakeDeltaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # keep-alive
+    disable_nagle_algorithm = True # headers and body go out in separate writes
+    state: FakeDeltaState = None
+
+    def setup(self):
+        super().setup()
+        with self.state.lock:
+            self.state.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: dict, headers: dict = None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        try:
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            pass # client gave up waiting (stall faults)
+
+    def _before(self) -> bool:
+        """
+        Counts and delays the request. True if it was answered with a 429 already.
+        """
+        now = time.time()
+        with self.state.lock:
+            self.state.requests += 1
+            limited = False
+            if self.state.rate_limit is not None:
+                second, count = self.state._window
+                count = count + 1 if second == int(now) else 1
+                self.state._window = (int(now), count)
+                limited = count > self.state.rate_limit
+                self.state.throttled += limited
+        if self.state.latency_ms:
+            time.sleep(self.state.latency_ms / 1000)
+        if limited:
+            reset_ms = int((1 - now % 1) * 1000)
+            self._send(429, {"success": False, "error": {"code": "rate_limit_exceeded"}}, {"X-RATE-LIMIT-RESET": str(reset_ms)})
+        return limited
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path == "/_stats":
+            # Not part of the Delta API, lets benchmarks read counters from a spawned server
+            return self._send(200, {"connections": self.state.connections, "requests": self.state.requests,
+                                    "orders": len(self.state.orders), "throttled": self.state.throttled})
+        if self._before():
+            return
+        m = re.fullmatch(r"/v2/tickers/(\w+)", path)
+        if m:
+            symbol = m.group(1)
+            if symbol not in self.state.prices:
+                return self._send(404, {"success": False, "error": {"code": "not_found"}})
+            return self._send(200, {"success": True, "result": {"symbol": symbol, "mark_price": str(self.state.prices[symbol])}})
+        if path == "/v2/wallet/balances":
+            return self._send(200, {"success": True, "result": [{"asset_symbol": "USDT", "balance": str(self.state.balance)}]})
+        query = parse_qs(self.path.split("?", 1)[1]) if "?" in self.path else {}
+        if path == "/v2/fills":
+            return self._send(200, self.state.history(self.state.fills, query))
+        if path == "/v2/orders/history":
+            done = [o for o in self.state.orders if o["state"] in ("closed", "cancelled")]
+            return self._send(200, self.state.history(done, query))
+        m = re.fullmatch(r"/v2/orders/client_order_id/([\w-]+)", path)
+        if m:
+            with self.state.lock:
+                order = next((o for o in self.state.orders if o.get("client_order_id") == m.group(1)), None)
+            if order is None:
+                return self._send(404, {"success": False, "error": {"code": "not_found"}})
+            return self._send(200, {"success": True, "result": _iso(order)})
+        self._send(404, {"success": False, "error": {"code": "not_found"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        if self._before():
+            return
+        if self.path == "/v2/orders":
+            with self.state.lock:
+                fault = self.state.faults.pop(0) if self.state.faults else None
+            if fault == "503":
+                return self._send(503, {"success": False, "error": {"code": "service_unavailable"}})
+            if fault == "reject":
+                return self._send(400, {"success": False, "error": {"code": "insufficient_margin"}})
+            if fault == "stall_before":
+                time.sleep(self.state.stall_seconds)
+                return self._send(503, {"success": False, "error": {"code": "timeout"}})
+            order = self.state.add_order(payload)
+            if order is None:
+                return self._send(400, {"success": False, "error": {"code": "duplicate_client_order_id"}})
+            self.state.execute(order)
+            if fault == "stall_after":
+                time.sleep(self.state.stall_seconds)
+            return self._send(200, {"success": True, "result": _iso(order)})
+        self._send(404, {"success": False, "error": {"code": "not_found"}})
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 512 # default backlog of 5 drops SYNs under concurrent benchmarks
+
+
+class FakeDeltaServer:
+    """
+    Usage:
+        with FakeDeltaServer(latency_ms=2) as server:
+            DeltaService(base_url=server.url, api_key="k", api_secret="s")
+
+    In-process servers share the GIL with the client under test; use spawn() when
+    measuring the client itself.
+    """
+    def __init__(self, latency_ms: float = 0.0, host: str = "127.0.0.1", port: int = 0):
+        self.state = FakeDeltaState(latency_ms)
+        handler = type("Handler", (FakeDeltaHandler,), {"state": self.state})
+        self.httpd = _Server((host, port), handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @staticmethod
+    @contextmanager
+    def spawn(latency_ms: float = 0.0, host: str = "127.0.0.1"):
+        """
+        Runs the server in a separate process, yields its base URL.
+        """
+        with socket.socket() as sock:
+            sock.bind((host, 0))
+            port = sock.getsockname()[1]
+        process = multiprocessing.Process(target=_serve, args=(latency_ms, host, port), daemon=True)
+        process.start()
+        url = f"http://{host}:{port}"
+        deadline = time.monotonic() + 10
+        while True:
+            try:
+                urllib.request.urlopen(f"{url}/_stats", timeout=1).read()
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    process.terminate()
+                    raise
+                time.sleep(0.05)
+        try:
+            yield url
+        finally:
+            process.terminate()
+            process.join()
+
+
+def _serve(latency_ms: float, host: str, port: int):
+    FakeDeltaServer(latency_ms, host, port).httpd.serve_forever()
+
+
+def fetch_stats(url: str) -> dict:
+    return json.loads(urllib.request.urlopen(f"{url}/_stats", timeout=5).read())
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Run the fake Delta REST server")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+    print(f"Fake Delta listening on http://127.0.0.1:{args.port}")
+    _serve(args.latency_ms, "127.0.0.1", args.port)
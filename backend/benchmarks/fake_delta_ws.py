@@ -0,0 +1,78 @@
+"""
+Local stand-in for Delta's public websocket. Waits for a subscribe message, then
+replays recorded v2/ticker messages (benchmarks/data/ticks.jsonl) for the subscribed
+symbols. Can drop the connection after N ticks to exercise PriceBook reconnects.
+"""
+import asyncio
+import json
+import os
+import websockets
+
+TICKS_PATH = os.path.join(os.path.dirname(__file__), "data", "ticks.jsonl")
+
+
+def load_ticks(path: str = TICKS_PATH) -> list:
+    with open(path) as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+class ReplayTickServer:
+    """
+    Usage:
+        async with ReplayTickServer(speed=0) as server:
+            PriceBook(url=server.url, symbols=["BTCUSD"]).start()
+
+    speed: replay speed multiplier on the recorded timestamps (0 = as fast as possible).
+    loop: replay the recording forever instead of once.
+    drop_after: close each connection after this many ticks.
+    """
+    def __init__(self, ticks: list = None, speed: float = 0.0, loop: bool = False, drop_after: int = None, host: str = "127.0.0.1", port: int = 0):
+        self.ticks = ticks if ticks is not None else load_ticks()
+        self.speed = speed
+        self.loop = loop
+        self.drop_after = drop_after
+        self.host = host
+        self.port = port
+        self.connections = 0
+        self.sent = 0
+        self._server = None
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    async def _handler(self, ws):
+        self.connections += 1
+        sub = json.loads(await ws.recv())
+        channels = sub.get("payload", {}).get("channels", [])
+        symbols = {s for ch in channels if ch.get("name") == "v2/ticker" for s in ch.get("symbols", [])}
+        await ws.send(json.dumps({"type": "subscriptions", "channels": channels}))
+
+        sent_here = 0
+        prev_ts = None
+        while True:
+            for raw in self.ticks:
+                tick = json.loads(raw)
+                if tick["symbol"] not in symbols:
+                    continue
+                if self.speed and prev_ts is not None:
+                    await asyncio.sleep((tick["timestamp"] - prev_ts) / 1e6 / self.speed)
+                prev_ts = tick["timestamp"]
+                await ws.send(raw)
+                self.sent += 1
+                sent_here += 1
+                if self.drop_after and sent_here >= self.drop_after:
+                    await ws.close()
+                    return
+            if not self.loop:
+                break
+        await ws.wait_closed()
+
+    async def __aenter__(self):
+        self._server = await websockets.serve(self._handler, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def __aexit__(self, *exc):
+        self._server.close()
+        await self._server.wait_closed()
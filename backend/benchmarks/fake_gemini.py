@@ -0,0 +1,37 @@
+"""
+Stand-in for google.generativeai.GenerativeModel with configurable latency and failures.
+
+    GeminiService(model=FakeGeminiModel(latency_ms=800))
+"""
+import asyncio
+import json
+import random
+import time
+
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeGeminiModel:
+    def __init__(self, latency_ms: float = 500.0, fail_rate: float = 0.0, seed: int = None):
+        self.latency_ms = latency_ms
+        self.fail_rate = fail_rate
+        self.calls = 0
+        self._rng = random.Random(seed)
+
+    def _reply(self) -> FakeResponse:
+        self.calls += 1
+        if self._rng.random() < self.fail_rate:
+            raise RuntimeError("429 Resource has been exhausted (fake quota)")
+        body = {"sentiment_score": -0.2, "emotional_tags": ["fake"], "feedback": "Stick to the plan (fake model)."}
+        return FakeResponse("```json\n" + json.dumps(body) + "\n```")
+
+    def generate_content(self, prompt: str) -> FakeResponse:
+        time.sleep(self.latency_ms / 1000)
+        return self._reply()
+
+    async def generate_content_async(self, prompt: str) -> FakeResponse:
+        await asyncio.sleep(self.latency_ms / 1000)
+        return self._reply()
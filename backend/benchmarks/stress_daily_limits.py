@@ -0,0 +1,171 @@
+"""
+Concurrency check of the daily limits: hundreds of POST /api/v1/trades/ fired at once at
+the app (uvicorn, in a thread) against the local fake Delta. Asserts the day's trade count
+and loss buffer hold, and that the account's reservations add up to its live trades after.
+
+    cd backend && PRICE_BOOK_ENABLED=false python -m benchmarks.stress_daily_limits --orders 300
+
+Scenarios, account reset before each:
+  trade count   max_trades_per_day = --max-trades, loss limit out of the way
+  loss buffer   max_daily_loss fits --fit orders' risk, trade count out of the way
+  rejects       trade count again, with every other exchange call refused (400), so
+                reservations are given back while the burst is still running
+Every scenario also checks trades_today_count / reserved_risk against the live trades.
+Also prints the intent stage (reserve + PENDING insert + commit) uncontended vs. in the burst.
+Exits non-zero if a limit is exceeded.
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+_db = os.path.join(tempfile.mkdtemp(), "stress.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db}"
+os.environ.setdefault("PRICE_BOOK_ENABLED", "false")
+os.environ.setdefault("DELTA_RATE_LIMIT_PER_SECOND", "0") # Measuring our side, not the client-side Delta rate limit
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+from sqlalchemy import func, select  # noqa: E402
+from app.main import app  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.db.base import SessionLocal  # noqa: E402
+from app.models.models import Account, Trade  # noqa: E402
+from app.services.delta_service import async_delta_service  # noqa: E402
+from app.services.risk_engine import trade_risk  # noqa: E402
+from app.services.risk_state import risk_state_cache  # noqa: E402
+from benchmarks.fake_delta import FakeDeltaServer  # noqa: E402
+
+ORDER = {"symbol": "BTCUSDT", "side": "LONG", "quantity": 1, "order_type": "MARKET", "sl_percent": 1, "tp_percent": 2}
+LIVE = ("PENDING", "OPEN")
+
+
+def serve_app():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", backlog=4096))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server, f"http://127.0.0.1:{port}"
+
+
+def reset_account(max_trades: int, max_daily_loss: float):
+    with SessionLocal() as db:
+        db.query(Trade).delete()
+        account = db.get(Account, settings.ACCOUNT_ID)
+        account.locked = False
+        account.trades_today_count = 0
+        account.current_daily_loss = 0.0
+        account.reserved_risk = 0.0
+        account.max_trades_per_day = max_trades
+        account.max_daily_loss = max_daily_loss
+        db.commit()
+    risk_state_cache.invalidate()
+
+
+def intent_ms(response) -> float:
+    for part in response.headers.get("server-timing", "").split(","):
+        name, _, dur = part.strip().partition(";dur=")
+        if name == "intent":
+            return float(dur)
+    return float("nan")
+
+
+async def burst(url: str, n: int):
+    limits = httpx.Limits(max_connections=n, max_keepalive_connections=n)
+    async with httpx.AsyncClient(base_url=url, timeout=60, limits=limits) as client:
+        return await asyncio.gather(*(client.post("/api/v1/trades/", json=ORDER) for _ in range(n)))
+
+
+def settle():
+    # Wait for the post-response PENDING -> OPEN writes
+    for _ in range(200):
+        with SessionLocal() as db:
+            if not db.scalar(select(func.count()).select_from(Trade).where(Trade.status == "PENDING")):
+                return
+        time.sleep(0.05)
+
+
+def check(name: str, responses, max_trades: int, max_daily_loss: float, expected: int, exact: bool = True) -> bool:
+    # exact: every slot gets taken. Not so with rejects, a slot held by an order the exchange
+    # is about to refuse turns others away meanwhile, only the limits must hold there.
+    settle()
+    with SessionLocal() as db:
+        account = db.get(Account, settings.ACCOUNT_ID)
+        live = db.execute(
+            select(func.count(), func.coalesce(func.sum(Trade.risk_amount), 0.0)).where(Trade.status.in_(LIVE))
+        ).one()
+    codes = {}
+    for r in responses:
+        codes[r.status_code] = codes.get(r.status_code, 0) + 1
+    ok = (
+        live[0] <= max_trades
+        and live[1] <= max_daily_loss + 1e-6
+        and (live[0] == expected or not exact)
+        and account.trades_today_count == live[0]
+        and abs(account.reserved_risk - live[1]) < 1e-6
+    )
+    print(f"{name:<12} {len(responses):>6} {codes.get(200, 0):>8} {live[0]:>5}/{('' if exact else '<=') + str(expected):<5} "
+          f"{live[1]:>10.2f}/{max_daily_loss:<10.2f} {account.trades_today_count:>6} {account.reserved_risk:>10.2f} "
+          f"{'ok' if ok else 'LIMIT BROKEN'}  {' '.join(f'{c}x{k}' for k, c in sorted(codes.items()))}")
+    return ok
+
+
+def main(args):
+    with FakeDeltaServer(latency_ms=args.latency_ms) as fake:
+        async_delta_service.base_url = fake.url
+        async_delta_service.api_key = async_delta_service.api_secret = "stress"
+        async_delta_service.enabled = True
+        async_delta_service._client = None
+        server, url = serve_app()
+        httpx.get(f"{url}/api/v1/account/")
+
+        price = fake.state.prices[ORDER["symbol"]]
+        risk = trade_risk(ORDER["symbol"], price, price * (1 - ORDER["sl_percent"] / 100), ORDER["quantity"])
+        unlimited_loss = risk * args.orders * 10
+
+        # Uncontended intent cost first
+        reset_account(10 ** 6, unlimited_loss)
+        with httpx.Client(base_url=url) as client:
+            solo = [intent_ms(client.post("/api/v1/trades/", json=ORDER)) for _ in range(50)]
+
+        print(f"{'scenario':<12} {'orders':>6} {'accepted':>8} {'live/expected':>11} {'reserved risk/limit':>21} "
+              f"{'count':>6} {'reserved':>10}")
+        ok = True
+
+        reset_account(args.max_trades, unlimited_loss)
+        responses = asyncio.run(burst(url, args.orders))
+        ok &= check("trade count", responses, args.max_trades, unlimited_loss, args.max_trades)
+        contended = [intent_ms(r) for r in responses if r.status_code == 200]
+
+        loss_limit = risk * args.fit + risk / 2
+        reset_account(10 ** 6, loss_limit)
+        responses = asyncio.run(burst(url, args.orders))
+        ok &= check("loss buffer", responses, 10 ** 6, loss_limit, args.fit)
+
+        reset_account(args.max_trades, unlimited_loss)
+        fake.state.faults = ["reject", None] * args.orders
+        responses = asyncio.run(burst(url, args.orders))
+        fake.state.faults = []
+        ok &= check("rejects", responses, args.max_trades, unlimited_loss, args.max_trades, exact=False)
+
+        print(f"\nintent stage p50: uncontended {statistics.median(solo):.2f}ms, "
+              f"in a {args.orders} order burst {statistics.median(contended):.2f}ms")
+        server.should_exit = True
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--orders", type=int, default=300)
+    parser.add_argument("--max-trades", type=int, default=25)
+    parser.add_argument("--fit", type=int, default=40)
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    main(parser.parse_args())
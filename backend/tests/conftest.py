@@ -0,0 +1,133 @@
+import os
+import tempfile
+
+# Before anything imports app.core.config: a throwaway SQLite file, no live price feed, no
+# client-side Delta rate limit, and no real Delta / Gemini keys (the background workers
+# stay idle, tests point the clients at the local fake exchange themselves)
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "test.db")
+os.environ["PRICE_BOOK_ENABLED"] = "false"
+os.environ["DELTA_RATE_LIMIT_PER_SECOND"] = "0"
+os.environ["DELTA_API_KEY"] = ""
+os.environ["DELTA_API_SECRET"] = ""
+os.environ["GEMINI_API_KEY"] = ""
+
+import socket  # noqa: E402
+import threading  # noqa: E402
+import time  # noqa: E402
+import pytest  # noqa: E402
+from sqlalchemy import delete, func, select  # noqa: E402
+from app.db.base import SessionLocal  # noqa: E402
+from app.db.migrate import migrate  # noqa: E402
+from app.models.models import Account, DailySummary, Fill, SyncCursor, Trade, TradeStats  # noqa: E402
+from app.services.position_engine import position_engine  # noqa: E402
+from app.services.risk_state import risk_state_cache  # noqa: E402
+from benchmarks.fake_delta import FakeDeltaServer  # noqa: E402
+
+
+@pytest.fixture(scope="session", autouse=True)
+def schema():
+    migrate()
+
+
+def reset_account(max_trades: int = 1000, max_daily_loss: float = 10 ** 6) -> int:
+    """Empty history and one fresh account (id 1) with the given limits."""
+    with SessionLocal() as db:
+        for model in (Fill, TradeStats, DailySummary, Trade):
+            db.execute(delete(model))
+        # Fill / order history cursors, the daily rollover's stays so it doesn't run again
+        db.execute(delete(SyncCursor).where(SyncCursor.name.like("delta.%")))
+        account = db.get(Account, 1)
+        if account is None:
+            account = Account(id=1)
+            db.add(account)
+        account.balance = 10000.0
+        account.locked = False
+        account.last_violation_time = None
+        account.trades_today_count = 0
+        account.current_daily_loss = 0.0
+        account.reserved_risk = 0.0
+        account.max_trades_per_day = max_trades
+        account.max_daily_loss = max_daily_loss
+        db.commit()
+    risk_state_cache.invalidate()
+    with SessionLocal() as db:
+        position_engine.load(db)
+    return 1
+
+
+@pytest.fixture
+def reset():
+    return reset_account
+
+
+@pytest.fixture
+def account() -> int:
+    return reset_account()
+
+
+@pytest.fixture
+def fake_delta():
+    with FakeDeltaServer() as server:
+        yield server
+
+
+@pytest.fixture(scope="session")
+def live_app():
+    """
+    The app served by uvicorn in a thread, its async Delta client aimed at a fake exchange.
+    Yields (fake server, app base URL). One per session: the lifespan's shutdown closes
+    module level clients for good.
+    """
+    import uvicorn
+    from app.main import app
+    from app.services.daily_reset import daily_reset
+    from app.services.delta_service import async_delta_service
+    from app.services.order_service import order_service
+
+    with FakeDeltaServer() as fake:
+        saved = {name: getattr(async_delta_service, name) for name in ("base_url", "api_key", "api_secret", "enabled", "timeout")}
+        async_delta_service.base_url = fake.url
+        async_delta_service.api_key = async_delta_service.api_secret = "test"
+        async_delta_service.enabled = True
+        async_delta_service.timeout = 0.5
+        async_delta_service._client = None
+        backoff = order_service.backoff_seconds
+        order_service.backoff_seconds = 0.05
+
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", backlog=1024))
+        thread = threading.Thread(target=server.run, daemon=True)
+        thread.start()
+        while not server.started:
+            time.sleep(0.01)
+        # A rollover due since the last run would reset the counters under the first test
+        daily_reset.run_due()
+        try:
+            yield fake, f"http://127.0.0.1:{port}"
+        finally:
+            server.should_exit = True
+            thread.join(10)
+            for name, value in saved.items():
+                setattr(async_delta_service, name, value)
+            async_delta_service._client = None
+            order_service.backoff_seconds = backoff
+
+
+def wait_for(condition, timeout: float = 10.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.05)
+    return True
+
+
+@pytest.fixture
+def settled():
+    """Call after a burst: waits for the post-response PENDING -> OPEN writes of accepted orders."""
+    def no_pending() -> bool:
+        with SessionLocal() as db:
+            return not db.scalar(select(func.count()).select_from(Trade).where(Trade.status == "PENDING"))
+    return lambda: wait_for(no_pending)
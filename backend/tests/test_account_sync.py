@@ -0,0 +1,41 @@
+"""
+The singleton account: however many callers race to create it on a fresh database, there
+is exactly one, and the snapshot is built from it.
+"""
+import threading
+from sqlalchemy import delete, select
+from app.core.config import settings
+from app.db.base import SessionLocal
+from app.models.models import Account, JournalEntry
+from app.services.account_sync import account_sync
+
+
+def test_concurrent_first_loads_create_one_account(reset):
+    with SessionLocal() as db:
+        db.execute(delete(JournalEntry))
+        db.execute(delete(Account))
+        db.commit()
+
+    barrier = threading.Barrier(20)
+    snapshots, errors = [], []
+
+    def load():
+        barrier.wait()
+        try:
+            snapshots.append(account_sync.load_snapshot())
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=load) for _ in range(20)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(60)
+    try:
+        assert errors == []
+        with SessionLocal() as db:
+            assert db.scalars(select(Account.id)).all() == [settings.ACCOUNT_ID]
+        assert {s.id for s in snapshots} == {settings.ACCOUNT_ID}
+        assert account_sync.snapshot.balance == 10000.0
+    finally:
+        reset()
@@ -0,0 +1,31 @@
+import sqlite3
+from app.services.analysis_cache import AnalysisCache
+
+
+def disk_keys(path) -> set:
+    with sqlite3.connect(path) as db:
+        return {key for key, in db.execute("SELECT key FROM analysis_cache")}
+
+
+def test_disk_tier_keeps_the_newest_max_entries(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = AnalysisCache(max_entries=5, ttl_seconds=60, path=path)
+    for i in range(20):
+        cache.put(f"k{i}", {"i": i})
+    assert disk_keys(path) == {f"k{i}" for i in range(15, 20)}
+
+    # A fresh process on the same file serves the survivors only
+    reopened = AnalysisCache(max_entries=5, ttl_seconds=60, path=path)
+    assert reopened.get("k19") == {"i": 19}
+    assert reopened.get("k0") is None
+
+
+def test_disk_tier_drops_expired_rows_on_write(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = AnalysisCache(max_entries=100, ttl_seconds=60, path=path)
+    for i in range(10):
+        cache.put(f"old{i}", {"i": i})
+    with sqlite3.connect(path) as db:
+        db.execute("UPDATE analysis_cache SET expires_at = expires_at - 61")
+    cache.put("new", {"i": -1})
+    assert disk_keys(path) == {"new"}
@@ -0,0 +1,102 @@
+import threading
+from app.db.base import SessionLocal
+from app.models.models import Account, Trade, TradeStats
+from app.services.position_engine import position_engine
+from app.services.risk_engine import trade_risk
+from app.services.risk_state import RiskState, risk_state_cache
+from app.services.trade_stats import trade_stats
+
+THREADS = 40
+
+
+def open_trades(n: int):
+    risk = trade_risk("BTCUSDT", 100.0, 90.0, 1.0)
+    with SessionLocal() as db:
+        trades = [Trade(account_id=1, symbol="BTCUSDT", side="LONG", quantity=1.0, entry_price=100.0, stop_loss=90.0,
+                        risk_amount=risk, status="OPEN", tags=[]) for _ in range(n)]
+        db.add_all(trades)
+        db.get(Account, 1).reserved_risk = risk * n
+        db.commit()
+        ids = [t.id for t in trades]
+    with SessionLocal() as db:
+        position_engine.load(db)
+    return ids
+
+
+def run_at_once(targets):
+    """Starts every target on its own thread behind one barrier, returns the exceptions raised."""
+    barrier = threading.Barrier(len(targets))
+    errors = []
+
+    def run(target):
+        barrier.wait()
+        try:
+            target()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run, args=(t,)) for t in targets]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(60)
+    return errors
+
+
+def close(trade_id: int, exit_price: float):
+    def target():
+        with SessionLocal() as db:
+            position_engine.close_trade(db, trade_id, exit_price)
+    return target
+
+
+def test_concurrent_closes_book_every_loss(reset):
+    reset(max_daily_loss=100.0)
+    ids = open_trades(THREADS)
+    # 33 losers at -5, the rest scratch
+    errors = run_at_once([close(trade_id, 95.0 if i < 33 else 100.0) for i, trade_id in enumerate(ids)])
+    assert errors == []
+
+    with SessionLocal() as db:
+        account = db.get(Account, 1)
+        assert account.current_daily_loss == 165.0
+        assert account.locked and account.last_violation_time is not None
+        assert abs(account.reserved_risk) < 1e-6
+        stats = db.get(TradeStats, 1)
+        assert (stats.trades, stats.losses, stats.wins) == (THREADS, 33, 0)
+        assert stats.total_pnl == -165.0
+        # The cache ends on the committed row, not on some close's intermediate state
+        assert risk_state_cache.peek(1) in (None, RiskState.from_account(account))
+    assert len(position_engine) == 0
+
+
+def test_same_trade_closed_concurrently_books_once(account):
+    trade_id = open_trades(1)[0]
+    errors = run_at_once([close(trade_id, 95.0) for _ in range(10)])
+    assert len(errors) == 9 and all(isinstance(e, ValueError) for e in errors)
+
+    with SessionLocal() as db:
+        assert db.get(Account, 1).current_daily_loss == 5.0
+        assert db.get(TradeStats, 1).trades == 1
+
+
+def test_stats_row_backfilled_once_under_concurrent_closes(account):
+    # No trade_stats row yet: every record_close races to create it. The trades stay OPEN in
+    # the DB, like closes still in flight in other transactions, so the backfill finds none.
+    ids = open_trades(THREADS)
+    with SessionLocal() as db:
+        for trade in db.query(Trade):
+            trade.pnl = -5.0
+        db.commit()
+
+    def record(trade_id: int):
+        def target():
+            with SessionLocal() as db:
+                trade_stats.record_close(db, db.get(Trade, trade_id))
+                db.commit()
+        return target
+
+    assert run_at_once([record(trade_id) for trade_id in ids]) == []
+    with SessionLocal() as db:
+        stats = db.get(TradeStats, 1)
+        assert (stats.trades, stats.losses) == (THREADS, THREADS)
@@ -0,0 +1,87 @@
+"""
+Bursts of POST /api/v1/trades/ fired at once at the app (benchmarks/stress_daily_limits.py
+as assertions): the day's trade count and loss buffer must hold, and the account's
+reservations must add up to its live trades afterwards.
+"""
+import asyncio
+from collections import Counter
+import httpx
+import pytest
+from sqlalchemy import func, select
+from app.db.base import SessionLocal
+from app.models.models import Account, Trade
+from app.services.risk_engine import trade_risk
+
+ORDER = {"symbol": "BTCUSDT", "side": "LONG", "quantity": 1, "order_type": "MARKET", "sl_percent": 1, "tp_percent": 2}
+ORDERS = 60
+MAX_TRADES = 10
+FIT = 15
+
+
+async def burst(url: str, n: int):
+    limits = httpx.Limits(max_connections=n, max_keepalive_connections=n)
+    async with httpx.AsyncClient(base_url=url, timeout=60, limits=limits) as client:
+        return await asyncio.gather(*(client.post("/api/v1/trades/", json=ORDER) for _ in range(n)))
+
+
+def live_trades():
+    with SessionLocal() as db:
+        account = db.get(Account, 1)
+        count, risk = db.execute(
+            select(func.count(), func.coalesce(func.sum(Trade.risk_amount), 0.0)).where(Trade.status.in_(("PENDING", "OPEN")))
+        ).one()
+        return account, count, risk
+
+
+@pytest.fixture
+def order_risk(live_app):
+    fake, _ = live_app
+    price = fake.state.prices[ORDER["symbol"]]
+    return trade_risk(ORDER["symbol"], price, price * (1 - ORDER["sl_percent"] / 100), ORDER["quantity"])
+
+
+def test_trade_count_holds_under_a_burst(live_app, reset, settled, order_risk):
+    _, url = live_app
+    reset(max_trades=MAX_TRADES, max_daily_loss=order_risk * ORDERS * 10)
+    codes = Counter(r.status_code for r in asyncio.run(burst(url, ORDERS)))
+    assert settled()
+
+    account, count, risk = live_trades()
+    assert codes[200] == count == MAX_TRADES
+    assert codes[400] == ORDERS - MAX_TRADES
+    assert account.trades_today_count == count
+    assert account.reserved_risk == pytest.approx(risk)
+
+
+def test_loss_buffer_holds_under_a_burst(live_app, reset, settled, order_risk):
+    _, url = live_app
+    limit = order_risk * FIT + order_risk / 2
+    reset(max_daily_loss=limit)
+    codes = Counter(r.status_code for r in asyncio.run(burst(url, ORDERS)))
+    assert settled()
+
+    account, count, risk = live_trades()
+    assert codes[200] == count == FIT
+    assert risk <= limit
+    assert account.trades_today_count == count
+    assert account.reserved_risk == pytest.approx(risk)
+
+
+def test_rejected_orders_give_their_reservation_back(live_app, reset, settled, order_risk):
+    fake, url = live_app
+    reset(max_trades=MAX_TRADES, max_daily_loss=order_risk * ORDERS * 10)
+    fake.state.faults = ["reject", None] * ORDERS
+    try:
+        responses = asyncio.run(burst(url, ORDERS))
+    finally:
+        fake.state.faults = []
+    assert settled()
+
+    # A slot held by an order the exchange is about to refuse turns others away meanwhile,
+    # so not every slot gets taken; the limits and the bookkeeping must hold regardless
+    account, count, risk = live_trades()
+    codes = Counter(r.status_code for r in responses)
+    assert codes[200] == count <= MAX_TRADES
+    assert codes[502] > 0
+    assert account.trades_today_count == count
+    assert account.reserved_risk == pytest.approx(risk)
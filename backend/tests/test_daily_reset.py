@@ -0,0 +1,44 @@
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import delete
+from app.db.base import SessionLocal
+from app.models.models import Account, SyncCursor
+from app.services.daily_reset import ROLLOVER_CURSOR, daily_reset
+
+
+def cursor():
+    with SessionLocal() as db:
+        return db.get(SyncCursor, ROLLOVER_CURSOR)
+
+
+def test_first_start_keeps_the_days_counters_and_lockout(account):
+    now = datetime.now(timezone.utc)
+    with SessionLocal() as db:
+        db.execute(delete(SyncCursor).where(SyncCursor.name == ROLLOVER_CURSOR))
+        state = db.get(Account, 1)
+        state.trades_today_count = 3
+        state.current_daily_loss = 120.0
+        state.locked = True
+        state.last_violation_time = now
+        db.commit()
+
+    try:
+        result = daily_reset.run_due(now)
+        assert (result.day, result.reset, result.unlocked) == (None, 0, 0)
+        assert cursor().last_time == int(daily_reset.day_start(now).timestamp() * 1_000_000)
+        with SessionLocal() as db:
+            state = db.get(Account, 1)
+            assert (state.trades_today_count, state.current_daily_loss, state.locked) == (3, 120.0, True)
+
+        # The next boundary is an actual day change
+        later = daily_reset.next_boundary(now) + timedelta(minutes=1)
+        result = daily_reset.run_due(later)
+        assert result.day == daily_reset.day_start(now).astimezone(daily_reset.tz).date()
+        assert result.reset == 1
+        with SessionLocal() as db:
+            state = db.get(Account, 1)
+            assert (state.trades_today_count, state.current_daily_loss) == (0, 0.0)
+    finally:
+        # Back to today's boundary for the tests that follow
+        with SessionLocal() as db:
+            db.get(SyncCursor, ROLLOVER_CURSOR).last_time = int(daily_reset.day_start().timestamp() * 1_000_000)
+            db.commit()
@@ -0,0 +1,76 @@
+"""
+Order submission against exchange faults (the fault run of benchmarks/bench_order_submit.py
+as assertions): a timeout or 5xx must never place a second order or lose one, and whatever
+a request gave up on is resolved by the reconciler.
+"""
+import httpx
+import pytest
+from app.db.base import SessionLocal
+from app.models.models import Account, Trade
+from app.services.delta_service import DeltaService
+from app.services.order_service import order_service
+from app.services.reconciliation import ReconciliationService
+
+ORDER = {"symbol": "BTCUSDT", "side": "LONG", "quantity": 1, "order_type": "MARKET", "sl_percent": 1, "tp_percent": 2}
+
+
+@pytest.fixture
+def fake(live_app, account):
+    fake, _ = live_app
+    fake.state.stall_seconds = 1.5 # past the client's 0.5s timeout
+    yield fake
+    fake.state.faults = []
+
+
+def submit(url: str, faults, fake) -> httpx.Response:
+    fake.state.faults = list(faults)
+    with httpx.Client(base_url=url, timeout=30) as client:
+        return client.post("/api/v1/trades/", json=ORDER)
+
+
+@pytest.mark.parametrize("faults", [
+    ["stall_after"], # placed, response lost: the retry's lookup finds it
+    ["stall_before"], # lost before placing: resent once
+    ["503"],
+    ["503", "stall_after"],
+], ids="+".join)
+def test_retried_order_is_placed_exactly_once(live_app, fake, settled, faults):
+    _, url = live_app
+    before = len(fake.state.orders)
+    response = submit(url, faults, fake)
+    assert response.status_code == 200, response.text
+    assert len(fake.state.orders) - before == 1
+    assert settled()
+
+    with SessionLocal() as db:
+        trade = db.get(Trade, response.json()["id"])
+        assert trade.status == "OPEN"
+        assert trade.exchange_order_id == str(fake.state.orders[-1]["id"])
+
+
+def test_unconfirmed_orders_are_resolved_by_the_reconciler(live_app, fake):
+    _, url = live_app
+    before = len(fake.state.orders)
+    # Every attempt times out, the last one after placing: live, but the request can't tell
+    response = submit(url, ["stall_before"] * order_service.retries + ["stall_after"], fake)
+    assert response.status_code == 504
+    placed = fake.state.orders[before:]
+    assert len(placed) == 1
+    # Every attempt times out before placing: nothing live
+    response = submit(url, ["stall_before"] * (order_service.retries + 1), fake)
+    assert response.status_code == 504
+    assert len(fake.state.orders) == before + 1
+    with SessionLocal() as db:
+        assert [t.status for t in db.query(Trade)] == ["PENDING", "PENDING"]
+
+    reconciler = ReconciliationService(client=DeltaService(base_url=fake.url, api_key="k", api_secret="s"))
+    reconciler.settle_seconds = 0
+    reconciler.reconcile_once()
+    with SessionLocal() as db:
+        statuses = {t.client_order_id: t.status for t in db.query(Trade).filter(Trade.client_order_id.is_not(None))}
+        assert statuses.pop(placed[0]["client_order_id"]) == "OPEN"
+        assert list(statuses.values()) == ["REJECTED"]
+        # The rejected intent gave its slot and its risk back
+        account = db.get(Account, 1)
+        assert account.trades_today_count == 1
+        assert account.reserved_risk == pytest.approx(db.query(Trade).filter(Trade.status == "OPEN").one().risk_amount)
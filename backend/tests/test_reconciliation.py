@@ -0,0 +1,131 @@
+"""
+ReconciliationService against the local fake Delta: trades corrected from fills and order
+history, reservations and the day's loss kept in step, also with closes landing mid-pass.
+"""
+import threading
+from datetime import datetime, timezone
+import pytest
+from app.db.base import SessionLocal
+from app.models.models import Account, Trade, TradeStats
+from app.services.delta_service import DeltaService
+from app.services.position_engine import position_engine
+from app.services.reconciliation import ReconciliationService
+from app.services.risk_engine import trade_risk
+from app.services.risk_state import RiskState, risk_state_cache
+
+ORDER = {"product_symbol": "BTCUSDT", "order_type": "limit_order"}
+
+
+def reconciler(fake) -> ReconciliationService:
+    service = ReconciliationService(client=DeltaService(base_url=fake.url, api_key="k", api_secret="s"))
+    service.settle_seconds = 0
+    return service
+
+
+def filled(fake, side: str, size: float, price: float) -> str:
+    order = fake.state.add_order(dict(ORDER, side=side, size=size))
+    fake.state.add_fill(order, size, price)
+    return str(order["id"])
+
+
+def add_trade(**fields) -> int:
+    with SessionLocal() as db:
+        trade = Trade(account_id=1, symbol="BTCUSDT", side="LONG", quantity=1.0, entry_price=100.0, stop_loss=90.0, tags=[], **fields)
+        db.add(trade)
+        db.commit()
+        return trade.id
+
+
+def book(current_daily_loss: float, reserved_risk: float):
+    with SessionLocal() as db:
+        account = db.get(Account, 1)
+        account.current_daily_loss = current_daily_loss
+        account.reserved_risk = reserved_risk
+        db.commit()
+    risk_state_cache.invalidate()
+
+
+def test_trades_follow_fills_and_order_history(account, fake_delta):
+    now = datetime.now(timezone.utc)
+    estimate = trade_risk("BTCUSDT", 100.0, 90.0, 1.0)
+    # OPEN, filled at twice the size and a worse price than estimated
+    repriced = add_trade(status="OPEN", risk_amount=estimate, exchange_order_id=filled(fake_delta, "buy", 2, 101.0))
+    # CLOSED today at 95 (-5 booked), the exit actually filled at 94
+    closed = add_trade(status="CLOSED", exchange_order_id=filled(fake_delta, "buy", 1, 100.0), exit_order_id=filled(fake_delta, "sell", 1, 94.0),
+                       exit_price=95.0, exit_time=now, pnl=-5.0, risk_amount=estimate)
+    # REJECTED locally, its order id shows up with fills anyway
+    rejected = add_trade(status="REJECTED", risk_amount=estimate, exchange_order_id=filled(fake_delta, "buy", 3, 120.0))
+    # Resting order cancelled on the exchange without a fill
+    resting = fake_delta.state.add_order(dict(ORDER, side="buy", size=1))
+    fake_delta.state.cancel(resting["id"])
+    cancelled = add_trade(status="OPEN", risk_amount=estimate, exchange_order_id=str(resting["id"]))
+    # Placed outside the app
+    external_order = filled(fake_delta, "sell", 5, 99.0)
+    book(current_daily_loss=5.0, reserved_risk=2 * estimate)
+
+    service = reconciler(fake_delta)
+    service.reconcile_once()
+
+    with SessionLocal() as db:
+        trade = db.get(Trade, repriced)
+        assert (trade.quantity, trade.entry_price) == (2.0, 101.0)
+        assert trade.risk_amount == pytest.approx(trade_risk("BTCUSDT", 101.0, 90.0, 2.0))
+        trade = db.get(Trade, closed)
+        assert (trade.exit_price, trade.pnl) == (94.0, -6.0)
+        trade = db.get(Trade, rejected)
+        assert (trade.status, trade.quantity, trade.entry_price) == ("REJECTED", 1.0, 100.0)
+        assert db.get(Trade, cancelled).status == "CANCELLED"
+        external = db.query(Trade).filter(Trade.exchange_order_id == external_order).one()
+        assert (external.status, external.side, external.quantity) == ("EXTERNAL", "SHORT", 5.0)
+
+        account = db.get(Account, 1)
+        assert account.current_daily_loss == pytest.approx(6.0)
+        # Only the repriced OPEN trade still holds a reservation, at its filled size
+        assert account.reserved_risk == pytest.approx(db.get(Trade, repriced).risk_amount)
+        # Stats were rebuilt with the corrected close
+        stats = db.get(TradeStats, 1)
+        assert (stats.trades, stats.total_pnl) == (1, -6.0)
+        assert risk_state_cache.peek(1) in (None, RiskState.from_account(account))
+
+    # Nothing new: a second pass changes nothing
+    service.reconcile_once()
+    with SessionLocal() as db:
+        account = db.get(Account, 1)
+        assert account.current_daily_loss == pytest.approx(6.0)
+        assert account.reserved_risk == pytest.approx(db.get(Trade, repriced).risk_amount)
+
+
+def test_closes_during_a_pass_are_not_overwritten(account, fake_delta):
+    # Every Delta round trip of the pass takes a while, closes commit in between
+    fake_delta.state.latency_ms = 50
+    now = datetime.now(timezone.utc)
+    add_trade(status="CLOSED", exchange_order_id=filled(fake_delta, "buy", 1, 100.0), exit_order_id=filled(fake_delta, "sell", 1, 94.0),
+              exit_price=95.0, exit_time=now, pnl=-5.0)
+    open_ids = [add_trade(status="OPEN") for _ in range(10)]
+    book(current_daily_loss=5.0, reserved_risk=0.0)
+    with SessionLocal() as db:
+        position_engine.load(db)
+
+    errors = []
+    start = threading.Barrier(len(open_ids) + 1)
+
+    def close(trade_id: int):
+        start.wait()
+        try:
+            with SessionLocal() as db:
+                position_engine.close_trade(db, trade_id, 95.0)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=close, args=(trade_id,)) for trade_id in open_ids]
+    for t in threads:
+        t.start()
+    start.wait()
+    reconciler(fake_delta).reconcile_once()
+    for t in threads:
+        t.join(60)
+    assert errors == []
+
+    with SessionLocal() as db:
+        # -6 for the corrected close, -5 for each of the others
+        assert db.get(Account, 1).current_daily_loss == pytest.approx(6.0 + 5.0 * len(open_ids))
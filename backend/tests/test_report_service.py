@@ -0,0 +1,51 @@
+import io
+from datetime import datetime, timedelta, timezone
+from pypdf import PdfReader
+from app.models.models import Account
+from app.services.report_service import report_service
+
+T0 = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def rows(n: int, consumed: list):
+    for i in range(1, n + 1):
+        consumed.append(i)
+        pnl = 10.0 if i % 2 else -5.0
+        yield (i, "BTCUSD(PERP)" if i == 1 else "BTCUSDT", "LONG", 1.0, 100.0, 100.0 + pnl, pnl, T0 + timedelta(minutes=i))
+
+
+def test_streamed_report_is_a_valid_pdf():
+    account = Account(id=7, balance=10000.0, current_daily_loss=25.0)
+    consumed = []
+    pdf = b"".join(report_service.stream_trade_pdf(account, rows(120, consumed), period="2024-01-01 to 2024-01-02"))
+
+    reader = PdfReader(io.BytesIO(pdf), strict=True)
+    assert len(reader.pages) == 6 # 22 rows on the first page, 25 on the next ones, footer on the last
+    first = reader.pages[0].extract_text()
+    assert "Trade History Report - Account #7" in first
+    assert "Current Balance: $10000.00 | Daily Loss: $25.00" in first
+    assert "2024-01-01 to 2024-01-02" in first
+    assert "BTCUSD(PERP)" in first # parentheses escaped in the content stream
+    last = reader.pages[-1].extract_text()
+    assert "120" in last
+    assert "Total Trades: 120 | Win Rate: 50.0% | Total Realized PnL: $300.00" in last
+
+
+def test_pages_are_yielded_while_rows_are_still_being_read():
+    account = Account(id=1, balance=10000.0, current_daily_loss=0.0)
+    consumed = []
+    chunks = report_service.stream_trade_pdf(account, rows(500, consumed))
+    next(chunks) # header, catalog and fonts
+    next(chunks) # first full page
+    assert len(consumed) < 100
+
+    rest = b"".join(chunks)
+    assert len(consumed) == 500
+    assert rest.rstrip().endswith(b"%%EOF")
+
+
+def test_empty_history_still_renders_one_page():
+    account = Account(id=1, balance=500.0, current_daily_loss=0.0)
+    reader = PdfReader(io.BytesIO(report_service.generate_trade_pdf([], account)), strict=True)
+    assert len(reader.pages) == 1
+    assert "Total Trades: 0 | Win Rate: 0.0% | Total Realized PnL: $0.00" in reader.pages[0].extract_text()
@@ -0,0 +1,23 @@
+import pytest
+from pydantic import ValidationError
+from app.schemas.schemas import BatchValidationRequest, TradeValidationRequest
+
+CANDIDATE = {"symbol": "BTCUSDT", "side": "LONG", "quantity": 1, "sl_percent": 1, "tp_percent": 2}
+
+
+@pytest.mark.parametrize("field, value", [
+    ("side", "FOO"),
+    ("side", "long"),
+    ("quantity", 0),
+    ("sl_percent", -1),
+    ("tp_percent", 0),
+])
+def test_validation_request_rejects_bad_input(field, value):
+    with pytest.raises(ValidationError):
+        TradeValidationRequest(**dict(CANDIDATE, **{field: value}))
+    with pytest.raises(ValidationError):
+        BatchValidationRequest(candidates=[CANDIDATE, dict(CANDIDATE, **{field: value})])
+
+
+def test_validation_request_accepts_both_sides():
+    assert [TradeValidationRequest(**dict(CANDIDATE, side=side)).side for side in ("LONG", "SHORT")] == ["LONG", "SHORT"]
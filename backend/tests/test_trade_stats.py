@@ -0,0 +1,20 @@
+from datetime import datetime, timedelta, timezone
+from app.db.base import SessionLocal
+from app.models.models import Account, Trade
+from app.services.trade_stats import trade_stats
+
+
+def test_outcome_sample_takes_the_latest_closes(account):
+    now = datetime.now(timezone.utc)
+    with SessionLocal() as db:
+        # Held for a month, closed just now: newest close, oldest entry
+        db.add(Trade(account_id=1, symbol="BTCUSDT", side="LONG", quantity=1.0, entry_price=100.0, status="CLOSED",
+                     entry_time=now - timedelta(days=30), exit_time=now, pnl=-50.0, tags=[]))
+        for day in range(1, 4):
+            db.add(Trade(account_id=1, symbol="BTCUSDT", side="LONG", quantity=1.0, entry_price=100.0, status="CLOSED",
+                         entry_time=now - timedelta(days=day, hours=1), exit_time=now - timedelta(days=day), pnl=float(day), tags=[]))
+        db.commit()
+
+        account = db.get(Account, 1)
+        values, scale = trade_stats.outcome_sample(account, trade_stats.get(db, 1), limit=2)
+        assert (values, scale) == ([-50.0, 1.0], 1.0)
@@ -3,8 +3,11 @@ import { SurvivalPanel } from './components/SurvivalPanel';
 import { TradeControlPanel } from './components/TradeControlPanel';
 import { Activity } from 'lucide-react';
 import TradingViewWidget from './components/TradingViewWidget';
+import { useLiveUpdates } from './api/events';
 
 function App() {
+  useLiveUpdates();
+
   return (
     <div className="min-h-screen bg-trade-bg text-gray-300 font-sans pt-14 flex flex-col">
       <AccountStatusBar />
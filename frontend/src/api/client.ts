@@ -1,7 +1,7 @@
 import axios from 'axios';
 import { Account, Trade, TradeCreate, TradeValidationRequest, ValidationResult, JournalEntry } from '../types';
 
-const API_URL = 'http://localhost:8000/api/v1';
+export const API_URL = 'http://localhost:8000/api/v1';
 
 export const api = axios.create({
     baseURL: API_URL,
@@ -40,8 +40,15 @@ export const getJournalEntries = async (): Promise<JournalEntry[]> => {
     return response.data;
 };
 
-export const exportTradesPdf = async (): Promise<Blob> => {
+export interface TradeExportFilters {
+    start?: string; // ISO datetime
+    end?: string;
+    symbol?: string;
+}
+
+export const exportTradesPdf = async (filters: TradeExportFilters = {}): Promise<Blob> => {
     const response = await api.get('/trades/export/pdf', {
+        params: filters,
         responseType: 'blob',
     });
     return response.data;
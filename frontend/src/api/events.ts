@@ -0,0 +1,62 @@
+import { useEffect } from 'react';
+import { useQueryClient } from '@tanstack/react-query';
+import { API_URL } from './client';
+import { Account, Trade, JournalEntry, PositionsSummary } from '../types';
+
+// Subscribes to the backend's server-push stream and patches the React Query cache,
+// so components stay live without polling. Account events carry only changed fields.
+export const useLiveUpdates = () => {
+    const queryClient = useQueryClient();
+
+    useEffect(() => {
+        const source = new EventSource(`${API_URL}/events`);
+
+        // (Re)connected: events may have been missed, resync once from REST
+        source.onopen = () => {
+            queryClient.invalidateQueries();
+        };
+
+        source.addEventListener('account', (e) => {
+            const { data } = JSON.parse((e as MessageEvent).data) as { data: Partial<Account> };
+            queryClient.setQueryData<Account>(['account'], (old) => old ? { ...old, ...data } : old);
+        });
+
+        source.addEventListener('trade.created', (e) => {
+            const { data } = JSON.parse((e as MessageEvent).data) as { data: Trade };
+            queryClient.setQueryData<Trade[]>(['trades'], (old) => old ? [data, ...old.filter(t => t.id !== data.id)] : old);
+        });
+
+        // Closed from the API or corrected by the reconciler: replace in place, keep the order
+        const upsertTrade = (e: Event) => {
+            const { data } = JSON.parse((e as MessageEvent).data) as { data: Trade };
+            queryClient.setQueryData<Trade[]>(['trades'], (old) => {
+                if (!old) return old;
+                return old.some(t => t.id === data.id)
+                    ? old.map(t => t.id === data.id ? data : t)
+                    : [data, ...old];
+            });
+        };
+        source.addEventListener('trade.closed', upsertTrade);
+        source.addEventListener('trade.updated', upsertTrade);
+
+        // Mark-to-market aggregates, pushed only when they move
+        source.addEventListener('positions', (e) => {
+            const { data } = JSON.parse((e as MessageEvent).data) as { data: PositionsSummary };
+            queryClient.setQueryData<PositionsSummary>(['positions'], data);
+        });
+
+        const upsertJournal = (e: Event) => {
+            const { data } = JSON.parse((e as MessageEvent).data) as { data: JournalEntry };
+            queryClient.setQueryData<JournalEntry[]>(['journal'], (old) => {
+                if (!old) return old;
+                return old.some(j => j.id === data.id)
+                    ? old.map(j => j.id === data.id ? data : j)
+                    : [data, ...old];
+            });
+        };
+        source.addEventListener('journal.created', upsertJournal);
+        source.addEventListener('journal.updated', upsertJournal);
+
+        return () => source.close();
+    }, [queryClient]);
+};
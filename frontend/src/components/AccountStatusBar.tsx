@@ -1,3 +1,4 @@
+import { useEffect } from 'react';
 import { getAccount } from '../api/client';
 import { useStore } from '../store/useStore';
 import { useQuery } from '@tanstack/react-query';
@@ -9,13 +10,14 @@ export const AccountStatusBar = () => {
     
     const { data: account, isError } = useQuery({
         queryKey: ['account'],
-        queryFn: async () => {
-            const data = await getAccount();
-            setAccount(data);
-            return data;
-        }
+        queryFn: getAccount,
     });
 
+    // Account may be patched by pushed events without queryFn running, keep the store in sync
+    useEffect(() => {
+        if (account) setAccount(account);
+    }, [account, setAccount]);
+
     if (isError) return <div className="bg-red-900/50 p-2 text-red-200">CONNECTION LOST</div>;
     if (!account) return <div className="text-gray-500">Loading Risk Profile...</div>;
 
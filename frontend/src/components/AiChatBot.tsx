@@ -13,7 +13,6 @@ export const AiChatBot = () => {
     const { data: history, isLoading } = useQuery({
         queryKey: ['journal'],
         queryFn: getJournalEntries,
-        refetchInterval: 10000 
     });
 
     const mutation = useMutation({
@@ -7,7 +7,9 @@ import { QueryClient, QueryClientProvider } from '@tanstack/react-query'
 const queryClient = new QueryClient({
     defaultOptions: {
         queries: {
-            refetchInterval: 1000,
+            // Live updates arrive over the event stream (see api/events.ts);
+            // this slow refetch is only a safety net. Server answers 304 if nothing changed.
+            refetchInterval: 30000,
             retry: 1,
         }
     }
@@ -6,9 +6,13 @@ export interface Account {
     current_daily_loss: number;
     max_trades_per_day: number;
     trades_today_count: number;
+    reserved_risk: number; // Held by open / pending trades against max_daily_loss
     last_violation_time: string | null;
     runway_days: number;
     ruin_probability: number;
+    closed_trades: number;
+    win_rate: number | null;
+    current_streak: number; // > 0 wins in a row, < 0 losses in a row
 }
 
 export interface Trade {
@@ -17,6 +21,8 @@ export interface Trade {
     side: 'LONG' | 'SHORT';
     quantity: number;
     entry_price: number;
+    stop_loss: number | null;
+    risk_amount: number | null;
     exit_price: number | null;
     pnl: number | null;
     r_multiple: number | null;
@@ -26,6 +32,14 @@ export interface Trade {
     tags: string[];
 }
 
+// "positions" event: open trades marked to market (see backend PositionMarks.summary)
+export interface PositionsSummary {
+    open: number;
+    unrealized_pnl: number;
+    by_symbol: Record<string, number>;
+    stop_hit: number[]; // Trade ids trading through their initial stop
+}
+
 export interface TradeCreate {
     symbol: string;
     side: 'LONG' | 'SHORT';